@@ -0,0 +1,236 @@
+# backend/app/core/battery_degradation.py
+"""
+Degradacja magazynu energii i liczenie cykli ze ścieżki SOC symulacji.
+
+ROI baterii zakładało stałą pojemność przez 25 lat i pomijało dane
+katalogowe (cycles, warranty_years). Tu z rocznej ścieżki SOC
+(HourlyEngine → energy_flow.soc_profile):
+- cykle liczone metodą rainflow (ASTM E1049): punkty zwrotne wektorowo,
+  stos tylko na punktach zwrotnych (~2 na dobę, nie 8760 kroków),
+- starzenie cykliczne — reguła Minera: cykl o głębokości d zużywa
+  d^k / cycles_rated życia (k zależne od chemii),
+- starzenie kalendarzowe — liniowe, zależne od chemii i średniego SOC,
+- pojemność rok po roku, wymiana po spadku poniżej END_OF_LIFE_CAPACITY.
+
+Wpływ na oszczędności: savings_adjustment() symuluje baterię o kilku
+pojemnościach (CAPACITY_LEVELS) jednym przebiegiem HourlyEngine.run_battery_sweep
+i interpoluje oszczędności dla pojemności z każdego roku.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.hourly_engine import HourlyEngine
+
+# Parametry starzenia wg chemii:
+# calendar_fade — utrata pojemności na rok przy średnim SOC 50%,
+# dod_exponent  — k w N(d) = cycles_rated · d^(−k) (głębsze cykle zużywają bardziej)
+CHEMISTRY_PARAMS = {
+    "LFP": {"calendar_fade": 0.010, "dod_exponent": 1.1},
+    "NMC": {"calendar_fade": 0.020, "dod_exponent": 1.6},
+}
+CHEMISTRY_DEFAULT = "LFP"
+CYCLES_RATED_DEFAULT = 6000
+WARRANTY_YEARS_DEFAULT = 10
+
+# Koniec życia: pojemność poniżej 70% początkowej (typowy próg gwarancji)
+END_OF_LIFE_CAPACITY = 0.70
+# Wymiana magazynu: udział ceny początkowej (spadek cen ogniw)
+BATTERY_REPLACEMENT_SHARE = 0.70
+# Pojemności względne symulowane w savings_adjustment (od końca życia do nowej);
+# oszczędności z pozostałych lat interpolowane liniowo
+CAPACITY_LEVELS = (END_OF_LIFE_CAPACITY, (1 + END_OF_LIFE_CAPACITY) / 2, 1.0)
+
+
+def rainflow_cycles(series: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cykle rainflow (ASTM E1049, metoda trzech punktów).
+
+    Returns:
+        (ranges, counts) — zakres każdego cyklu w jednostkach serii
+        i jego waga (1.0 = pełny cykl, 0.5 = półcykl z reszty).
+    """
+    x = np.asarray(series, dtype=float)
+    diff = np.diff(x)
+    moving = np.flatnonzero(diff)
+    if moving.size == 0:
+        return np.zeros(0), np.zeros(0)
+
+    # Punkty zwrotne: zmiana kierunku między kolejnymi niezerowymi krokami
+    direction = np.sign(diff[moving])
+    turns = moving[1:][direction[1:] != direction[:-1]]
+    points = np.concatenate([[x[0]], x[turns], [x[-1]]]).tolist()
+
+    ranges: List[float] = []
+    counts: List[float] = []
+    stack: List[float] = []
+    for point in points:
+        stack.append(point)
+        while len(stack) >= 3:
+            current = abs(stack[-1] - stack[-2])
+            previous = abs(stack[-2] - stack[-3])
+            if current < previous:
+                break
+            ranges.append(previous)
+            if len(stack) == 3:
+                counts.append(0.5)
+                stack.pop(0)
+            else:
+                counts.append(1.0)
+                del stack[-3:-1]
+    for a, b in zip(stack[:-1], stack[1:]):
+        ranges.append(abs(b - a))
+        counts.append(0.5)
+
+    ranges_arr, counts_arr = np.array(ranges), np.array(counts)
+    keep = ranges_arr > 0
+    return ranges_arr[keep], counts_arr[keep]
+
+
+def degradation_forecast(
+    soc_profile: Sequence[float],
+    capacity_kwh: float,
+    chemistry: Optional[str] = None,
+    cycles_rated: Optional[float] = None,
+    warranty_years: Optional[float] = None,
+    horizon: int = 25,
+) -> Dict[str, Any]:
+    """
+    Pojemność magazynu rok po roku i terminy wymian.
+
+    Args:
+        soc_profile: roczna ścieżka SOC [kWh] (np. energy_flow.soc_profile)
+        capacity_kwh: pojemność użyteczna symulacji (głębokość cyklu = zakres / pojemność)
+        chemistry: "LFP" / "NMC" (inne — parametry LFP)
+        cycles_rated: liczba pełnych cykli do końca życia (dane katalogowe)
+        warranty_years: okres gwarancji (raportowany; zgodność = pojemność
+            na koniec gwarancji >= END_OF_LIFE_CAPACITY)
+
+    Returns:
+        {
+            "chemistry", "cycles_rated", "warranty_years",
+            "equivalent_full_cycles_per_year": Σ głębokość × waga,
+            "cycle_fade_per_year", "calendar_fade_per_year", "fade_per_year",
+            "capacity_factor": średnia pojemność względna w roku 1..horizon
+                               (po wymianie od nowa),
+            "replacement_years": lata (1..horizon), na początku których magazyn jest wymieniany,
+            "life_years": lata do spadku poniżej END_OF_LIFE_CAPACITY,
+            "capacity_at_warranty_end", "within_warranty",
+        }
+    """
+    if capacity_kwh <= 0:
+        raise ValueError(f"Pojemność baterii musi być dodatnia, otrzymano {capacity_kwh}")
+    if horizon < 1:
+        raise ValueError(f"Horyzont analizy musi wynosić co najmniej 1 rok, otrzymano {horizon}")
+
+    chemistry = (chemistry or CHEMISTRY_DEFAULT).upper()
+    params = CHEMISTRY_PARAMS.get(chemistry, CHEMISTRY_PARAMS[CHEMISTRY_DEFAULT])
+    cycles_rated = float(cycles_rated or CYCLES_RATED_DEFAULT)
+    warranty_years = float(warranty_years or WARRANTY_YEARS_DEFAULT)
+
+    soc = np.clip(np.asarray(soc_profile, dtype=float) / capacity_kwh, 0.0, 1.0)
+    depths, counts = rainflow_cycles(soc)
+    equivalent_cycles = float(depths @ counts)
+    cycle_fade = float((depths ** params["dod_exponent"]) @ counts) / cycles_rated * (1 - END_OF_LIFE_CAPACITY)
+    # Wysoki średni SOC przyspiesza starzenie kalendarzowe (×0.5 przy pustej, ×1.5 przy pełnej)
+    calendar_fade = params["calendar_fade"] * (0.5 + float(soc.mean()))
+    fade = cycle_fade + calendar_fade
+
+    life_years = (1 - END_OF_LIFE_CAPACITY) / fade if fade > 0 else float("inf")
+    # Wiek magazynu na początku roku n; wymiana, gdy przekroczy czas życia
+    replacement_years: List[int] = []
+    age = np.empty(horizon)
+    current = 0.0
+    for year in range(1, horizon + 1):
+        if current + 1e-9 >= life_years:
+            replacement_years.append(year)
+            current = 0.0
+        age[year - 1] = current
+        current += 1.0
+    # Średnia pojemność w roku (połowa roku starzenia), nie poniżej progu wymiany
+    capacity_factor = np.maximum(1 - fade * np.minimum(age + 0.5, life_years), END_OF_LIFE_CAPACITY)
+    capacity_at_warranty_end = 1 - fade * warranty_years
+
+    return {
+        "chemistry": chemistry,
+        "cycles_rated": int(cycles_rated),
+        "warranty_years": warranty_years,
+        "equivalent_full_cycles_per_year": round(equivalent_cycles, 1),
+        "cycle_fade_per_year": round(cycle_fade, 5),
+        "calendar_fade_per_year": round(calendar_fade, 5),
+        "fade_per_year": round(fade, 5),
+        "capacity_factor": np.round(capacity_factor, 4).tolist(),
+        "replacement_years": replacement_years,
+        "life_years": round(life_years, 1) if np.isfinite(life_years) else None,
+        "capacity_at_warranty_end": round(capacity_at_warranty_end, 3),
+        "within_warranty": capacity_at_warranty_end >= END_OF_LIFE_CAPACITY,
+    }
+
+
+def adjustment_from_levels(
+    forecast: Dict[str, Any],
+    level_savings: Sequence[float],
+    battery_cost_pln: float,
+) -> Dict[str, List[float]]:
+    """
+    Korekty roczne z oszczędności baterii o pojemnościach CAPACITY_LEVELS
+    (ostatni poziom = pełna pojemność) — bez symulacji; wspólne dla
+    savings_adjustment i przeglądu katalogu (battery_sizing).
+    """
+    factor = np.asarray(forecast["capacity_factor"], dtype=float)
+    savings = np.asarray(level_savings, dtype=float)
+    adjustment = np.minimum(np.interp(factor, CAPACITY_LEVELS, savings) - savings[-1], 0.0)
+
+    replacement = np.zeros(factor.size)
+    for year in forecast["replacement_years"]:
+        replacement[year - 1] = battery_cost_pln * BATTERY_REPLACEMENT_SHARE
+    return {
+        "savings_adjustment_pln": np.round(adjustment, 2).tolist(),
+        "replacement_costs_pln": np.round(replacement, 2).tolist(),
+    }
+
+
+def savings_adjustment(
+    hourly_engine: HourlyEngine,
+    forecast: Dict[str, Any],
+    capacity_kwh: float,
+    power_kw: float,
+    efficiency: float,
+    battery_cost_pln: float,
+    production_profile: Optional[List[float]] = None,
+    consumption_profile: Optional[List[float]] = None,
+    dispatch: str = "greedy",
+    full_savings_pln: Optional[float] = None,
+) -> Dict[str, List[float]]:
+    """
+    Zmiana rocznych oszczędności i dodatkowe koszty wynikające z degradacji.
+
+    Każdy rok to bateria o pojemności capacity_kwh × capacity_factor; oszczędności
+    liczone dla CAPACITY_LEVELS jednym run_battery_sweep (to samo sterowanie
+    dispatch co symulacja z baterią) i interpolowane liniowo.
+    Strata = oszczędności pełnej pojemności − oszczędności pojemności zdegradowanej.
+    full_savings_pln — znane oszczędności pełnej pojemności (np. annual_cashflow.net
+    symulacji z baterią): symulowane są wtedy tylko poziomy zdegradowane.
+    Profile (np. energy_flow symulacji z baterią) oszczędzają ich ponowne generowanie.
+
+    Returns:
+        {
+            "savings_adjustment_pln": zmiana oszczędności w roku 1..horizon (ceny roku 1, <= 0),
+            "replacement_costs_pln":  koszt wymian magazynu w roku 1..horizon,
+        }
+    """
+    levels = np.array(CAPACITY_LEVELS)
+    simulated = levels if full_savings_pln is None else levels[:-1]
+    sweep = hourly_engine.run_battery_sweep(
+        capacity_kwh=capacity_kwh * simulated,
+        power_kw=power_kw,
+        efficiency=efficiency,
+        production_profile=production_profile,
+        consumption_profile=consumption_profile,
+        dispatch=dispatch,
+    )
+    savings = sweep["annual_savings_pln"]
+    if full_savings_pln is not None:
+        savings = np.append(savings, full_savings_pln)
+    return adjustment_from_levels(forecast, savings, battery_cost_pln)
@@ -0,0 +1,206 @@
+# backend/app/core/battery_dispatch.py
+"""
+Optymalne sterowanie magazynem w horyzoncie doby (programowanie dynamiczne).
+
+Strategia zachłanna (HourlyEngine, battery_kernels.soc_path) ładuje baterię
+pierwszą nadwyżką i rozładowuje przy pierwszym niedoborze — nie wykorzystuje
+dołka RCEm w południe ani szczytu cen wieczorem. Tu każda doba jest osobnym
+problemem:
+
+    max Σ_t  RCEm_t · oddanie_t − cena_zakupu_t · pobór_t
+
+Bateria, jak w strategii zachłannej, tylko przesuwa energię PV: w kroku
+z nadwyżką może ładować (część nadwyżki), w kroku z niedoborem — rozładowywać.
+Akcja = ułamek największej możliwej zmiany SOC (moc, nadwyżka / niedobór,
+wolna pojemność), funkcja wartości na siatce SOC z interpolacją liniową.
+
+Indukcja wsteczna liczona jest dla wszystkich dób naraz — macierz
+(doby, poziomy SOC, akcje) na krok, więc rok to 24 (lub 96) operacje NumPy.
+Plan wynikowy to jeden przebieg w przód przez cały rok (SOC z końca doby
+przechodzi na następną) — koszt liniowy względem liczby dób.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+SOC_LEVELS_DEFAULT = 21
+ACTIONS_DEFAULT = 11
+FORECAST_NOISE_DEFAULT = 0.15
+
+
+def _action_inputs(
+    balance: np.ndarray,
+    export_price: np.ndarray,
+    import_price: np.ndarray,
+    step_kwh: float,
+    efficiency: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Wejścia akcji "ułamek × największa możliwa zmiana SOC" dla każdego kroku (D, T).
+
+    Returns:
+        (largest_up, largest_down, unit_cost) — największy przyrost SOC z nadwyżki
+        (po sprawności), największy spadek SOC na niedobór i koszt 1 kWh zmiany SOC.
+        Wartość kroku = stała (balance × cena) − ułamek × największa zmiana × unit_cost:
+        ładowanie traci oddanie po RCEm / sprawność, rozładowanie unika poboru
+        po cenie zakupu (zmiana ujemna → koszt ujemny). Stała nie wpływa na wybór
+        akcji, więc funkcja wartości jej nie zawiera.
+    """
+    charging = balance >= 0
+    largest_up = np.where(charging, np.minimum(step_kwh, balance) * efficiency, 0.0)
+    largest_down = np.where(charging, 0.0, np.minimum(step_kwh, -balance))
+    unit_cost = np.where(charging, export_price / efficiency, import_price)
+    return largest_up, largest_down, unit_cost
+
+
+def optimal_daily_dispatch(
+    balance: np.ndarray,
+    export_price: np.ndarray,
+    import_price: np.ndarray,
+    capacity_kwh: float,
+    power_kw: float,
+    efficiency: float = 0.95,
+    steps_per_hour: int = 1,
+    soc_levels: int = SOC_LEVELS_DEFAULT,
+    n_actions: int = ACTIONS_DEFAULT,
+) -> Dict[str, np.ndarray]:
+    """
+    Plan ładowania / rozładowania dla D dób naraz.
+
+    Args:
+        balance: (D, T) produkcja − zużycie w kroku [kWh]
+        export_price, import_price: (D, T) ceny [PLN/kWh] użyte do optymalizacji
+        capacity_kwh, power_kw, efficiency: parametry baterii (sprawność ładowania
+            jak w HourlyEngine: zmagazynowane = pobrane × efficiency)
+        soc_levels: liczba poziomów siatki funkcji wartości (0 .. capacity)
+        n_actions: liczba akcji na krok (ułamki 0 .. 1 największej zmiany SOC)
+
+    Returns:
+        {"charge", "discharge", "soc"} — tablice (D, T) w kWh. Plan doby zakłada
+        zerową wartość energii pozostałej na jej koniec; faktyczny SOC końcowy
+        przechodzi na kolejną dobę (pierwsza zaczyna od pustej baterii).
+    """
+    balance = np.atleast_2d(np.asarray(balance, dtype=float))
+    n_days, n_steps = balance.shape
+    export_price = np.broadcast_to(np.asarray(export_price, dtype=float), balance.shape)
+    import_price = np.broadcast_to(np.asarray(import_price, dtype=float), balance.shape)
+    if soc_levels < 2 or n_actions < 2:
+        raise ValueError("soc_levels i n_actions muszą wynosić co najmniej 2")
+    if not 0 < efficiency <= 1:
+        raise ValueError(f"Sprawność baterii musi być z zakresu (0, 1], otrzymano {efficiency}")
+
+    if capacity_kwh <= 0 or power_kw <= 0:
+        zeros = np.zeros(balance.shape)
+        return {"charge": zeros, "discharge": zeros.copy(), "soc": zeros.copy()}
+
+    fractions = np.linspace(0.0, 1.0, n_actions)
+    d_soc = capacity_kwh / (soc_levels - 1)
+    level_steps = fractions / d_soc
+    inputs = _action_inputs(balance, export_price, import_price, power_kw / steps_per_hour, efficiency)
+    largest_up, largest_down, unit_cost = inputs
+
+    # Indukcja wsteczna na siatce SOC, wszystkie doby naraz: (D, M, akcje).
+    # Pozycja na siatce = indeks poziomu + zmiana SOC / d_soc; interpolacja liniowa.
+    levels = np.linspace(0.0, capacity_kwh, soc_levels)
+    level_index = np.arange(soc_levels, dtype=float)[None, :, None]
+    value_rows = (np.arange(n_days) * soc_levels)[:, None, None]
+    slope_rows = (np.arange(n_days) * (soc_levels - 1))[:, None, None]
+    values = np.zeros((n_steps + 1, n_days, soc_levels))
+    for t in range(n_steps - 1, -1, -1):
+        largest = np.where(
+            balance[:, t, None] >= 0,
+            np.minimum(largest_up[:, t, None], capacity_kwh - levels),
+            -np.minimum(largest_down[:, t, None], levels),
+        )[:, :, None]
+        pos = level_index + largest * level_steps
+        i0 = np.minimum(pos.astype(np.intp), soc_levels - 2)
+        following = values[t + 1]
+        slopes = np.diff(following, axis=1)
+        total = (
+            following.ravel()[i0 + value_rows]
+            + slopes.ravel()[i0 + slope_rows] * (pos - i0)
+            - fractions * (largest * unit_cost[:, t, None, None])
+        )
+        values[t] = total.max(axis=2)
+
+    return _forward(values, level_steps, fractions, balance, inputs, capacity_kwh, efficiency, d_soc)
+
+
+def _forward(
+    values: np.ndarray,
+    level_steps: np.ndarray,
+    fractions: np.ndarray,
+    balance: np.ndarray,
+    inputs: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    capacity_kwh: float,
+    efficiency: float,
+    d_soc: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Jeden przebieg w przód przez wszystkie doby po kolei: SOC ciągły, akcje
+    oceniane funkcją wartości doby (te same wzory co indukcja wsteczna),
+    SOC na koniec doby jest startem następnej.
+
+    Zależność sekwencyjna obejmuje tylko skalar SOC, więc pętla działa na
+    listach Pythona (kilka akcji na krok — taniej niż wywołania NumPy).
+    Kroki bez możliwej zmiany SOC (pełna bateria przy nadwyżce, pusta przy
+    niedoborze) są pomijane.
+    """
+    n_days, n_steps = balance.shape
+    last = values.shape[2] - 2
+    charging = (balance >= 0).ravel().tolist()
+    largest_up, largest_down, unit_cost = (a.ravel().tolist() for a in inputs)
+    # values[t + 1] doby d jako wiersz (d · T + t) i przyrosty między poziomami SOC
+    next_values = values[1:].transpose(1, 0, 2).reshape(n_days * n_steps, -1)
+    next_slopes = np.diff(next_values, axis=1).tolist()
+    next_values = next_values.tolist()
+    actions = list(zip(fractions.tolist(), level_steps.tolist()))
+
+    moves = [0.0] * (n_days * n_steps)
+    soc_path = [0.0] * (n_days * n_steps)
+    soc = 0.0
+    for i in range(n_days * n_steps):
+        if charging[i]:
+            largest = min(largest_up[i], capacity_kwh - soc)
+        else:
+            largest = -min(largest_down[i], soc)
+        if largest != 0.0:
+            level = soc / d_soc
+            cost = largest * unit_cost[i]
+            value, slope = next_values[i], next_slopes[i]
+            best, best_fraction = -np.inf, 0.0
+            for fraction, level_step in actions:
+                pos = level + largest * level_step
+                j = int(pos)
+                if j > last:
+                    j = last
+                total = value[j] + slope[j] * (pos - j) - fraction * cost
+                if total > best:
+                    best, best_fraction = total, fraction
+            move = largest * best_fraction
+            moves[i] = move
+            soc = min(max(soc + move, 0.0), capacity_kwh)
+        soc_path[i] = soc
+
+    moves = np.array(moves).reshape(n_days, n_steps)
+    return {
+        "charge": np.maximum(moves, 0.0) / efficiency,
+        "discharge": np.maximum(-moves, 0.0),
+        "soc": np.array(soc_path).reshape(n_days, n_steps),
+    }
+
+
+def forecast_prices(
+    prices: np.ndarray,
+    noise: float = FORECAST_NOISE_DEFAULT,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """Prognoza cen z błędem: cena × (1 + noise · N(0, 1)), obcięta do >= 0."""
+    if noise < 0:
+        raise ValueError(f"Błąd prognozy nie może być ujemny, otrzymano {noise}")
+    prices = np.asarray(prices, dtype=float)
+    if noise == 0:
+        return prices
+    rng = np.random.default_rng(seed)
+    return np.maximum(prices * (1 + noise * rng.standard_normal(prices.shape)), 0.0)
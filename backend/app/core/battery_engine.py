@@ -7,6 +7,9 @@ Po refactoringu:
 - NIE LICZY SAVINGS (to robi HourlyEngine poprzez porównanie symulacji)
 - NIE LICZY ROI (to robi FinancialEngine)
 - Usunięto wszystkie magiczne współczynniki związane z finansami
+
+Dobór ekonomiczny (ranking całego katalogu po NPV) — app.core.battery_sizing;
+ScenarioRunner używa go przy battery_sizing="catalog".
 """
 
 from typing import Dict, Any, Optional
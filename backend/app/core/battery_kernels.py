@@ -0,0 +1,125 @@
+# backend/app/core/battery_kernels.py
+"""
+BatteryKernels — sekwencyjne jądra baterii na surowych tablicach NumPy.
+
+Jedyną prawdziwie sekwencyjną zależnością w symulacji magazynu jest SOC:
+
+    soc_t = clip(soc_{t-1} + delta_t, 0, capacity)
+
+Zamiast pętli Pythona po każdej godzinie liczymy to jako obciętą sumę
+skumulowaną w reżimach (odbicie dolne / górne), więc koszt zależy od liczby
+pełnych cykli baterii, a nie od liczby kroków.
+
+Dla wielu baterii naraz (przegląd katalogu) soc_path_batch liczy SOC jako
+skan prefiksowy złożeń funkcji clip(x + d, 0, C) — log2(kroki) operacji
+na macierzy (K, kroki), niezależnie od liczby cykli.
+
+Używane przez HourlyEngine i net_billing.apply_simple_battery_strategy.
+"""
+
+import numpy as np
+
+# Kroków w jednym bloku soc_path_batch (~32k float64 na tablicę roboczą)
+BATCH_BLOCK_STEPS = 32768
+
+
+def soc_path(
+    delta: np.ndarray,
+    capacity: float,
+    initial: float = 0.0,
+    window: int = 384,
+) -> np.ndarray:
+    """
+    SOC po każdym kroku: soc_t = clip(soc_{t-1} + delta_t, 0, capacity).
+
+    Obcięta suma skumulowana liczona reżimami: poniżej pełnej baterii
+    działa tylko dolne odbicie (0), po naładowaniu do pełna — tylko górne.
+    Przełączenie reżimu = pełny cykl baterii (~1-2 na dobę), więc koszt
+    to kilkaset operacji NumPy na oknach, a nie pętla po każdym kroku.
+    """
+    delta = np.asarray(delta, dtype=float)
+    n = delta.size
+    soc = np.empty(n)
+    level = min(max(float(initial), 0.0), capacity)
+    at_top = capacity > 0 and level >= capacity
+    i = 0
+    while i < n:
+        j = min(n, i + window)
+        path = level + np.cumsum(delta[i:j])
+        if at_top:
+            # Górne odbicie: path - max(0, max(path - cap)); wyjście, gdy spadnie poniżej 0
+            reflected = path - np.maximum.accumulate(np.maximum(path - capacity, 0.0))
+            breach = reflected < 0.0
+        else:
+            # Dolne odbicie: path - min(0, min(path)); wyjście, gdy przekroczy pojemność
+            reflected = path - np.minimum.accumulate(np.minimum(path, 0.0))
+            breach = reflected > capacity
+
+        if breach.any():
+            k = int(breach.argmax())
+            soc[i:i + k] = reflected[:k]
+            soc[i + k] = 0.0 if at_top else capacity
+            level = soc[i + k]
+            at_top = not at_top
+            i += k + 1
+        else:
+            soc[i:j] = reflected
+            level = reflected[-1]
+            i = j
+    return soc
+
+
+def soc_path_batch(
+    delta: np.ndarray,
+    capacity,
+    initial: float = 0.0,
+) -> np.ndarray:
+    """
+    SOC dla K baterii naraz: delta (K, N), capacity skalar lub (K,).
+
+    Krok t to funkcja f_t(x) = clip(x + a, lo, hi) (na starcie a = delta_t,
+    lo = 0, hi = C). Złożenie dwóch takich funkcji ma tę samą postać:
+        (f2 ∘ f1)(x) = clip(x + a1 + a2, clip(lo1 + a2, lo2, hi2), clip(hi1 + a2, lo2, hi2)),
+    więc SOC po każdym kroku to skan prefiksowy (podwajanie przesunięcia).
+    Wiersze liczone blokami po BATCH_BLOCK_STEPS kroków, żeby robocze tablice
+    mieściły się w pamięci podręcznej. Wynik zgodny z soc_path co do błędu zaokrągleń.
+    """
+    a = np.atleast_2d(np.asarray(delta, dtype=float)).copy()
+    k, n = a.shape
+    cap = np.broadcast_to(np.asarray(capacity, dtype=float).reshape(-1, 1), (k, 1))
+    rows = max(1, BATCH_BLOCK_STEPS // max(n, 1))
+    # Bufory bloku — złożenie liczone w miejscu, bez tablic tymczasowych
+    lo, hi, new_a, new_lo, new_hi = (np.empty((min(rows, k), n)) for _ in range(5))
+    soc = np.empty((k, n))
+
+    for r0 in range(0, k, rows):
+        r1 = min(k, r0 + rows)
+        b = r1 - r0
+        ab, lob, hib = a[r0:r1], lo[:b], hi[:b]
+        lob.fill(0.0)
+        hib[...] = cap[r0:r1]
+        shift = 1
+        while shift < n:
+            # Złożenie f_t ∘ F_{t-shift}: wcześniejszy prefiks (1), bieżący (2)
+            m = n - shift
+            a2, lo2, hi2 = ab[:, shift:], lob[:, shift:], hib[:, shift:]
+            for bound, out in ((lob, new_lo[:b, :m]), (hib, new_hi[:b, :m])):
+                np.add(bound[:, :-shift], a2, out=out)
+                np.maximum(out, lo2, out=out)
+                np.minimum(out, hi2, out=out)
+            np.add(ab[:, :-shift], a2, out=new_a[:b, :m])
+            a2[...], lo2[...], hi2[...] = new_a[:b, :m], new_lo[:b, :m], new_hi[:b, :m]
+            shift *= 2
+
+        level = np.minimum(np.maximum(float(initial), 0.0), cap[r0:r1])
+        out = soc[r0:r1]
+        np.add(level, ab, out=out)
+        np.maximum(out, lob, out=out)
+        np.minimum(out, hib, out=out)
+    return soc
+
+
+def soc_flows(soc: np.ndarray, initial: float = 0.0) -> tuple:
+    """Zmiana SOC (wzdłuż ostatniej osi) rozbita na (przyrost, ubytek) — obie tablice >= 0."""
+    change = np.diff(soc, axis=-1, prepend=np.full(soc.shape[:-1] + (1,), initial))
+    return np.maximum(change, 0.0), np.maximum(-change, 0.0)
@@ -0,0 +1,230 @@
+# backend/app/core/battery_sizing.py
+"""
+Dobór magazynu z katalogu — ranking wszystkich modeli po NPV.
+
+BatteryEngine.recommend_battery dobiera pojemność progami (nadwyżka > 20%,
+autokonsumpcja) i nie porównuje ekonomii z alternatywami. Tu każdy model
+z katalogu (EquipmentCatalog.batteries = data/batteries.json) jest symulowany:
+- bilans energii wszystkich baterii naraz — HourlyEngine.run_battery_sweep
+  (wiersz 0 = instalacja bez baterii, ta sama symulacja),
+- CAPEX = PV + cena katalogowa z marżą tieru (FinancialEngine.catalog_price_with_markup),
+- degradacja i wymiany magazynu jak w ROI scenariusza (battery_degradation:
+  cykle ze ścieżki SOC danej baterii, korekta oszczędności rok po roku) —
+  poziomy pojemności CAPACITY_LEVELS wszystkich baterii są wierszami tego
+  samego przebiegu, bez osobnej symulacji na baterię,
+- payback i NPV jednym wywołaniem cashflow_grid (oś stopy dyskonta × oś baterii).
+
+Sterowanie baterią (dispatch) jak w symulacji scenariusza. Plan "optimal" /
+"forecast" kosztuje osobne programowanie dynamiczne na baterię, więc cały
+katalog jest najpierw oceniany zachłannie, a DISPATCH_SHORTLIST najlepszych
+pozycji — ponownie w wybranym trybie; pole "dispatch" pozycji rankingu mówi,
+którym modelem ją policzono, a "best" wybierany jest spośród tej krótkiej listy.
+
+Pojemność symulowana = pojemność użyteczna (capacity_kwh × DoD).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.battery_degradation import CAPACITY_LEVELS, adjustment_from_levels, degradation_forecast
+from app.core.financial_engine import FinancialEngine, cashflow_grid
+from app.core.hourly_engine import HourlyEngine
+from app.data.equipment_catalog import get_equipment_catalog
+
+DISCOUNT_RATE_DEFAULT = 0.05
+EFFICIENCY_DEFAULT = 0.95
+HORIZON_YEARS = 25
+DISPATCH_SHORTLIST = 3
+
+
+def catalog_candidates(batteries: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Kandydaci z katalogu (format data/batteries.json); pomija pozycje bez
+    pojemności, mocy lub ceny. Domyślnie — baterie z EquipmentCatalog.
+    """
+    if batteries is None:
+        batteries = get_equipment_catalog().batteries.records
+
+    candidates = []
+    for battery in batteries:
+        capacity = float(battery.get("capacity_kwh") or 0)
+        power = float(battery.get("max_power_kw") or 0)
+        price = float(battery.get("price_pln") or 0)
+        if capacity <= 0 or power <= 0 or price <= 0:
+            continue
+        candidates.append({
+            "id": battery.get("id"),
+            "name": battery.get("name", ""),
+            "brand": battery.get("brand", ""),
+            "capacity_kwh": capacity,
+            "usable_capacity_kwh": round(capacity * float(battery.get("dod_percent") or 100) / 100, 2),
+            "power_kw": power,
+            "efficiency": float(battery.get("efficiency_percent") or EFFICIENCY_DEFAULT * 100) / 100,
+            "price_pln": price,
+            "chemistry": battery.get("chemistry"),
+            "cycles": battery.get("cycles"),
+            "warranty_years": battery.get("warranty_years"),
+        })
+    return candidates
+
+
+def sweep_battery_catalog(
+    hourly_engine: HourlyEngine,
+    financial_engine: FinancialEngine,
+    pv_cost_gross_pln: float,
+    inverter_cost_pln: float = 0.0,
+    candidates: Optional[List[Dict[str, Any]]] = None,
+    discount_rate: float = DISCOUNT_RATE_DEFAULT,
+    production_profile: Optional[List[float]] = None,
+    consumption_profile: Optional[List[float]] = None,
+    dispatch: str = "greedy",
+) -> Dict[str, Any]:
+    """
+    Ranking baterii z katalogu dla jednej instalacji PV.
+
+    Args:
+        hourly_engine: silnik scenariusza bez baterii (profile, ceny, limit eksportu)
+        financial_engine: FinancialEngine tieru (marża)
+        pv_cost_gross_pln: CAPEX samej instalacji PV
+        inverter_cost_pln: cena falownika (wymiana w roku 13)
+        candidates: lista z catalog_candidates(); domyślnie cały katalog
+        dispatch: sterowanie baterią ("greedy" / "optimal" / "forecast");
+            poza krótką listą (DISPATCH_SHORTLIST) pozycje liczone zachłannie
+
+    Returns:
+        {
+            "discount_rate", "dispatch", "n_candidates",
+            "pv_only":  {annual_savings_pln, payback_years, npv_pln},
+            "best":     pozycja o najwyższym NPV policzona w trybie dispatch
+                        (None, gdy katalog pusty) z "degradation" — prognozą
+                        i korektami jak battery_degradation scenariusza,
+            "ranking":  pozycje posortowane malejąco po npv_pln
+                        (z dispatch, life_years i replacement_years magazynu),
+        }
+        npv_gain_pln > 0 oznacza, że bateria poprawia NPV względem samej PV.
+    """
+    if not 0 <= discount_rate < 1:
+        raise ValueError(f"discount_rate musi być z zakresu [0, 1), otrzymano {discount_rate}")
+    if candidates is None:
+        candidates = catalog_candidates()
+
+    # Wiersz 0 = bez baterii, dalej każda bateria w CAPACITY_LEVELS pojemności
+    # (ostatni poziom = pełna) — degradacja liczona w tym samym przebiegu
+    levels = np.array(CAPACITY_LEVELS)
+    n_levels = levels.size
+    usable = np.array([c["usable_capacity_kwh"] for c in candidates], dtype=float)
+    capacity = np.concatenate([[0.0], (usable[:, None] * levels).ravel()])
+    power = np.concatenate([[0.0], np.repeat([c["power_kw"] for c in candidates], n_levels)])
+    efficiency = np.concatenate([
+        [EFFICIENCY_DEFAULT], np.repeat([c["efficiency"] for c in candidates], n_levels),
+    ])
+    full = np.concatenate([[0], np.arange(1, len(candidates) + 1) * n_levels])   # wiersz pełnej pojemności
+    battery_cost = financial_engine.catalog_price_with_markup(
+        np.array([0.0] + [c["price_pln"] for c in candidates])
+    )
+
+    investment = pv_cost_gross_pln + battery_cost
+
+    def npv_grid(savings: np.ndarray, adjustment: Any = 0.0, extra_costs: Any = 0.0) -> Dict[str, np.ndarray]:
+        # Oś 0: [bez dyskonta → payback, z dyskontem → NPV], oś 1: baterie
+        return cashflow_grid(
+            investment=investment,
+            annual_savings_y1=savings,
+            inverter_cost=inverter_cost_pln,
+            discount_rate=np.array([0.0, discount_rate])[:, None],
+            horizon=HORIZON_YEARS,
+            savings_adjustment=adjustment,
+            extra_costs=extra_costs,
+        )
+
+    def level_rows(i: int) -> np.ndarray:
+        return full[i] - n_levels + 1 + np.arange(n_levels)
+
+    def degradation(i: int) -> Dict[str, Any]:
+        # Cykle ze ścieżki SOC pełnej pojemności, korekta z oszczędności poziomów
+        candidate = candidates[i - 1]
+        forecast = degradation_forecast(
+            soc_profile=batch["soc_profile"][full[i]],
+            capacity_kwh=usable[i - 1],
+            chemistry=candidate.get("chemistry"),
+            cycles_rated=candidate.get("cycles"),
+            warranty_years=candidate.get("warranty_years"),
+            horizon=HORIZON_YEARS,
+        )
+        forecast.update(adjustment_from_levels(
+            forecast, batch["annual_savings_pln"][level_rows(i)], battery_cost[i],
+        ))
+        return forecast
+
+    def corrections() -> tuple:
+        zeros = [0.0] * HORIZON_YEARS
+        adjustment = np.array([zeros] + [d["savings_adjustment_pln"] for d in forecasts[1:]])
+        extra_costs = np.array([zeros] + [d["replacement_costs_pln"] for d in forecasts[1:]])
+        return adjustment, extra_costs
+
+    batch = hourly_engine.run_battery_sweep(
+        capacity_kwh=capacity,
+        power_kw=power,
+        efficiency=efficiency,
+        production_profile=production_profile,
+        consumption_profile=consumption_profile,
+    )
+    forecasts = [None] + [degradation(i) for i in range(1, len(full))]
+    evaluated = np.full(len(full), "greedy", dtype=object)
+    if dispatch != "greedy" and candidates:
+        # Krótka lista wg NPV zachłannego, przeliczona w wybranym trybie sterowania
+        greedy_npv = npv_grid(batch["annual_savings_pln"][full], *corrections())["npv_pln"][1]
+        shortlist = 1 + np.argsort(-greedy_npv[1:], kind="stable")[:DISPATCH_SHORTLIST]
+        rows = np.concatenate([level_rows(i) for i in shortlist])
+        planned = hourly_engine.run_battery_sweep(
+            capacity_kwh=capacity[rows],
+            power_kw=power[rows],
+            efficiency=efficiency[rows],
+            production_profile=production_profile,
+            consumption_profile=consumption_profile,
+            dispatch=dispatch,
+        )
+        for key in ("annual_savings_pln", "battery_discharged_kwh", "self_sufficiency_rate", "soc_profile"):
+            batch[key][rows] = planned[key]
+        for i in shortlist:
+            forecasts[i] = degradation(i)
+        evaluated[shortlist] = dispatch
+    savings = batch["annual_savings_pln"][full]
+
+    grid = npv_grid(savings, *corrections())
+    payback = grid["payback_years"][0]
+    npv = grid["npv_pln"][1]
+
+    entries = []
+    for i, candidate in enumerate(candidates, start=1):
+        entries.append({
+            **candidate,
+            "battery_cost_gross_pln": round(float(battery_cost[i]), 2),
+            "investment_pln": round(float(investment[i]), 2),
+            "annual_savings_pln": round(float(savings[i]), 2),
+            "battery_savings_pln": round(float(savings[i] - savings[0]), 2),
+            "battery_discharged_kwh": round(float(batch["battery_discharged_kwh"][full[i]]), 1),
+            "self_sufficiency_rate": round(float(batch["self_sufficiency_rate"][full[i]]), 3),
+            "dispatch": evaluated[i],
+            "life_years": forecasts[i]["life_years"],
+            "replacement_years": forecasts[i]["replacement_years"],
+            "payback_years": round(float(payback[i]), 1),
+            "npv_pln": round(float(npv[i]), 0),
+            "npv_gain_pln": round(float(npv[i] - npv[0]), 0),
+        })
+    order = sorted(range(1, len(full)), key=lambda i: entries[i - 1]["npv_pln"], reverse=True)
+    best = next((i for i in order if evaluated[i] == dispatch), None)
+
+    return {
+        "discount_rate": discount_rate,
+        "dispatch": dispatch,
+        "n_candidates": len(entries),
+        "pv_only": {
+            "annual_savings_pln": round(float(savings[0]), 2),
+            "payback_years": round(float(payback[0]), 1),
+            "npv_pln": round(float(npv[0]), 0),
+        },
+        "best": None if best is None else {**entries[best - 1], "degradation": forecasts[best]},
+        "ranking": [entries[i - 1] for i in order],
+    }
@@ -0,0 +1,133 @@
+# backend/app/core/deposit_ledger.py
+"""
+DepositLedger — depozyt prosumencki (net-billing) jako rejestr transz FIFO.
+
+Reguły:
+- wartość energii oddanej w miesiącu m (RCEm) tworzy transzę depozytu,
+- rachunki za energię pobraną rozliczane są z najstarszych transz (FIFO),
+- transza ważna jest deposit_valid_months miesięcy; niewykorzystana reszta
+  po tym czasie: zwrot min(reszta, refund_limit × wartość transzy),
+  pozostałość przepada,
+- refund_limit: 0.20 (obecnie) lub 0.30 (wariant).
+
+FIFO z wygasaniem sprowadza się do dwóch sum skumulowanych — wpłat D i
+wykorzystania U (zużycie + wygaszenie przesuwa U do końca transzy), więc
+koszt to O(miesięcy), a oś pierwsza (wsad scenariuszy) liczona jest
+wektorowo (NumPy) — jedna pętla po miesiącach dla wszystkich scenariuszy.
+"""
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+DEPOSIT_VALID_MONTHS_DEFAULT = 12
+REFUND_LIMIT_DEFAULT = 0.20
+HORIZON_YEARS_DEFAULT = 25
+
+
+def deposit_ledger(
+    revenues: Any,
+    costs: Any,
+    deposit_valid_months: int = DEPOSIT_VALID_MONTHS_DEFAULT,
+    refund_limit: float = REFUND_LIMIT_DEFAULT,
+) -> Dict[str, np.ndarray]:
+    """
+    Rejestr depozytu dla szeregów miesięcznych.
+
+    revenues, costs: tablice (miesiące,) albo (scenariusze, miesiące) [PLN]
+    Zwraca tablice o tym samym kształcie:
+        used    — część rachunku pokryta z depozytu
+        unpaid  — część rachunku płacona z kieszeni
+        refund  — zwrot z wygasłych transz
+        lost    — przepadła część wygasłych transz
+        balance — stan depozytu na koniec miesiąca
+    """
+    rev = np.asarray(revenues, dtype=float)
+    cost = np.asarray(costs, dtype=float)
+    if rev.shape != cost.shape:
+        raise ValueError(f"Niezgodne kształty revenues {rev.shape} i costs {cost.shape}")
+    if deposit_valid_months < 1:
+        raise ValueError("deposit_valid_months musi być >= 1")
+
+    squeeze = rev.ndim == 1
+    rev = np.maximum(np.atleast_2d(rev), 0.0)
+    cost = np.maximum(np.atleast_2d(cost), 0.0)
+    n_months = rev.shape[1]
+
+    deposited = np.cumsum(rev, axis=1)          # D_t — suma wpłat do końca miesiąca t
+    used_to = np.zeros(rev.shape[0])            # U — wykorzystane lub wygaszone
+
+    used = np.zeros_like(rev)
+    refund = np.zeros_like(rev)
+    lost = np.zeros_like(rev)
+    balance = np.zeros_like(rev)
+
+    for t in range(n_months):
+        available = deposited[:, t] - used_to
+        used[:, t] = np.minimum(cost[:, t], available)
+        used_to += used[:, t]
+
+        k = t - deposit_valid_months
+        if k >= 0:
+            # Transze <= k-1 wygasły wcześniej, więc U >= D_{k-1}: reszta transzy k
+            remainder = np.maximum(deposited[:, k] - used_to, 0.0)
+            refund[:, t] = np.minimum(remainder, refund_limit * rev[:, k])
+            lost[:, t] = remainder - refund[:, t]
+            used_to += remainder
+
+        balance[:, t] = deposited[:, t] - used_to
+
+    result = {
+        "used": used,
+        "unpaid": cost - used,
+        "refund": refund,
+        "lost": lost,
+        "balance": balance,
+    }
+    if squeeze:
+        result = {k: v[0] for k, v in result.items()}
+    return result
+
+
+def deposit_horizon(
+    monthly_revenues: Any,
+    monthly_costs: Any,
+    years: int = HORIZON_YEARS_DEFAULT,
+    revenue_factors: Optional[Any] = None,
+    cost_factors: Optional[Any] = None,
+    deposit_valid_months: int = DEPOSIT_VALID_MONTHS_DEFAULT,
+    refund_limit: float = REFUND_LIMIT_DEFAULT,
+) -> Dict[str, np.ndarray]:
+    """
+    Rok typowy (12 miesięcy) rozwinięty na cały horyzont i przeliczony jednym rejestrem.
+
+    monthly_revenues, monthly_costs: (12,) albo (scenariusze, 12)
+    revenue_factors, cost_factors:   (years,) — np. degradacja paneli, wzrost cen
+    Zwraca sumy roczne (…, years): used, unpaid, refund, lost oraz balance na koniec roku.
+    """
+    rev = np.atleast_2d(np.asarray(monthly_revenues, dtype=float))
+    cost = np.atleast_2d(np.asarray(monthly_costs, dtype=float))
+    if rev.shape[-1] != 12 or cost.shape[-1] != 12:
+        raise ValueError("Szeregi miesięczne muszą mieć 12 wartości")
+
+    rev_f = np.ones(years) if revenue_factors is None else np.asarray(revenue_factors, dtype=float)
+    cost_f = np.ones(years) if cost_factors is None else np.asarray(cost_factors, dtype=float)
+
+    batch = max(rev.shape[0], cost.shape[0])
+    rev_path = (rev[:, None, :] * rev_f[None, :, None]).reshape(rev.shape[0], -1)
+    cost_path = (cost[:, None, :] * cost_f[None, :, None]).reshape(cost.shape[0], -1)
+    ledger = deposit_ledger(
+        np.broadcast_to(rev_path, (batch, years * 12)),
+        np.broadcast_to(cost_path, (batch, years * 12)),
+        deposit_valid_months=deposit_valid_months,
+        refund_limit=refund_limit,
+    )
+
+    yearly = {
+        k: v.reshape(batch, years, 12).sum(axis=2)
+        for k, v in ledger.items() if k != "balance"
+    }
+    yearly["balance"] = ledger["balance"].reshape(batch, years, 12)[:, :, -1]
+    if np.ndim(monthly_revenues) == 1 and np.ndim(monthly_costs) == 1:
+        yearly = {k: v[0] for k, v in yearly.items()}
+    return yearly
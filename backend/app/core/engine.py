@@ -4,13 +4,22 @@ Główny punkt wejścia dla obliczeń scenariuszy.
 KOMPLETNY PLIK - gotowy do wklejenia.
 """
 
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, List
 from app.schemas.scenarios import ScenariosRequest, ScenariosResponse, ScenarioResponseItem, RoofFacet
 from app.core.scenario_runner import ScenarioRunner
+from app.core.production_engine import ProductionEngine
+from app.data.equipment_scenarios import get_scenario_by_tier
 from app.core.facet_geometry import compute_facet_area_and_length
 # Import rygorystycznych silników obliczeniowych
 from app.core.consumption_engine import calculate_annual_demand
+from app.core.meter_data import require_meter_profile
+from app.core.roi_distribution import scenario_roi_inputs
+from app.data.snapshots import data_version
 from app.core.estimate_annual_consumption import (
+    EV_KM_PER_YEAR_DEFAULT,
     estimate_annual_consumption,
     estimate_heating_load,
     estimate_ev_load,
@@ -18,6 +27,65 @@ from app.core.estimate_annual_consumption import (
 )
 
 
+# Wejścia ROI ostatnich wyników /calculate/scenarios — do rozkładu ROI i finansowania
+# bez ponownego liczenia. Wpis to kilka KB (CAPEX, oszczędności, korekty roczne),
+# a nie cała odpowiedź z profilami godzinowymi.
+ROI_CACHE_MAX_ENTRIES = 1024
+_roi_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_roi_cache_lock = threading.Lock()
+
+
+def scenario_cache_key(request: ScenariosRequest) -> str:
+    """Skrót requestu + wersja danych referencyjnych (zmiana cenników unieważnia wpis)."""
+    payload = request.model_dump_json() + "|" + data_version()
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_roi_inputs(request: ScenariosRequest, response: ScenariosResponse) -> List[Dict[str, Any]]:
+    """
+    Zapisuje wejścia ROI scenariuszy odpowiedzi w cache LRU (ROI_CACHE_MAX_ENTRIES wpisów).
+
+    Pozycja: scenario_name, panels_count, battery_recommended oraz
+    "pv" / "battery" — scenario_roi_inputs bez i z baterią (None bez baterii).
+    """
+    items = []
+    for scenario in response.scenarios:
+        item = scenario.model_dump(exclude={"hourly_result_without_battery", "hourly_result_with_battery"})
+        for name in ("hourly_result_without_battery", "hourly_result_with_battery"):
+            hourly = getattr(scenario, name)
+            if hourly:
+                item[name] = {"annual_cashflow": hourly["annual_cashflow"]}
+        items.append({
+            "scenario_name": scenario.scenario_name,
+            "panels_count": scenario.panels_count,
+            "battery_recommended": scenario.battery_recommended,
+            "pv": scenario_roi_inputs(item, with_battery=False),
+            "battery": scenario_roi_inputs(item, with_battery=True) if scenario.battery_recommended else None,
+        })
+
+    key = scenario_cache_key(request)
+    with _roi_cache_lock:
+        _roi_cache[key] = items
+        _roi_cache.move_to_end(key)
+        while len(_roi_cache) > ROI_CACHE_MAX_ENTRIES:
+            _roi_cache.popitem(last=False)
+    return items
+
+
+def cached_roi_inputs(request: ScenariosRequest) -> List[Dict[str, Any]]:
+    """
+    Wejścia ROI scenariuszy requestu (format cache_roi_inputs) — z cache,
+    a przy braku wpisu z nowego przeliczenia. Zwracana lista jest współdzielona.
+    """
+    key = scenario_cache_key(request)
+    with _roi_cache_lock:
+        cached = _roi_cache.get(key)
+        if cached is not None:
+            _roi_cache.move_to_end(key)
+            return cached
+    return cache_roi_inputs(request, calculate_scenarios_engine(request))
+
+
 def calculate_scenarios_engine(request: ScenariosRequest) -> ScenariosResponse:
     """Generuje 3 scenariusze (premium, standard, economy)."""
     consumption_data = _compute_annual_consumption(request)
@@ -80,6 +148,9 @@ def calculate_scenarios_engine(request: ScenariosRequest) -> ScenariosResponse:
         },
     ]
     
+    # Produkcja jednego panelu każdego tieru — jedno wywołanie macierzowe dla wszystkich
+    context["tier_unit_production"] = _compute_tier_unit_production(scenario_configs, context)
+
     scenarios_results: List[ScenarioResponseItem] = []
     
     for config in scenario_configs:
@@ -100,6 +171,7 @@ def calculate_scenarios_engine(request: ScenariosRequest) -> ScenariosResponse:
             inverter_power_kw=result.inverter_power_kw,
             inverter_brand=_extract_brand(result.inverter_model),
             inverter_quantity=1,
+            inverter_cost_pln=result.inverter_cost_pln,
             facet_layouts=result.facet_layouts,
             facet_area_m2=context.get("roof_area_m2"),
             facet_slope_length_m=context.get("roof_slope_length_m"),
@@ -137,6 +209,13 @@ def calculate_scenarios_engine(request: ScenariosRequest) -> ScenariosResponse:
             is_economically_justified=result.is_economically_justified,
             hourly_result_without_battery=result.hourly_result_without_battery,
             hourly_result_with_battery=result.hourly_result_with_battery,
+            ev_charging=result.ev_charging,
+            curtailment=result.curtailment,
+            sensitivity=result.sensitivity,
+            pv_cashflow_25y=result.pv_cashflow_25y,
+            battery_cashflow_25y=result.battery_cashflow_25y,
+            battery_sweep=result.battery_sweep,
+            battery_degradation=result.battery_degradation,
             autoconsumption_rate=result.autoconsumption_rate,
             autoconsumption_kwh=_compute_autoconsumption_kwh(result),
             self_sufficiency_rate=result.self_sufficiency_rate,
@@ -174,8 +253,11 @@ def _compute_annual_consumption(request: ScenariosRequest) -> Dict[str, Any]:
     Oblicza roczne zużycie energii. 
     Eliminuje błąd dzielenia przez 0.80 i wprowadza rzetelną dekompozycję rachunku.
     """
-    # 1. Wyznaczenie bazy (z rachunku lub estymacji metrażowej)
-    if request.estimated_consumption_mode and request.area_m2:
+    # 1. Wyznaczenie bazy (z licznika, rachunku lub estymacji metrażowej)
+    if request.consumption_profile_id:
+        # Tryb: Dane z licznika — suma profilu godzinowego zamiast dekompozycji rachunku
+        base_consumption = float(require_meter_profile(request.consumption_profile_id).sum())
+    elif request.estimated_consumption_mode and request.area_m2:
         # Tryb: Nowy dom (brak rachunków)
         base_consumption = estimate_annual_consumption(
             area_m2=request.area_m2,
@@ -197,7 +279,9 @@ def _compute_annual_consumption(request: ScenariosRequest) -> Dict[str, Any]:
     # Używamy funkcji estymujących zamiast sztywnych stałych
     additional_consumption = 0.0
     if request.planned_ev:
-        additional_consumption += estimate_ev_load(ev_km_per_year=15000)
+        additional_consumption += estimate_ev_load(
+            ev_km_per_year=request.ev_km_per_year or EV_KM_PER_YEAR_DEFAULT
+        )
     if request.planned_heat_pump:
         # Jeśli użytkownik ma rachunek, ale planuje pompę, szacujemy jej pobór dla metrażu
         area = request.area_m2 or 150 
@@ -211,7 +295,9 @@ def _compute_annual_consumption(request: ScenariosRequest) -> Dict[str, Any]:
     
     # 3. Normalizacja typu taryfy
     tariff_type = request.tariff.upper().replace("-", "")
-    if tariff_type not in ["G11", "G12", "G12W"]:
+    if tariff_type == "DYNAMIC":
+        tariff_type = "dynamic"
+    elif tariff_type not in ["G11", "G12", "G12W"]:
         tariff_type = "G11"
     
     return {
@@ -220,6 +306,40 @@ def _compute_annual_consumption(request: ScenariosRequest) -> Dict[str, Any]:
     }
 
 
+def _compute_tier_unit_production(
+    scenario_configs: List[Dict[str, Any]],
+    context: Dict[str, Any],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Porównanie tierów w jednym przebiegu ProductionEngine.compare_panels.
+
+    Dwie orientacje na panel (zgodnie z ScenarioRunner):
+    - "sizing": azymut połaci, nachylenie 30° (estimate_required_panels)
+    - "yield":  azymut i nachylenie dachu (produkcja roczna)
+    Wartości dotyczą JEDNEGO panelu; ScenarioRunner skaluje je liczbą paneli.
+    """
+    tiers = [c.get("quality_tier", "standard") for c in scenario_configs]
+    panels = [get_scenario_by_tier(t)["panel"] for t in tiers]
+    facet = context["facet_obj"]
+
+    matrix = ProductionEngine().compare_panels(
+        panels=panels,
+        province=context["location"],
+        orientations=[
+            (facet.azimuth_deg, getattr(facet, "tilt_deg", 30.0)),
+            (context["roof_azimuth"], context["roof_tilt"]),
+        ],
+    )
+
+    return {
+        tier: {
+            "sizing_annual_kwh": round(sum(round(float(v), 2) for v in matrix[i, 0]), 2),
+            "yield_monthly_kwh": matrix[i, 1],
+        }
+        for i, tier in enumerate(tiers)
+    }
+
+
 def _prepare_context_from_facet(
     facet: RoofFacet,
     annual_consumption_kwh: float,
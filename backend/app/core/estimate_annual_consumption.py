@@ -4,6 +4,9 @@
 from typing import Optional
 from typing import Optional
 
+# Przebieg EV, gdy formularz go nie podaje [km/rok]
+EV_KM_PER_YEAR_DEFAULT = 15000
+
 
 def estimate_annual_consumption(
     area_m2: float,
@@ -0,0 +1,154 @@
+# backend/app/core/ev_charging.py
+"""
+EvCharging — godzinowa symulacja ładowania samochodu elektrycznego.
+
+Zamiast płaskiego dodatku estimate_ev_load (który dostawał kształt zużycia
+gospodarstwa) generujemy okna podłączenia auta i symulujemy w JEDNYM
+przebiegu dwa warianty:
+- "dumb"  — ładowanie pełną mocą od momentu podłączenia,
+- "smart" — najpierw nadwyżka PV, reszta w ostatnich godzinach przed
+            wyjazdem (zwykle noc / strefa pozaszczytowa G12).
+
+Doba EV liczona jest od SESSION_START_HOUR (06:00 → 06:00), dzięki czemu
+nocne podłączenie nie jest rozcinane o północy — sesja = wiersz macierzy
+(365, 24), całość wektorowo (NumPy).
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+SESSION_START_HOUR = 6
+DEFAULT_CHARGER_KW = 7.4       # wallbox 1-fazowy 32A / 3-fazowy 11 kW ograniczony
+DEFAULT_PATTERN = "commuter"
+
+# Okna podłączenia wg godziny zegarowej (1 = auto stoi w garażu podpięte)
+# oraz waga zapotrzebowania dnia (ile "jeździmy" danego dnia).
+EV_PATTERNS: Dict[str, Dict[str, Any]] = {
+    # Dojazdy do pracy: auto w domu od 17:00 do 07:00, weekend krótki wyjazd 10-14
+    "commuter": {
+        "weekday": [1] * 7 + [0] * 10 + [1] * 7,
+        "weekend": [1] * 10 + [0] * 4 + [1] * 10,
+        "weekday_weight": 1.0,
+        "weekend_weight": 0.5,
+    },
+    # Praca zdalna: auto prawie cały dzień w domu, popołudniowe sprawy 15-17
+    "home_office": {
+        "weekday": [1] * 15 + [0] * 2 + [1] * 7,
+        "weekend": [1] * 10 + [0] * 6 + [1] * 8,
+        "weekday_weight": 0.6,
+        "weekend_weight": 1.0,
+    },
+    # Auto weekendowe: w tygodniu stoi, w weekend wyjazdy 09-18
+    "weekend": {
+        "weekday": [1] * 24,
+        "weekend": [1] * 9 + [0] * 9 + [1] * 6,
+        "weekday_weight": 0.3,
+        "weekend_weight": 1.5,
+    },
+}
+
+
+def _to_sessions(arr: np.ndarray) -> np.ndarray:
+    """(8760,) → (365, 24), wiersz = doba EV od SESSION_START_HOUR."""
+    return np.roll(arr, -SESSION_START_HOUR).reshape(365, 24)
+
+
+def _from_sessions(arr: np.ndarray) -> np.ndarray:
+    """(365, 24) → (8760,) w układzie godzin kalendarzowych."""
+    return np.roll(arr.reshape(-1), SESSION_START_HOUR)
+
+
+def _fill_in_order(need: np.ndarray, cap: np.ndarray) -> np.ndarray:
+    """
+    Rozkłada potrzebę sesji (365,) na godziny (365, 24) po kolei,
+    nie przekraczając limitu godzinowego cap.
+    """
+    before = np.cumsum(cap, axis=1) - cap
+    return np.clip(need[:, None] - before, 0.0, cap)
+
+
+def plugged_in_mask(pattern: str = DEFAULT_PATTERN) -> np.ndarray:
+    """Maska (8760,) godzin, w których auto jest podłączone."""
+    if pattern not in EV_PATTERNS:
+        raise ValueError(f"Nieznany wzorzec EV: {pattern}. Dostępne: {list(EV_PATTERNS)}")
+    p = EV_PATTERNS[pattern]
+    days = np.arange(365)
+    is_weekend = (days % 7) >= 5
+    mask = np.where(
+        is_weekend[:, None],
+        np.asarray(p["weekend"], dtype=bool),
+        np.asarray(p["weekday"], dtype=bool),
+    )
+    return mask.reshape(-1)
+
+
+def simulate_ev_charging(
+    annual_ev_kwh: float,
+    production_profile: List[float],
+    household_profile: List[float],
+    pattern: str = DEFAULT_PATTERN,
+    charger_kw: float = DEFAULT_CHARGER_KW,
+    tariff_hourly: Optional[List[float]] = None,
+    rcem_hourly: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Symuluje ładowanie EV w wariantach "dumb" i "smart" jednocześnie.
+
+    Zwraca profile (8760,) obu wariantów oraz podsumowanie: energia z PV,
+    z sieci i koszt [PLN] (sieć po taryfie, PV po utraconym RCEm).
+    """
+    p = EV_PATTERNS.get(pattern)
+    if p is None:
+        raise ValueError(f"Nieznany wzorzec EV: {pattern}. Dostępne: {list(EV_PATTERNS)}")
+
+    pv = np.asarray(production_profile, dtype=float)
+    load = np.asarray(household_profile, dtype=float)
+    if pv.shape != (HOURS_PER_YEAR,) or load.shape != (HOURS_PER_YEAR,):
+        raise ValueError("Profile muszą mieć 8760 wartości")
+
+    plugged = _to_sessions(plugged_in_mask(pattern))
+    surplus = _to_sessions(np.maximum(0.0, pv - load))
+    cap = plugged * float(charger_kw)
+
+    # Zapotrzebowanie sesji: wagi dni tygodnia (dzień sesji = dzień jej startu)
+    days = np.arange(365)
+    weights = np.where((days % 7) >= 5, p["weekend_weight"], p["weekday_weight"])
+    need = max(0.0, float(annual_ev_kwh)) * weights / weights.sum()
+    need = np.minimum(need, cap.sum(axis=1))
+
+    # DUMB: pełna moc od podłączenia
+    dumb = _fill_in_order(need, cap)
+
+    # SMART: nadwyżka PV, a brakująca energia w ostatnich godzinach sesji
+    pv_charge = _fill_in_order(need, np.minimum(surplus, cap))
+    remaining = need - pv_charge.sum(axis=1)
+    grid_charge = _fill_in_order(remaining, (cap - pv_charge)[:, ::-1])[:, ::-1]
+    smart = pv_charge + grid_charge
+
+    tariff = np.asarray(tariff_hourly, dtype=float) if tariff_hourly is not None else np.zeros(HOURS_PER_YEAR)
+    rcem = np.asarray(rcem_hourly, dtype=float) if rcem_hourly is not None else np.zeros(HOURS_PER_YEAR)
+    surplus_flat = _from_sessions(surplus)
+
+    result: Dict[str, Any] = {
+        "pattern":     pattern,
+        "charger_kw":  float(charger_kw),
+        "annual_kwh":  round(float(need.sum()), 1),
+    }
+    profiles: Dict[str, np.ndarray] = {}
+    for name, matrix in (("dumb", dumb), ("smart", smart)):
+        profile = _from_sessions(matrix)
+        from_pv = np.minimum(profile, surplus_flat)
+        from_grid = profile - from_pv
+        profiles[name] = profile
+        result[name] = {
+            "pv_kwh":      round(float(from_pv.sum()), 1),
+            "grid_kwh":    round(float(from_grid.sum()), 1),
+            "pv_share":    round(float(from_pv.sum() / profile.sum()), 3) if profile.sum() > 0 else 0.0,
+            "cost_pln":    round(float((from_grid * tariff).sum() + (from_pv * rcem).sum()), 2),
+        }
+
+    result["smart_value_pln"] = round(result["dumb"]["cost_pln"] - result["smart"]["cost_pln"], 2)
+    result["profiles"] = profiles
+    return result
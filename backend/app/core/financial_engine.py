@@ -6,10 +6,144 @@ POPRAWKI po audycie inżyniera:
 ✅ Dodano wymianę falownika w roku 13 (koszt ~60% ceny początkowej)
 ✅ Dodano opcjonalne dyskontowanie NPV (stopa 5%)
 ✅ Dodano koszty serwisowe (OPEX)
+
+v3.3:
+- cashflow_grid() — przepływy 25-letnie, payback i NPV liczone macierzowo dla
+  dowolnej siatki (inwestycja × oszczędności × degradacja × inflacja × stopa);
+  compute_roi() to cienki widok na 4 przypadki z jednego wywołania
+- compute_roi()["cashflow_series"] — roczne przepływy przypadku bazowego
+  (z OPEX i wymianą falownika); jedyne źródło wykresu 25 lat w API i PDF
+- savings_adjustment / extra_costs — korekty rok po roku (degradacja
+  i wymiana magazynu, app.core.battery_degradation)
 """
 
-from typing import Dict, Any, Optional
-from app.data.equipment import EQUIPMENT_COSTS
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from app.data.equipment_catalog import get_equipment_catalog
+
+# Wymiana falownika: rok i udział ceny początkowej
+INVERTER_REPLACEMENT_YEAR = 13
+INVERTER_REPLACEMENT_SHARE = 0.60
+# Roczne koszty OPEX (serwis, ubezpieczenie) = 0.5% CAPEX
+OPEX_SHARE = 0.005
+
+# (degradacja, inflacja cen energii, inflacja kosztów OPEX)
+ROI_CASES = {
+    "optimistic": (0.004, 0.06, 0.02),
+    "pessimistic": (0.007, 0.02, 0.04),
+}
+
+
+def cashflow_grid(
+    investment: Any,
+    annual_savings_y1: Any,
+    inverter_cost: Any = 0.0,
+    degradation: Any = 0.005,
+    energy_inflation: Any = 0.04,
+    cost_inflation: Any = 0.03,
+    discount_rate: Any = 0.0,
+    horizon: int = 25,
+    opex_base: Any = None,
+    export_savings_y1: Any = 0.0,
+    export_inflation: Any = None,
+    inverter_replacement_year: Any = INVERTER_REPLACEMENT_YEAR,
+    savings_adjustment: Any = 0.0,
+    extra_costs: Any = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Przepływy pieniężne w horyzoncie analizy dla siatki scenariuszy (broadcast NumPy).
+
+    Każdy parametr może być skalarem albo tablicą — wynik ma kształt
+    broadcastu wszystkich parametrów (S,), a krzywe dodatkowo oś lat (S..., horizon).
+    Model roku n (n = 1..horizon), jak dotychczasowa pętla:
+    - oszczędności = savings_y1 × (1 - degradacja)^(n-1) × (1 + inflacja energii)^(n-1)
+    - OPEX = opex_base × (1 + inflacja kosztów)^(n-1); opex_base domyślnie 0.5% inwestycji
+    - export_savings_y1 — część oszczędności z net-billingu (RCEm), rosnąca
+      według export_inflation zamiast inflacji cen detalicznych (None = ta sama)
+    - w roku inverter_replacement_year (domyślnie 13) wymiana falownika (60% ceny początkowej)
+    - savings_adjustment (…, horizon) — zmiana oszczędności roku n w cenach roku 1
+      (np. degradacja baterii), rosnąca jak oszczędności; extra_costs (…, horizon) —
+      dodatkowe nakłady nominalne (np. wymiana magazynu)
+    - przy stopie > 0 przepływ dyskontowany przez (1 + stopa)^(n-1)
+
+    Returns:
+        {
+            "cashflow":      roczne przepływy netto (…, horizon),
+            "cumulative":    skumulowane przepływy (…, horizon),
+            "payback_years": rok zwrotu z interpolacją; horizon, gdy brak zwrotu,
+            "total_pln":     suma przepływów w horyzoncie,
+            "npv_pln":       total_pln - inwestycja,
+        }
+    """
+    if horizon < 1:
+        raise ValueError(f"Horyzont analizy musi wynosić co najmniej 1 rok, otrzymano {horizon}")
+
+    investment = np.asarray(investment, dtype=float)
+    if opex_base is None:
+        opex_base = investment * OPEX_SHARE
+
+    def col(value: Any) -> np.ndarray:
+        return np.asarray(value, dtype=float)[..., None]
+
+    t = np.arange(horizon, dtype=float)  # n - 1
+    degradation_factor = (1 - col(degradation)) ** t
+    savings = (col(annual_savings_y1) + np.asarray(savings_adjustment, dtype=float)) \
+        * degradation_factor * (1 + col(energy_inflation)) ** t
+    if np.any(np.asarray(export_savings_y1) != 0):
+        # Oszczędności w modelu = część detaliczna (savings_y1) + część eksportowa
+        growth = col(energy_inflation if export_inflation is None else export_inflation)
+        savings = savings + col(export_savings_y1) * degradation_factor * (1 + growth) ** t
+    opex = col(opex_base) * (1 + col(cost_inflation)) ** t
+    inverter = col(inverter_cost)
+    replacement = np.where(
+        (t == col(inverter_replacement_year) - 1) & (inverter > 0),
+        inverter * INVERTER_REPLACEMENT_SHARE,
+        0.0,
+    )
+    cashflow = savings - opex - replacement - np.asarray(extra_costs, dtype=float)
+
+    rate = col(discount_rate)
+    cashflow = cashflow / np.where(rate > 0, (1 + rate) ** t, 1.0)
+
+    cumulative = np.cumsum(cashflow, axis=-1)
+    target = col(investment)
+    cashflow, cumulative, target = np.broadcast_arrays(cashflow, cumulative, target)
+
+    # Pierwszy rok, w którym skumulowany przepływ pokrywa inwestycję
+    reached = cumulative >= target
+    year_idx = np.argmax(reached, axis=-1)[..., None]
+    flow = np.take_along_axis(cashflow, year_idx, axis=-1)[..., 0]
+    previous = np.take_along_axis(cumulative, year_idx, axis=-1)[..., 0] - flow
+    fraction = np.divide(target[..., 0] - previous, flow, out=np.zeros_like(flow), where=flow > 0)
+    payback = np.where(reached.any(axis=-1), year_idx[..., 0] + fraction, float(horizon))
+
+    total = cumulative[..., -1]
+    return {
+        "cashflow": cashflow,
+        "cumulative": cumulative,
+        "payback_years": payback,
+        "total_pln": total,
+        "npv_pln": total - target[..., 0],
+    }
+
+
+def cashflow_series(cashflow: np.ndarray, investment: float) -> Dict[str, List[int]]:
+    """
+    Zwarta postać krzywej przepływów jednego scenariusza (API, wykres PDF, frontend).
+
+    Returns:
+        {
+            "cashflow_pln":       roczne przepływy netto [zł] (rok 1..horizon),
+            "cumulative_net_pln": zysk netto narastająco, tj. skumulowane przepływy - inwestycja,
+        }
+    """
+    cumulative_net = np.cumsum(cashflow) - investment
+    return {
+        "cashflow_pln": np.rint(cashflow).astype(int).tolist(),
+        "cumulative_net_pln": np.rint(cumulative_net).astype(int).tolist(),
+    }
 
 
 class FinancialEngine:
@@ -32,14 +166,18 @@ class FinancialEngine:
         panel_model: str,
         inverter_model: str,
         battery_capacity_kwh: Optional[float] = None,
+        battery_price_pln: Optional[float] = None,
     ) -> Dict[str, float]:
         """
         Oblicza CAPEX (koszt brutto) dla instalacji PV + opcjonalnie bateria.
         
         POPRAWKA v3.1 (Problem #7): Marża liczona od NETTO, nie BRUTTO.
+
+        battery_price_pln — cena katalogowa brutto konkretnego modelu (dobór
+        z katalogu, app.core.battery_sizing); bez niej koszt = stawka tieru × kWh.
         """
-        panels_data = EQUIPMENT_COSTS["panels"].get(panel_model, {})
-        panel_unit_price_brutto = panels_data.get("unit_price_pln", 0)
+        catalog = get_equipment_catalog()
+        panel_unit_price_brutto = catalog.panels.price(catalog.panels.id_of(panel_model))
         
         # Problem #7: Marża powinna być liczona od NETTO
         panel_unit_price_netto = panel_unit_price_brutto / 1.23  # Usuń VAT
@@ -48,8 +186,7 @@ class FinancialEngine:
         
         panels_cost = panels_count * panel_unit_price_final
 
-        inverter_data = EQUIPMENT_COSTS["inverters"].get(inverter_model, {})
-        inverter_cost_brutto = inverter_data.get("price_pln", 0)
+        inverter_cost_brutto = catalog.inverters.price(catalog.inverters.id_of(inverter_model))
         
         # Podobnie dla falownika
         inverter_cost_netto = inverter_cost_brutto / 1.23
@@ -62,7 +199,10 @@ class FinancialEngine:
 
         battery_cost_gross_pln = 0.0
         if battery_capacity_kwh and battery_capacity_kwh > 0:
-            battery_cost_gross_pln = self._compute_battery_cost(battery_capacity_kwh)
+            if battery_price_pln is not None:
+                battery_cost_gross_pln = float(self.catalog_price_with_markup(battery_price_pln))
+            else:
+                battery_cost_gross_pln = self._compute_battery_cost(battery_capacity_kwh)
 
         total_cost_gross_pln = pv_cost_gross_pln + battery_cost_gross_pln
 
@@ -73,6 +213,11 @@ class FinancialEngine:
             "inverter_cost_pln": inverter_cost,
         }
 
+    def catalog_price_with_markup(self, price_gross_pln: Any) -> Any:
+        """Cena katalogowa brutto → cena z marżą (marża od netto, jak w compute_capex); skalar lub tablica."""
+        price_netto = np.asarray(price_gross_pln, dtype=float) / 1.23
+        return price_netto * (1 + self.markup_percentage / 100) * 1.23
+
     def _compute_installation_cost(self, panels_count: int) -> float:
         """Oblicza koszt montażu (struktury, kable, praca)."""
         base_costs = {"premium": 6000, "standard": 5000, "economy": 4000}
@@ -98,6 +243,8 @@ class FinancialEngine:
         analysis_horizon_years: int = 25,
         include_npv: bool = False,
         discount_rate: float = 0.05,
+        savings_adjustment_pln: Optional[List[float]] = None,
+        extra_costs_pln: Optional[List[float]] = None,
     ) -> Dict[str, Any]:
         """
         Oblicza ROI (zwrot inwestycji) na podstawie savings z HourlyEngine.
@@ -114,155 +261,65 @@ class FinancialEngine:
             analysis_horizon_years: Horyzont analizy (25 lat)
             include_npv: Czy uwzględnić dyskontowanie NPV
             discount_rate: Stopa dyskontowa (5%/rok)
+            savings_adjustment_pln: Zmiana oszczędności rok po roku (np. degradacja baterii)
+            extra_costs_pln: Dodatkowe nakłady rok po roku (np. wymiana magazynu)
         """
-        payback_baseline = self._compute_payback(
+        # Jedno obliczenie macierzowe dla 4 przypadków: bazowy / optymistyczny /
+        # pesymistyczny (payback) + suma oszczędności (OPEX liczony od oszczędności)
+        baseline = (panel_degradation_rate, energy_inflation_rate, cost_inflation_rate)
+        cases = np.array([baseline, ROI_CASES["optimistic"], ROI_CASES["pessimistic"], baseline])
+        grid = cashflow_grid(
             investment=investment_gross_pln,
             annual_savings_y1=base_annual_savings_pln,
             inverter_cost=inverter_cost_pln,
-            degradation=panel_degradation_rate,
-            energy_inflation=energy_inflation_rate,
-            cost_inflation=cost_inflation_rate,
-            horizon=analysis_horizon_years,
+            degradation=cases[:, 0],
+            energy_inflation=cases[:, 1],
+            cost_inflation=cases[:, 2],
             discount_rate=discount_rate if include_npv else 0.0,
-        )
-
-        payback_optimistic = self._compute_payback(
-            investment=investment_gross_pln,
-            annual_savings_y1=base_annual_savings_pln,
-            inverter_cost=inverter_cost_pln,
-            degradation=0.004,
-            energy_inflation=0.06,
-            cost_inflation=0.02,
             horizon=analysis_horizon_years,
-            discount_rate=discount_rate if include_npv else 0.0,
+            opex_base=np.array([investment_gross_pln] * 3 + [base_annual_savings_pln]) * OPEX_SHARE,
+            savings_adjustment=0.0 if savings_adjustment_pln is None else savings_adjustment_pln,
+            extra_costs=0.0 if extra_costs_pln is None else extra_costs_pln,
         )
+        payback = grid["payback_years"]
 
-        payback_pessimistic = self._compute_payback(
-            investment=investment_gross_pln,
-            annual_savings_y1=base_annual_savings_pln,
-            inverter_cost=inverter_cost_pln,
-            degradation=0.007,
-            energy_inflation=0.02,
-            cost_inflation=0.04,
-            horizon=analysis_horizon_years,
-            discount_rate=discount_rate if include_npv else 0.0,
-        )
+        return {
+            "payback_years": round(float(payback[0]), 1),
+            "payback_optimistic_years": round(float(payback[1]), 1),
+            "payback_pessimistic_years": round(float(payback[2]), 1),
+            "total_savings_25y_pln": round(float(grid["total_pln"][3]), 0),
+            "includes_npv": include_npv,
+            "cashflow_series": cashflow_series(grid["cashflow"][0], investment_gross_pln),
+        }
+
+    def compute_roi_grid(
+        self,
+        investment_gross_pln: Any,
+        base_annual_savings_pln: Any,
+        inverter_cost_pln: Any = 0,
+        panel_degradation_rate: Any = 0.005,
+        energy_inflation_rate: Any = 0.04,
+        cost_inflation_rate: Any = 0.03,
+        discount_rate: Any = 0.0,
+        analysis_horizon_years: int = 25,
+    ) -> Dict[str, np.ndarray]:
+        """
+        ROI dla całej siatki scenariuszy (np. analiza wrażliwości) — patrz cashflow_grid().
 
-        total_savings_25y = self._compute_total_savings_npv(
+        Każdy argument może być skalarem albo tablicą; kształty są broadcastowane,
+        np. investment[:, None, None] × savings[None, :, None] × inflation[None, None, :].
+        """
+        return cashflow_grid(
+            investment=investment_gross_pln,
             annual_savings_y1=base_annual_savings_pln,
             inverter_cost=inverter_cost_pln,
             degradation=panel_degradation_rate,
             energy_inflation=energy_inflation_rate,
             cost_inflation=cost_inflation_rate,
+            discount_rate=discount_rate,
             horizon=analysis_horizon_years,
-            discount_rate=discount_rate if include_npv else 0.0,
         )
 
-        return {
-            "payback_years": round(payback_baseline["years"], 1),
-            "payback_optimistic_years": round(payback_optimistic["years"], 1),
-            "payback_pessimistic_years": round(payback_pessimistic["years"], 1),
-            "total_savings_25y_pln": round(total_savings_25y, 0),
-            "includes_npv": include_npv,
-        }
-
-    def _compute_payback(
-        self,
-        investment: float,
-        annual_savings_y1: float,
-        inverter_cost: float,
-        degradation: float,
-        energy_inflation: float,
-        cost_inflation: float,
-        horizon: int,
-        discount_rate: float = 0.0,
-    ) -> Dict[str, Any]:
-        """
-        Oblicza payback z uwzględnieniem:
-        - Wymiany falownika w roku 13 (60% ceny początkowej)
-        - Kosztów serwisowych OPEX (0.5% CAPEX rocznie)
-        - Opcjonalnie dyskontowania NPV
-        """
-        cumulative = 0.0
-        
-        # Roczne koszty OPEX (serwis, ubezpieczenie) = 0.5% CAPEX
-        base_opex_annual = investment * 0.005
-        
-        for year in range(1, horizon + 1):
-            # Degradacja produkcji
-            degradation_factor = (1 - degradation) ** (year - 1)
-            
-            # Inflacja cen energii
-            inflation_factor = (1 + energy_inflation) ** (year - 1)
-            
-            # Przychody roczne (savings)
-            annual_savings = annual_savings_y1 * degradation_factor * inflation_factor
-            
-            # Koszty OPEX (rosnące z inflacją kosztów)
-            opex_factor = (1 + cost_inflation) ** (year - 1)
-            annual_opex = base_opex_annual * opex_factor
-            
-            # ✅ POPRAWKA: Wymiana falownika w roku 13
-            inverter_replacement_cost = 0.0
-            if year == 13 and inverter_cost > 0:
-                inverter_replacement_cost = inverter_cost * 0.60  # 60% ceny początkowej
-            
-            # Przepływ netto w roku
-            annual_cashflow = annual_savings - annual_opex - inverter_replacement_cost
-            
-            # Dyskontowanie (jeśli NPV włączone)
-            if discount_rate > 0:
-                discount_factor = (1 + discount_rate) ** (year - 1)
-                annual_cashflow = annual_cashflow / discount_factor
-            
-            cumulative += annual_cashflow
-            
-            # Zwrot inwestycji osiągnięty
-            if cumulative >= investment:
-                previous_cumulative = cumulative - annual_cashflow
-                fraction = (investment - previous_cumulative) / annual_cashflow if annual_cashflow > 0 else 0
-                payback_years = (year - 1) + fraction
-                
-                return {"years": payback_years, "cumulative_cashflow": cumulative}
-        
-        return {"years": horizon, "cumulative_cashflow": cumulative}
-
-    def _compute_total_savings_npv(
-        self,
-        annual_savings_y1: float,
-        inverter_cost: float,
-        degradation: float,
-        energy_inflation: float,
-        cost_inflation: float,
-        horizon: int,
-        discount_rate: float = 0.0,
-    ) -> float:
-        """Oblicza sumę oszczędności przez cały horyzont (z opcjonalnym NPV)."""
-        total = 0.0
-        base_opex_annual = annual_savings_y1 * 0.005
-        
-        for year in range(1, horizon + 1):
-            degradation_factor = (1 - degradation) ** (year - 1)
-            inflation_factor = (1 + energy_inflation) ** (year - 1)
-            annual_savings = annual_savings_y1 * degradation_factor * inflation_factor
-            
-            opex_factor = (1 + cost_inflation) ** (year - 1)
-            annual_opex = base_opex_annual * opex_factor
-            
-            inverter_replacement_cost = 0.0
-            if year == 13 and inverter_cost > 0:
-                inverter_replacement_cost = inverter_cost * 0.60
-            
-            annual_cashflow = annual_savings - annual_opex - inverter_replacement_cost
-            
-            if discount_rate > 0:
-                discount_factor = (1 + discount_rate) ** (year - 1)
-                annual_cashflow = annual_cashflow / discount_factor
-            
-            total += annual_cashflow
-            
-        return total
-
     def compute_inverter(self, total_power_kwp: float) -> Dict[str, Any]:
         """Dobiera falownik na podstawie mocy systemu."""
         from app.data.equipment import get_inverter_by_power
@@ -0,0 +1,314 @@
+# backend/app/core/financing.py
+"""
+Finansowanie instalacji — kredyt, leasing, dotacja, ulga termomodernizacyjna.
+
+FinancialEngine.compute_roi zakłada zakup za gotówkę. Tu każda oferta
+finansowania zamieniana jest na miesięczny szereg przepływów netto
+(oszczędności − raty + dotacja + zwrot podatku) w horyzoncie 25 lat:
+
+- miesiąc 0: wkład własny (gotówka: cały CAPEX),
+- raty: annuitet (równe raty) kredytu / leasingu, opcjonalny wykup na końcu,
+- dotacja ("Mój Prąd" itp.) wpływa w miesiącu subsidy_month,
+- ulga termomodernizacyjna: odliczenie (CAPEX − dotacja, max
+  THERMO_RELIEF_LIMIT_PLN) × stawka PIT, zwrot w miesiącu tax_relief_month,
+- oszczędności: roczne przepływy z cashflow_grid (degradacja, inflacja,
+  OPEX, wymiana falownika, korekty magazynu jak w compute_roi) rozłożone
+  równo na 12 miesięcy.
+
+Wszystkie oferty × wszystkie tiery liczone są jako jedna tablica
+(oferty, tiery, miesiące); IRR rozwiązywany wektorowo (Newton, dla
+niezbieżnych elementów bisekcja) — tylko dla szeregów z jednoznaczną stopą.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.core.financial_engine import cashflow_grid
+
+# Ulga termomodernizacyjna — limit odliczenia na podatnika [PLN]
+THERMO_RELIEF_LIMIT_PLN = 53_000.0
+HORIZON_YEARS_DEFAULT = 25
+DISCOUNT_RATE_DEFAULT = 0.05
+
+_IRR_NEWTON_ITER = 50
+_IRR_BISECT_ITER = 60
+_IRR_TOL = 1e-9
+# Przedział stopy na okres (−50% … +100% miesięcznie) — bez przepełnień (1.5^-300 / 2^300)
+_IRR_BRACKET = (-0.5, 1.0)
+
+
+@dataclass(frozen=True)
+class FinancingOffer:
+    """Jedna oferta finansowania (stopy roczne, okresy w miesiącach)."""
+    name: str = "gotówka"
+    down_payment_share: float = 1.0     # 1.0 = zakup za gotówkę
+    annual_rate: float = 0.0            # oprocentowanie nominalne kredytu / leasingu
+    term_months: int = 0
+    residual_share: float = 0.0         # wykup na końcu (leasing), udział CAPEX
+    subsidy_pln: float = 0.0
+    subsidy_month: int = 6
+    tax_rate: float = 0.0               # stawka PIT dla ulgi (0.12 / 0.32 / 0.19); 0 = bez ulgi
+    tax_relief_month: int = 16          # rozliczenie roczne PIT (kwiecień kolejnego roku)
+
+    def __post_init__(self):
+        if not 0 <= self.down_payment_share <= 1:
+            raise ValueError(f"{self.name}: down_payment_share musi być z zakresu 0..1")
+        if not 0 <= self.residual_share <= 1 - self.down_payment_share:
+            raise ValueError(f"{self.name}: residual_share nie może przekraczać finansowanej części")
+        if self.down_payment_share < 1 and self.term_months < 1:
+            raise ValueError(f"{self.name}: finansowanie wymaga term_months >= 1")
+        if self.annual_rate < 0 or self.subsidy_pln < 0 or not 0 <= self.tax_rate < 1:
+            raise ValueError(f"{self.name}: ujemna stopa / dotacja albo niepoprawna stawka PIT")
+
+
+def annuity_payment(principal: Any, annual_rate: Any, term_months: Any) -> np.ndarray:
+    """Rata annuitetowa (równa) — broadcast po argumentach; stopa 0 → principal / n."""
+    principal = np.asarray(principal, dtype=float)
+    r = np.asarray(annual_rate, dtype=float) / 12
+    n = np.maximum(np.asarray(term_months, dtype=float), 1.0)
+    safe_r = np.where(r > 0, r, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payment = principal * safe_r / (1 - (1 + safe_r) ** -n)
+    return np.where(r > 0, payment, principal / n)
+
+
+def npv(cashflows: Any, rate: Any) -> np.ndarray:
+    """NPV szeregu (…, n) przy stopie na okres (broadcast po osiach wiodących)."""
+    flows = np.asarray(cashflows, dtype=float)
+    t = np.arange(flows.shape[-1])
+    rate = np.asarray(rate, dtype=float)[..., None]
+    return (flows / (1 + rate) ** t).sum(axis=-1)
+
+
+def _sign_changes(flat: np.ndarray) -> np.ndarray:
+    """Liczba zmian znaku w każdym wierszu (…, n) — zera pomijane."""
+    sign = np.sign(flat)
+    positions = np.arange(flat.shape[1])
+    last_nonzero = np.maximum.accumulate(np.where(sign != 0, positions, 0), axis=1)
+    filled = np.take_along_axis(sign, last_nonzero, axis=1)
+    return (filled[:, 1:] * filled[:, :-1] < 0).sum(axis=1)
+
+
+def irr(cashflows: Any) -> np.ndarray:
+    """
+    Wewnętrzna stopa zwrotu na okres dla każdego szeregu (…, n) — wektorowo.
+
+    Liczona tylko, gdy stopa jest jednoznaczna: jedna zmiana znaku przepływów
+    (reguła Kartezjusza) albo przepływów skumulowanych (kryterium Norströma).
+    Inne szeregi (np. leasing bez wkładu z dotacją: +, −…, +…) mogą mieć
+    kilka pierwiastków albo żadnego → NaN.
+
+    Newton z punktu 1%/okres (iteracje tylko dla jeszcze niezbieżnych
+    szeregów); pozostałe rozwiązywane bisekcją na _IRR_BRACKET.
+    Brak zmiany znaku NPV na przedziale (np. same wpływy) → NaN.
+    """
+    flows = np.asarray(cashflows, dtype=float)
+    lead = flows.shape[:-1]
+    flat = flows.reshape(-1, flows.shape[-1])
+    t = np.arange(flat.shape[1])
+    low, high = _IRR_BRACKET
+    unique = (_sign_changes(flat) == 1) | (_sign_changes(np.cumsum(flat, axis=1)) == 1)
+
+    def f(sub: np.ndarray, rate: np.ndarray) -> np.ndarray:
+        return (sub * (1 + rate[:, None]) ** -t).sum(axis=1)
+
+    rate = np.full(flat.shape[0], 0.01)
+    active = np.ones(flat.shape[0], dtype=bool)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(_IRR_NEWTON_ITER):
+            if not active.any():
+                break
+            sub, r = flat[active], rate[active]
+            disc = (1 + r[:, None]) ** -t
+            value = (sub * disc).sum(axis=1)
+            slope = (-t * sub * disc).sum(axis=1) / (1 + r)
+            step = value / slope
+            new = r - step
+            rate[active] = new
+            still = np.isfinite(new) & (new > low) & (new < high) & ~(np.abs(step) < _IRR_TOL)
+            active[active] = still
+
+        scale = np.maximum(1.0, np.abs(flat).sum(axis=1))
+        converged = np.isfinite(rate) & (rate > low) & (rate < high)
+        converged[converged] = np.abs(f(flat[converged], rate[converged])) <= _IRR_TOL * scale[converged]
+
+        rest = ~converged
+        if rest.any():
+            sub = flat[rest]
+            lo = np.full(sub.shape[0], low)
+            hi = np.full(sub.shape[0], high)
+            f_lo = f(sub, lo)
+            bracketed = np.sign(f_lo) * np.sign(f(sub, hi)) < 0
+            for _ in range(_IRR_BISECT_ITER):
+                mid = (lo + hi) / 2
+                f_mid = f(sub, mid)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(left, mid, lo)
+                f_lo = np.where(left, f_mid, f_lo)
+                hi = np.where(left, hi, mid)
+            rate[rest] = np.where(bracketed, (lo + hi) / 2, np.nan)
+    rate[~unique] = np.nan
+    return rate.reshape(lead)
+
+
+def financing_cashflows(
+    offers: Sequence[FinancingOffer],
+    investment_pln: Any,
+    annual_savings_pln: Any,
+    inverter_cost_pln: Any = 0.0,
+    horizon_years: int = HORIZON_YEARS_DEFAULT,
+    export_savings_pln: Any = 0.0,
+    savings_adjustment_pln: Any = 0.0,
+    extra_costs_pln: Any = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Miesięczne przepływy netto dla ofert (O) × instalacji (T).
+
+    investment_pln, annual_savings_pln, inverter_cost_pln, export_savings_pln
+    (część oszczędności z net-billingu): wektory (T,) — np. tiery.
+    savings_adjustment_pln, extra_costs_pln: (T, horizon) — degradacja
+    i wymiana magazynu (battery_degradation), jak w FinancialEngine.compute_roi.
+    Zwraca tablice (O, T, 12 × horizon + 1); indeks 0 = moment zakupu.
+    """
+    if not offers:
+        raise ValueError("Brak ofert finansowania")
+    investment = np.atleast_1d(np.asarray(investment_pln, dtype=float))
+    savings = np.atleast_1d(np.asarray(annual_savings_pln, dtype=float))
+    inverter = np.atleast_1d(np.asarray(inverter_cost_pln, dtype=float))
+    export = np.atleast_1d(np.asarray(export_savings_pln, dtype=float))
+    investment, savings, inverter, export = np.broadcast_arrays(investment, savings, inverter, export)
+    export = np.clip(export, 0.0, np.maximum(savings, 0.0))    # jak simulate_roi_distribution
+    n_months = 12 * horizon_years + 1
+
+    # Oszczędności netto (OPEX, wymiana falownika i magazynu) — rok po roku, /12 na miesiąc
+    yearly = cashflow_grid(
+        investment=investment,
+        annual_savings_y1=savings - export,
+        export_savings_y1=export,
+        inverter_cost=inverter,
+        horizon=horizon_years,
+        savings_adjustment=savings_adjustment_pln,
+        extra_costs=extra_costs_pln,
+    )["cashflow"]                                                    # (T, lata)
+    operating = np.zeros((investment.size, n_months))
+    operating[:, 1:] = np.repeat(yearly / 12, 12, axis=1)
+
+    def vec(field: str) -> np.ndarray:
+        return np.array([getattr(o, field) for o in offers], dtype=float)[:, None]
+
+    down = vec("down_payment_share") * investment                      # (O, T)
+    principal = investment - down
+    residual = vec("residual_share") * investment
+    term = vec("term_months")
+    rate = vec("annual_rate")
+    # Annuitet spłacający principal do wartości wykupu (residual płatny osobno)
+    r = rate / 12
+    discounted_residual = np.where(r > 0, residual / (1 + r) ** term, residual)
+    payment = annuity_payment(principal - discounted_residual, rate, term)
+    payment = np.where(principal > 0, payment, 0.0)
+
+    months = np.arange(n_months)
+    in_term = (months >= 1) & (months <= term[..., None])             # (O, 1, M)
+    financing = -payment[..., None] * in_term
+    financing[..., 0] -= down
+    buyout = (months == np.minimum(term, n_months - 1)[..., None]) & (principal[..., None] > 0)
+    financing -= residual[..., None] * buyout
+
+    subsidy = np.minimum(vec("subsidy_pln"), investment)
+    relief = np.minimum(investment - subsidy, THERMO_RELIEF_LIMIT_PLN) * vec("tax_rate")
+    subsidy_month = np.clip(vec("subsidy_month"), 0, n_months - 1).astype(int)
+    relief_month = np.clip(vec("tax_relief_month"), 0, n_months - 1).astype(int)
+    grants = (
+        subsidy[..., None] * (months == subsidy_month[..., None])
+        + relief[..., None] * (months == relief_month[..., None])
+    )
+
+    net = operating[None, :, :] + financing + grants
+    return {
+        "net": net,
+        "operating": np.broadcast_to(operating, net.shape),
+        "financing": financing,
+        "grants": grants,
+        "monthly_payment": payment,
+        "total_interest": payment * term + residual - principal,
+        "subsidy": subsidy,
+        "tax_relief": relief,
+    }
+
+
+def evaluate_financing(
+    offers: Sequence[FinancingOffer],
+    installations: Sequence[Dict[str, Any]],
+    discount_rate: float = DISCOUNT_RATE_DEFAULT,
+    horizon_years: int = HORIZON_YEARS_DEFAULT,
+    include_monthly: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Porównanie ofert × instalacji (np. tierów scenariusza).
+
+    installations: [{"name", "investment_pln", "annual_savings_pln", "inverter_cost_pln",
+                     "export_savings_pln", "savings_adjustment_pln", "extra_costs_pln"}, ...]
+                   — format scenario_roi_inputs; pola korekt opcjonalne
+    Zwraca listę (oferta × instalacja): IRR roczne, NPV, rata, miesiąc
+    wyjścia na plus (skumulowany przepływ >= 0 na stałe), przepływ
+    miesięczny w 1. roku, koszt odsetek, dotacja i ulga.
+    """
+    if not installations:
+        raise ValueError("Brak instalacji do porównania")
+
+    def yearly(field: str) -> np.ndarray:
+        # Brak korekty = zera; lista musi mieć horizon_years wartości
+        rows = []
+        for inst in installations:
+            values = np.asarray(inst.get(field) or 0.0, dtype=float)
+            if values.ndim and values.shape != (horizon_years,):
+                raise ValueError(f"{field} musi mieć {horizon_years} wartości, otrzymano {values.size}")
+            rows.append(np.broadcast_to(values, (horizon_years,)))
+        return np.array(rows)
+
+    flows = financing_cashflows(
+        offers,
+        investment_pln=[i["investment_pln"] for i in installations],
+        annual_savings_pln=[i["annual_savings_pln"] for i in installations],
+        inverter_cost_pln=[i.get("inverter_cost_pln", 0.0) for i in installations],
+        horizon_years=horizon_years,
+        export_savings_pln=[i.get("export_savings_pln", 0.0) for i in installations],
+        savings_adjustment_pln=yearly("savings_adjustment_pln"),
+        extra_costs_pln=yearly("extra_costs_pln"),
+    )
+    net = flows["net"]
+    monthly_irr = irr(net)
+    annual_irr = (1 + monthly_irr) ** 12 - 1
+    monthly_rate = (1 + discount_rate) ** (1 / 12) - 1
+    npv_pln = npv(net, monthly_rate)
+
+    cumulative = np.cumsum(net, axis=-1)
+    # Ostatni miesiąc z ujemnym saldem → wyjście na plus w następnym
+    negative = cumulative < 0
+    last_negative = net.shape[-1] - 1 - np.argmax(negative[..., ::-1], axis=-1)
+    break_even = np.where(negative.any(axis=-1), last_negative + 1, 0)
+    break_even = np.where(negative[..., -1], -1, break_even)
+
+    results = []
+    for o, offer in enumerate(offers):
+        for t, inst in enumerate(installations):
+            row = {
+                "offer": offer.name,
+                "installation": inst.get("name", str(t)),
+                "irr_annual": None if np.isnan(annual_irr[o, t]) else round(float(annual_irr[o, t]), 4),
+                "npv_pln": round(float(npv_pln[o, t]), 0),
+                "monthly_payment_pln": round(float(flows["monthly_payment"][o, t]), 2),
+                "total_interest_pln": round(float(flows["total_interest"][o, t]), 0),
+                "subsidy_pln": round(float(flows["subsidy"][o, t]), 0),
+                "tax_relief_pln": round(float(flows["tax_relief"][o, t]), 0),
+                "upfront_pln": round(float(-net[o, t, 0]), 0) + 0.0,   # bez "-0.0" przy braku wkładu
+                "first_year_monthly_net_pln": round(float(net[o, t, 1:13].mean()), 2),
+                "break_even_month": None if break_even[o, t] < 0 else int(break_even[o, t]),
+                "cumulative_25y_pln": round(float(cumulative[o, t, -1]), 0),
+            }
+            if include_monthly:
+                row["monthly_net_pln"] = np.round(net[o, t], 2).tolist()
+            results.append(row)
+    return results
@@ -1,6 +1,19 @@
 # backend/app/core/hourly_engine.py
 """
-HourlyEngine v3.2 — ŹRÓDŁO PRAWDY dla rocznych oszczędności.
+HourlyEngine v3.3 — ŹRÓDŁO PRAWDY dla rocznych oszczędności.
+
+v3.3:
+✅ Krok symulacji 60 lub 15 minut (8760 / 35040 kroków) — bilans wektorowy (NumPy)
+✅ SOC baterii jako obcięta suma skumulowana (battery_kernels.soc_path) — bez pętli po krokach
+✅ Wyniki (profile, SOC, wykresy) zawsze agregowane do godzin
+✅ Utracony depozyt z rejestru transz FIFO (deposit_ledger) na horyzoncie 25 lat
+✅ run_price_ensemble — rozkład oszczędności (mean / P10 / P90) dla N ścieżek cen naraz
+✅ Taryfa dynamiczna (tariff_hourly, 8760 cen zakupu) — wartości jako iloczyny godzinowe
+✅ Limit eksportu (export_limit_kw, 0 = zero-export) — obcięcie po baterii, raport miesięczny
+✅ run_variant_batch — K wariantów (mnożniki produkcji, zużycia, baterii, cen) w jednym przebiegu
+✅ run_battery_sweep — K baterii (np. cały katalog) w jednym przebiegu (soc_path_batch)
+✅ battery_config["dispatch"] = "optimal" / "forecast" — plan dobowy z programowania
+   dynamicznego (battery_dispatch); run_dispatch_comparison — wartość ponad zachłanny
 
 Poprawki v3.2:
 ✅ Realistyczny profil zużycia — szczyt wieczorny, nie dzienny
@@ -11,9 +24,19 @@ Poprawki v3.2:
 ✅ batteryCharge / batteryDischarge zawsze >= 0
 """
 
-from typing import Dict, Any, List, Optional
-import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
 
+from app.core.battery_dispatch import (
+    FORECAST_NOISE_DEFAULT,
+    SOC_LEVELS_DEFAULT,
+    forecast_prices,
+    optimal_daily_dispatch,
+)
+from app.core.battery_kernels import soc_path, soc_path_batch, soc_flows
+from app.core.deposit_ledger import HORIZON_YEARS_DEFAULT, REFUND_LIMIT_DEFAULT, deposit_horizon
+from app.data.tariff_catalog import get_tariff
 from app.data.usage_profiles import (
     PERSON_TYPES,
     HOUSEHOLD_SIZE_MULTIPLIER,
@@ -21,6 +44,23 @@ from app.data.usage_profiles import (
     WEEKEND_MULTIPLIER_EVENING,
 )
 
+# Sterowanie baterią: zachłanne (domyślne) albo plan dobowy z battery_dispatch
+DISPATCH_MODES = ("greedy", "optimal", "forecast")
+# Doba planowania 08:00 → 08:00: ładowanie w dzień, rozładowanie wieczorem, w nocy i rano
+DISPATCH_DAY_START_HOUR = 8
+
+
+def _dispatch_settings(battery_config: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Ustawienia wyznaczające plan sterowania (prognoza: także błąd i seed)."""
+    dispatch = battery_config.get("dispatch", "greedy")
+    if dispatch != "forecast":
+        return (dispatch,)
+    return (
+        dispatch,
+        battery_config.get("forecast_noise", FORECAST_NOISE_DEFAULT),
+        battery_config.get("forecast_seed", 0),
+    )
+
 
 class HourlyEngine:
 
@@ -34,16 +74,47 @@ class HourlyEngine:
         tariff_zones: Optional[Dict[int, float]] = None,
         battery_config: Optional[Dict[str, Any]] = None,
         heating_kwh: float = 0.0,
-        cooling_kwh: float = 0.0
+        cooling_kwh: float = 0.0,
+        heating_profile: Optional[List[float]] = None,
+        cooling_profile: Optional[List[float]] = None,
+        ev_config: Optional[Dict[str, Any]] = None,
+        measured_profile: Optional[List[float]] = None,
+        timestep_minutes: int = 60,
+        refund_limit: float = REFUND_LIMIT_DEFAULT,
+        tariff_hourly: Optional[List[float]] = None,
+        export_limit_kw: Optional[float] = None,
     ):
         self.annual_production_kwh = annual_production_kwh
         self.annual_consumption_kwh = annual_consumption_kwh
         self.electricity_tariff = electricity_tariff_pln_per_kwh
         self.rcem_hourly = rcem_hourly
+        # Widok NumPy (bez kopii dla get_rcem_array) i średnia liczona raz
+        self.rcem = np.asarray(rcem_hourly, dtype=float)
+        self.rcem_avg = float(self.rcem.mean()) if self.rcem.size else 0.0
         self.tariff_type = tariff_type
         self.battery_config = battery_config or {}
         self.heating_kwh = heating_kwh
         self.cooling_kwh = cooling_kwh
+        # Godzinowe kształty z modelu stopniogodzin (app.core.thermal_load)
+        self.heating_profile = heating_profile
+        self.cooling_profile = cooling_profile
+        # Ładowanie EV (app.core.ev_charging) — część annual_consumption_kwh
+        self.ev_config = ev_config or {}
+        # (nie więcej niż całe zużycie — profil sumuje się do annual_consumption_kwh)
+        self.ev_kwh = min(float(self.ev_config.get("annual_kwh", 0) or 0), max(annual_consumption_kwh, 0.0))
+        # Zmierzony profil z licznika (app.core.meter_data) — baza zamiast modelu behawioralnego
+        self.measured_profile = measured_profile
+
+        # Krok symulacji: 60 min (8760) lub 15 min (35040 — rozliczenie kwadransowe)
+        if timestep_minutes not in (60, 15):
+            raise ValueError(f"timestep_minutes musi wynosić 60 lub 15, otrzymano {timestep_minutes}")
+        self.timestep_minutes = timestep_minutes
+        # Zwrot niewykorzystanego depozytu po 12 mies.: 0.20 lub 0.30 wartości transzy
+        self.refund_limit = refund_limit
+        # Limit oddawania do sieci [kW]: None = bez limitu, 0 = zero-export
+        if export_limit_kw is not None and export_limit_kw < 0:
+            raise ValueError(f"export_limit_kw nie może być ujemny, otrzymano {export_limit_kw}")
+        self.export_limit_kw = export_limit_kw
 
         self.household_size = self.battery_config.get("household_size", 3)
         self.people_home_weekday = self.battery_config.get("people_home_weekday", 1)
@@ -56,155 +127,120 @@ class HourlyEngine:
         else:
             self.tariff_zones = {h: electricity_tariff_pln_per_kwh for h in range(24)}
 
-        from app.data.energy_rates import decompose_electricity_tariff
+        # Taryfa dynamiczna: pełna cena zakupu dla każdej godziny (zastępuje strefy)
+        self.tariff_vector: Optional[np.ndarray] = None
+        if tariff_hourly is not None:
+            self.tariff_vector = np.asarray(tariff_hourly, dtype=float)
+            if self.tariff_vector.shape != (8760,):
+                raise ValueError(f"tariff_hourly must have 8760 values, got {self.tariff_vector.size}")
+
         op = self.battery_config.get("operator", "pge")
-        self.tariff_components = decompose_electricity_tariff(operator=op, tariff=tariff_type)
+        self.tariff_components = get_tariff(op, tariff_type).components()
+        if self.tariff_vector is not None:
+            # Dystrybucja i opłaty z taryfy operatora, energia = reszta średniej ceny godzinowej
+            mean_price = float(self.tariff_vector.mean())
+            distribution = self.tariff_components["distribution_pln_per_kwh"]
+            self.tariff_components = {
+                "energy_pln_per_kwh": round(mean_price - distribution, 4),
+                "distribution_pln_per_kwh": distribution,
+                "total_variable_pln_per_kwh": round(mean_price, 4),
+                "total_pln_per_kwh": round(mean_price, 4),
+            }
 
 
     def run_hourly_simulation(
         self,
         production_profile: Optional[List[float]] = None,
         consumption_profile: Optional[List[float]] = None,
+        dispatch_comparison: bool = False,
     ) -> Dict[str, Any]:
+        """
+        Symulacja roczna w kroku self.timestep_minutes (60 → 8760, 15 → 35040 kroków).
+
+        Bilans liczony wektorowo (NumPy); jedyna zależność sekwencyjna — SOC
+        baterii — to obcięta suma skumulowana (battery_kernels.soc_path).
+        Profile wynikowe i wykresy są zawsze agregowane do godzin.
+        dispatch_comparison=True dokłada wynik run_dispatch_comparison na tych
+        samych profilach (bez ponownego liczenia planu bieżącego trybu).
+        """
+        sph = self.steps_per_hour
 
         if production_profile is None:
             production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+
+        ev_summary: Optional[Dict[str, Any]] = None
         if consumption_profile is None:
             consumption_profile = self._generate_consumption_profile()
-
-        if len(production_profile) != 8760 or len(consumption_profile) != 8760:
-            raise ValueError("Profile muszą mieć 8760 wartości")
+            if self.ev_kwh > 0:
+                consumption_profile, ev_summary = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
 
         # Zabezpieczenie przed brakiem produkcji (np. 0 paneli)
-        total_production = sum(production_profile)
+        total_production = float(production.sum())
         if total_production <= 0:
             # Zwracamy pusty wynik, aby system się nie zawiesił
-            return self._generate_empty_result(consumption_profile)
+            result = self._generate_empty_result(self._to_hourly(consumption).tolist())
+            result["ev_charging"] = ev_summary
+            return result
 
-        # ── Parametry baterii ─────────────────────────────────────────────────
-        battery_soc_kwh    = 0.0
-        battery_capacity   = float(self.battery_config.get("capacity_kwh", 0) or 0)
-        battery_power      = float(self.battery_config.get("power_kw",     0) or 0)
-        battery_efficiency = float(self.battery_config.get("efficiency", 0.95) or 0.95)
-        has_battery        = battery_capacity > 0 and battery_power > 0
+        battery_capacity = float(self.battery_config.get("capacity_kwh", 0) or 0)
+        flows = self._energy_flows(production, consumption)
+        autoconsumption = flows["autoconsumption"]
+        surplus, deficit = flows["surplus"], flows["deficit"]
+        charge, discharge, soc = flows["charge"], flows["discharge"], flows["soc"]
+        curtailed = flows["curtailed"]
+        charge_from_export = flows["charge_from_export"]
 
-        # ── Akumulatory energii ───────────────────────────────────────────────
-        total_autoconsumption_kwh     = 0.0
-        total_surplus_kwh             = 0.0
-        total_grid_import_kwh         = 0.0
-        total_battery_stored_kwh      = 0.0
-        total_battery_discharged_kwh  = 0.0
+        # ── Osie czasu (krok → godzina, miesiąc, cena) ───────────────────────
+        n_steps     = production.size
+        hour        = np.arange(n_steps) // sph
+        month_idx   = np.minimum(11, hour // 24 // 30)          # przybliżenie 30-dniowe (v3.2)
+        rcem        = self.rcem if sph == 1 else np.repeat(self.rcem, sph)
+        tariff      = self._tariff_hourly()[hour]
 
-        # ── Akumulatory finansowe ─────────────────────────────────────────────
-        total_autoconsumption_value           = 0.0
-        total_net_billing_value               = 0.0
-        total_battery_discharge_benefit       = 0.0
-        total_battery_charge_opportunity_cost = 0.0
-        total_grid_import_cost                = 0.0
+        surplus_value = surplus * rcem
 
-        monthly_surplus_kwh   = {i: 0.0 for i in range(1, 13)}
-        monthly_surplus_value = {i: 0.0 for i in range(1, 13)}
+        # ── Akumulatory energii i finansowe ───────────────────────────────────
+        total_autoconsumption_kwh             = float(autoconsumption.sum())
+        total_surplus_kwh                     = float(surplus.sum())
+        total_grid_import_kwh                 = float(deficit.sum())
+        total_battery_stored_kwh              = float(charge.sum())
+        total_battery_discharged_kwh          = float(discharge.sum())
+        total_autoconsumption_value           = float((autoconsumption * tariff).sum())
+        total_net_billing_value               = float(surplus_value.sum())
+        total_battery_discharge_benefit       = float((discharge * tariff).sum())
+        total_battery_charge_opportunity_cost = float((charge_from_export * rcem).sum())
 
-        battery_soc_history: List[float]   = []
-        summer_chart_data: List[Dict] = []
-        winter_chart_data: List[Dict] = []
+        monthly_kwh   = np.bincount(month_idx, weights=surplus, minlength=12)
+        monthly_value = np.bincount(month_idx, weights=surplus_value, minlength=12)
+        monthly_surplus_kwh   = {i + 1: float(monthly_kwh[i]) for i in range(12)}
+        monthly_surplus_value = {i + 1: float(monthly_value[i]) for i in range(12)}
+        monthly_curtailed     = np.bincount(month_idx, weights=curtailed, minlength=12)
 
-        energy_rate       = self.tariff_components["energy_pln_per_kwh"]
-        distribution_rate = self.tariff_components["distribution_pln_per_kwh"]
+        # ── Agregacja do godzin (profile, SOC na koniec godziny, wykresy) ────
+        pv_h        = self._to_hourly(production)
+        load_h      = self._to_hourly(consumption)
+        charge_h    = self._to_hourly(charge)
+        discharge_h = self._to_hourly(discharge)
+        deficit_h   = self._to_hourly(deficit)
+        soc_h       = soc.reshape(8760, sph)[:, -1]
+
+        battery_soc_history = np.round(soc_h, 4).tolist()
 
         SUMMER_START = 4032
         WINTER_START = 336
-        # =====================================================================
-        # SYMULACJA GODZINOWA (8760 iteracji)
-        # =====================================================================
-        for hour in range(8760):
-
-            pv_kwh   = production_profile[hour]
-            load_kwh = consumption_profile[hour]
-
-            hour_of_day      = hour % 24
-            month            = min(12, (hour // 24 // 30) + 1)
-            rcem_this_hour   = self.rcem_hourly[hour]
-            tariff_this_hour = self.tariff_zones.get(hour_of_day, self.electricity_tariff)
-
-            balance = pv_kwh - load_kwh
-
-            # Zmienne kroku — zawsze startują od 0, nigdy jednocześnie > 0
-            charge_kwh    = 0.0
-            discharge_kwh = 0.0
-            deficit_kwh   = 0.0
-
-            # ── NADWYŻKA PV ───────────────────────────────────────────────────
-            if balance >= 0:
-                autoconsumption_kwh = load_kwh
-                surplus_kwh         = balance
-
-                total_autoconsumption_value += autoconsumption_kwh * tariff_this_hour
-
-                # Ładowanie baterii z nadwyżki — discharge_kwh zostaje 0
-                if has_battery and battery_soc_kwh < battery_capacity:
-                    room_kwh   = battery_capacity - battery_soc_kwh
-                    # Ograniczenie: moc, dostępna nadwyżka, wolne miejsce (z uwzgl. strat)
-                    max_charge = min(surplus_kwh, battery_power, room_kwh / battery_efficiency)
-                    charge_kwh = max(0.0, max_charge)
-
-                    battery_soc_kwh = min(
-                        battery_capacity,
-                        battery_soc_kwh + charge_kwh * battery_efficiency
-                    )
-                    total_battery_stored_kwh              += charge_kwh
-                    total_battery_charge_opportunity_cost += charge_kwh * rcem_this_hour
-                    surplus_kwh -= charge_kwh
-
-                surplus_value = surplus_kwh * rcem_this_hour
-                total_net_billing_value      += surplus_value
-                total_surplus_kwh            += surplus_kwh
-                monthly_surplus_kwh[month]   += surplus_kwh
-                monthly_surplus_value[month] += surplus_value
-                total_autoconsumption_kwh    += autoconsumption_kwh
-
-            # ── NIEDOBÓR ENERGII ──────────────────────────────────────────────
-            else:
-                autoconsumption_kwh = pv_kwh
-                deficit_kwh         = abs(balance)
-
-                total_autoconsumption_value += autoconsumption_kwh * tariff_this_hour
-
-                # Rozładowanie baterii — charge_kwh zostaje 0
-                if has_battery and battery_soc_kwh > 0:
-                    max_discharge = min(deficit_kwh, battery_power, battery_soc_kwh)
-                    discharge_kwh = max(0.0, max_discharge)
-
-                    battery_soc_kwh = max(0.0, battery_soc_kwh - discharge_kwh)
-                    total_battery_discharged_kwh    += discharge_kwh
-                    total_battery_discharge_benefit += discharge_kwh * tariff_this_hour
-                    deficit_kwh                     -= discharge_kwh
-
-                deficit_kwh = max(0.0, deficit_kwh)
-
-                total_grid_import_kwh  += deficit_kwh
-                total_grid_import_cost += deficit_kwh * tariff_this_hour
-                total_autoconsumption_kwh += autoconsumption_kwh
-
-            # ── SOC zapisywany CO GODZINĘ — poza if/else ─────────────────────
-            battery_soc_history.append(round(battery_soc_kwh, 4))
-
-
-            # ── Zapis do wykresów sezonowych (v3.7) ───────────────────────────
-            chart_entry = {
-                "hour": f"{hour_of_day:02d}:00",
-                "pv": round(pv_kwh, 3),
-                "consumption": round(load_kwh, 3),
-                "batteryCharge": round(charge_kwh, 3),
-                "batteryDischarge": round(discharge_kwh, 3),
-                "gridImport": round(deficit_kwh, 3),
-                "soc": round(battery_soc_kwh / battery_capacity * 100, 1) if battery_capacity > 0 else 0
-            }
+        summer_chart_data = self._chart_day(
+            SUMMER_START, pv_h, load_h, charge_h, discharge_h, deficit_h, soc_h, battery_capacity
+        )
+        winter_chart_data = self._chart_day(
+            WINTER_START, pv_h, load_h, charge_h, discharge_h, deficit_h, soc_h, battery_capacity
+        )
 
-            if SUMMER_START <= hour < SUMMER_START + 24:
-                summer_chart_data.append(chart_entry)
-            elif WINTER_START <= hour < WINTER_START + 24:
-                winter_chart_data.append(chart_entry)
+        energy_rate       = self.tariff_components["energy_pln_per_kwh"]
+        distribution_rate = self.tariff_components["distribution_pln_per_kwh"]
 
         # =====================================================================
         # FINALIZACJA FINANSOWA
@@ -212,15 +248,19 @@ class HourlyEngine:
         autoconsumption_value_pln = total_autoconsumption_value
         net_billing_value_pln     = total_net_billing_value
 
-        lost_deposit_pln = 0.0
-        refund_20pct_pln = 0.0
-        if total_surplus_kwh > self.annual_consumption_kwh:
-            unused_kwh       = total_surplus_kwh - self.annual_consumption_kwh
-            avg_rcem         = sum(self.rcem_hourly) / len(self.rcem_hourly)
-            unused_value     = unused_kwh * avg_rcem
-            refund_20pct_pln = unused_value * 0.20
-            lost_deposit_pln = unused_value * 0.80
-            net_billing_value_pln -= lost_deposit_pln
+        # Depozyt: transze FIFO ważne 12 mies., rozliczane ze składnika energii
+        # w imporcie (udział energy_rate w średniej taryfie, wg stref godzinowych);
+        # rok typowy powtórzony na horyzoncie, strata = średnia roczna
+        energy_share = energy_rate / self._tariff_hourly().mean()
+        monthly_import_cost = np.bincount(month_idx, weights=deficit * tariff * energy_share, minlength=12)
+        deposit = deposit_horizon(
+            monthly_value, monthly_import_cost,
+            years=HORIZON_YEARS_DEFAULT,
+            refund_limit=self.refund_limit,
+        )
+        lost_deposit_pln = float(deposit["lost"].mean())
+        refund_20pct_pln = float(deposit["refund"].mean())
+        net_billing_value_pln -= lost_deposit_pln
 
         distribution_cost_pln = total_grid_import_kwh * distribution_rate
         battery_benefit_pln   = (
@@ -230,8 +270,7 @@ class HourlyEngine:
             autoconsumption_value_pln + net_billing_value_pln + battery_benefit_pln
         )
 
-        total_production  = sum(production_profile)
-        total_consumption = sum(consumption_profile)
+        total_consumption = float(consumption.sum())
 
         # Suma energii, która nie opuściła domu (zużyta od razu + zużyta z baterii)
         total_internal_usage_kwh = total_autoconsumption_kwh + total_battery_discharged_kwh
@@ -249,7 +288,7 @@ class HourlyEngine:
             net_billing_value_pln / total_surplus_kwh if total_surplus_kwh > 0 else 0.0
         )
 
-        return {
+        result = {
             "annual_cashflow": {
                 "autoconsumption_pln":              round(autoconsumption_value_pln, 2),
                 "net_billing_pln":                  round(net_billing_value_pln, 2),
@@ -269,8 +308,8 @@ class HourlyEngine:
                 "grid_import_kwh":        round(total_grid_import_kwh, 1),
                 "battery_stored_kwh":     round(total_battery_stored_kwh, 1),
                 "battery_discharged_kwh": round(total_battery_discharged_kwh, 1),
-                "production_profile":     production_profile,
-                "consumption_profile":    consumption_profile,
+                "production_profile":     pv_h.tolist(),
+                "consumption_profile":    load_h.tolist(),
                 "soc_profile":            battery_soc_history,
             },
             "rates": {
@@ -297,47 +336,727 @@ class HourlyEngine:
                 "summer": summer_chart_data,
                 "winter": winter_chart_data
             },
-        
+            "ev_charging": ev_summary,
+            "timestep_minutes": self.timestep_minutes,
+            "curtailment": {
+                "export_limit_kw":       self.export_limit_kw,
+                "curtailed_kwh":         round(float(curtailed.sum()), 1),
+                "monthly_curtailed_kwh": {i + 1: round(float(monthly_curtailed[i]), 1) for i in range(12)},
+                "curtailed_value_pln":   round(float((curtailed * rcem).sum()), 2),
+            },
         }
+        if dispatch_comparison:
+            # Plan z tej symulacji jest jednym z porównywanych — nie liczymy go drugi raz
+            result["dispatch_comparison"] = self._compare_dispatch(
+                production, consumption, known=(self.battery_config, flows)
+            )
+        return result
+
+    def run_price_path(self, price_paths: Any) -> List[Dict[str, Any]]:
+        """
+        Ta sama instalacja na wielu latach cen — macierz (lata, 8760),
+        np. PriceStore.get_path([2022, 2023, 2024]). Profil PV liczony raz.
+        """
+        paths = np.atleast_2d(np.asarray(price_paths, dtype=float))
+        if paths.shape[1] != 8760:
+            raise ValueError(f"Ścieżka cen musi mieć 8760 wartości na rok, otrzymano {paths.shape[1]}")
+
+        production_profile = self._generate_production_profile()
+        original = (self.rcem_hourly, self.rcem, self.rcem_avg)
+        results = []
+        try:
+            for row in paths:
+                self.rcem_hourly = self.rcem = row
+                self.rcem_avg = float(row.mean())
+                results.append(self.run_hourly_simulation(production_profile=production_profile))
+        finally:
+            self.rcem_hourly, self.rcem, self.rcem_avg = original
+        return results
+
+    def run_price_ensemble(
+        self,
+        export_prices: Any,
+        retail_tariffs: Optional[Any] = None,
+        percentiles: Tuple[int, ...] = (10, 50, 90),
+        production_profile: Optional[List[float]] = None,
+        consumption_profile: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Rozkład oszczędności dla N ścieżek cen w jednym przebiegu.
+
+        export_prices:  (N, 8760) ceny RCEm [PLN/kWh] — np. build_hourly_scenarios(...)["paths"]
+                        albo PriceStore.get_path([...])
+        retail_tariffs: (N, 8760) lub (8760,) ceny zakupu; domyślnie strefy taryfy silnika
+
+        Przy sterowaniu zachłannym przepływy energii nie zależą od cen (bateria
+        ładuje się z nadwyżki), więc bilans liczony jest raz, a wartości ścieżek
+        to iloczyny macierz × wektor; depozyt — wsadowo w deposit_horizon.
+        Koszt N=200 ≈ kilka zwykłych symulacji. Plan "optimal" / "forecast"
+        zależy od cen ścieżki — dla niego służy run_price_path.
+        """
+        has_battery = float(self.battery_config.get("capacity_kwh", 0) or 0) > 0
+        if has_battery and self.battery_config.get("dispatch", "greedy") != "greedy":
+            raise ValueError(
+                "run_price_ensemble wymaga sterowania zachłannego — plan optymalny zależy od cen; "
+                "użyj run_price_path"
+            )
+        prices = np.atleast_2d(np.asarray(export_prices, dtype=float))
+        if prices.shape[1] != 8760:
+            raise ValueError(f"Ścieżka cen musi mieć 8760 wartości na rok, otrzymano {prices.shape[1]}")
+        n_paths = prices.shape[0]
+
+        base_tariff = self._tariff_hourly()
+        if retail_tariffs is None:
+            tariffs = base_tariff[None, :]
+        else:
+            tariffs = np.atleast_2d(np.asarray(retail_tariffs, dtype=float))
+            if tariffs.shape[1] != 8760 or tariffs.shape[0] not in (1, n_paths):
+                raise ValueError(f"retail_tariffs musi mieć kształt (1|{n_paths}, 8760), otrzymano {tariffs.shape}")
+
+        if production_profile is None:
+            production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+        if consumption_profile is None:
+            consumption_profile = self._generate_consumption_profile()
+            if self.ev_kwh > 0:
+                consumption_profile, _ = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
+
+        flows = {k: self._to_hourly(v) for k, v in self._energy_flows(production, consumption).items() if k != "soc"}
+
+        autoconsumption_pln = tariffs @ flows["autoconsumption"]
+        net_billing_pln     = prices @ flows["surplus"]
+        battery_benefit_pln = tariffs @ flows["discharge"] - prices @ flows["charge_from_export"]
+
+        # Depozyt: wartość nadwyżki vs składnik energii w imporcie (proporcjonalnie do taryfy)
+        month_idx = np.minimum(11, np.arange(8760) // 24 // 30)
+        month_onehot = np.zeros((8760, 12))
+        month_onehot[np.arange(8760), month_idx] = 1.0
+        energy_share = self.tariff_components["energy_pln_per_kwh"] / base_tariff.mean()
+        monthly_value = prices @ (month_onehot * flows["surplus"][:, None])
+        monthly_import_cost = (tariffs @ (month_onehot * flows["deficit"][:, None])) * energy_share
+        deposit = deposit_horizon(
+            monthly_value,
+            np.broadcast_to(monthly_import_cost, monthly_value.shape),
+            years=HORIZON_YEARS_DEFAULT,
+            refund_limit=self.refund_limit,
+        )
+        lost_deposit_pln = deposit["lost"].mean(axis=1)
+
+        components = {
+            "autoconsumption_pln": np.broadcast_to(autoconsumption_pln, (n_paths,)),
+            "net_billing_pln":     net_billing_pln - lost_deposit_pln,
+            "battery_benefit_pln": np.broadcast_to(battery_benefit_pln, (n_paths,)),
+            "lost_deposit_pln":    lost_deposit_pln,
+        }
+        savings = (
+            components["autoconsumption_pln"] + components["net_billing_pln"] + components["battery_benefit_pln"]
+        )
+
+        def summary(values: np.ndarray) -> Dict[str, float]:
+            out = {"mean": round(float(values.mean()), 2)}
+            for p, v in zip(percentiles, np.percentile(values, percentiles)):
+                out[f"p{p}"] = round(float(v), 2)
+            return out
+
+        return {
+            "n_paths": n_paths,
+            "savings_pln": {
+                **summary(savings),
+                "min": round(float(savings.min()), 2),
+                "max": round(float(savings.max()), 2),
+            },
+            "components": {name: summary(values) for name, values in components.items()},
+            "mean_export_price_pln_per_kwh": round(float(prices.mean()), 4),
+            "paths_savings_pln": np.round(savings, 2).tolist(),
+        }
+
+    def run_export_limit_sweep(
+        self,
+        export_limits_kw: List[Optional[float]],
+        production_profile: Optional[List[float]] = None,
+        consumption_profile: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Oszczędności dla kilku limitów eksportu [kW] w jednym przebiegu
+        (None = bez limitu, 0 = zero-export).
+
+        Bilans i bateria liczone raz bez limitu — limit obcina tylko to, co
+        zostaje po baterii, więc obcięcie dla L limitów to jedno minimum
+        rozgłoszone na macierz (L, kroki); depozyt — wsadowo.
+        """
+        limits = [None if v is None else float(v) for v in export_limits_kw]
+        if any(v is not None and v < 0 for v in limits):
+            raise ValueError("Limity eksportu nie mogą być ujemne")
+
+        sph = self.steps_per_hour
+        if production_profile is None:
+            production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+        if consumption_profile is None:
+            consumption_profile = self._generate_consumption_profile()
+            if self.ev_kwh > 0:
+                consumption_profile, _ = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
+
+        original_limit = self.export_limit_kw
+        try:
+            self.export_limit_kw = None
+            flows = self._energy_flows(production, consumption)
+        finally:
+            self.export_limit_kw = original_limit
+
+        hour = np.arange(production.size) // sph
+        month_idx = np.minimum(11, hour // 24 // 30)
+        rcem = self.rcem if sph == 1 else np.repeat(self.rcem, sph)
+        tariff = self._tariff_hourly()[hour]
+
+        caps = np.array([np.inf if v is None else v / sph for v in limits])        # kWh na krok
+        exported = np.minimum(flows["surplus"][None, :], caps[:, None])            # (L, kroki)
+        curtailed = flows["surplus"][None, :] - exported
+        # Ładowanie kosztem eksportu: energia, która bez baterii zmieściłaby się w limicie
+        without_battery = np.minimum((flows["surplus"] + flows["charge"])[None, :], caps[:, None])
+        charge_from_export = without_battery - exported
+
+        month_onehot = np.zeros((production.size, 12))
+        month_onehot[np.arange(production.size), month_idx] = 1.0
+        monthly_value = (exported * rcem[None, :]) @ month_onehot                  # (L, 12)
+        monthly_curtailed = curtailed @ month_onehot
+
+        energy_share = self.tariff_components["energy_pln_per_kwh"] / self._tariff_hourly().mean()
+        monthly_import_cost = np.bincount(
+            month_idx, weights=flows["deficit"] * tariff * energy_share, minlength=12
+        )
+        deposit = deposit_horizon(
+            monthly_value,
+            np.broadcast_to(monthly_import_cost, monthly_value.shape),
+            years=HORIZON_YEARS_DEFAULT,
+            refund_limit=self.refund_limit,
+        )
+        lost = deposit["lost"].mean(axis=1)
+
+        autoconsumption_pln = float((flows["autoconsumption"] * tariff).sum())
+        battery_benefit_pln = float(flows["discharge"] @ tariff) - charge_from_export @ rcem
+        net_billing_pln = monthly_value.sum(axis=1) - lost
+
+        return [
+            {
+                "export_limit_kw":       limits[i],
+                "surplus_kwh":           round(float(exported[i].sum()), 1),
+                "curtailed_kwh":         round(float(curtailed[i].sum()), 1),
+                "monthly_curtailed_kwh": {m + 1: round(float(monthly_curtailed[i, m]), 1) for m in range(12)},
+                "net_billing_pln":       round(float(net_billing_pln[i]), 2),
+                "lost_deposit_pln":      round(float(lost[i]), 2),
+                "annual_savings_pln":    round(autoconsumption_pln + float(net_billing_pln[i] + battery_benefit_pln[i]), 2),
+            }
+            for i in range(len(limits))
+        ]
+
+    def run_variant_batch(
+        self,
+        production_scale: Any = 1.0,
+        consumption_scale: Any = 1.0,
+        battery_scale: Any = 1.0,
+        tariff_scale: Any = 1.0,
+        price_scale: Any = 1.0,
+        production_profile: Optional[List[float]] = None,
+        consumption_profile: Optional[List[float]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Roczne oszczędności dla K wariantów instalacji w jednym przebiegu
+        (np. analiza wrażliwości — app.core.sensitivity).
+
+        Każdy parametr to skalar albo wektor (K,) mnożników względem bazy:
+        produkcja, zużycie, pojemność i moc baterii, ceny zakupu, ceny RCEm.
+        Profile generowane są raz. Bilans energii liczony jest tylko dla
+        różnych trójek (produkcja, zużycie, bateria); zmiany cen to mnożenie
+        gotowych sum, a depozyt liczony jest wsadowo.
+        Profil EV (smart charging) pozostaje profilem bazowym.
+        """
+        scales = np.broadcast_arrays(*(
+            np.atleast_1d(np.asarray(v, dtype=float))
+            for v in (production_scale, consumption_scale, battery_scale, tariff_scale, price_scale)
+        ))
+        prod_s, cons_s, batt_s, tariff_s, price_s = scales
+        if any((s < 0).any() for s in scales):
+            raise ValueError("Mnożniki wariantów nie mogą być ujemne")
+
+        sph = self.steps_per_hour
+        if production_profile is None:
+            production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+        if consumption_profile is None:
+            consumption_profile = self._generate_consumption_profile()
+            if self.ev_kwh > 0:
+                consumption_profile, _ = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
+
+        hour = np.arange(production.size) // sph
+        month_idx = np.minimum(11, hour // 24 // 30)
+        rcem = self.rcem if sph == 1 else np.repeat(self.rcem, sph)
+        tariff = self._tariff_hourly()[hour]
+        energy_share = self.tariff_components["energy_pln_per_kwh"] / self._tariff_hourly().mean()
+
+        # Sumy przy cenach bazowych dla każdego różnego bilansu energii
+        keys = list(zip(prod_s.tolist(), cons_s.tolist(), batt_s.tolist()))
+        unique = list(dict.fromkeys(keys))
+        base = np.zeros((len(unique), 4))
+        monthly_value = np.zeros((len(unique), 12))
+        monthly_import = np.zeros((len(unique), 12))
+        for u, (p, c, b) in enumerate(unique):
+            flows = self._energy_flows(production * p, consumption * c, battery_scale=b)
+            base[u] = (
+                (flows["autoconsumption"] * tariff).sum(),
+                (flows["surplus"] * rcem).sum(),
+                (flows["discharge"] * tariff).sum(),
+                (flows["charge_from_export"] * rcem).sum(),
+            )
+            monthly_value[u] = np.bincount(month_idx, weights=flows["surplus"] * rcem, minlength=12)
+            monthly_import[u] = np.bincount(
+                month_idx, weights=flows["deficit"] * tariff * energy_share, minlength=12
+            )
+
+        idx = np.array([unique.index(k) for k in keys])
+        deposit = deposit_horizon(
+            monthly_value[idx] * price_s[:, None],
+            monthly_import[idx] * tariff_s[:, None],
+            years=HORIZON_YEARS_DEFAULT,
+            refund_limit=self.refund_limit,
+        )
+        lost = deposit["lost"].mean(axis=1)
+
+        autoconsumption_pln = base[idx, 0] * tariff_s
+        net_billing_pln = base[idx, 1] * price_s - lost
+        battery_benefit_pln = base[idx, 2] * tariff_s - base[idx, 3] * price_s
+        return {
+            "annual_savings_pln": autoconsumption_pln + net_billing_pln + battery_benefit_pln,
+            "autoconsumption_pln": autoconsumption_pln,
+            "net_billing_pln": net_billing_pln,
+            "battery_benefit_pln": battery_benefit_pln,
+            "lost_deposit_pln": lost,
+            "n_energy_balances": len(unique),
+        }
+
+    def run_battery_sweep(
+        self,
+        capacity_kwh: Any,
+        power_kw: Any,
+        efficiency: Any = 0.95,
+        production_profile: Optional[List[float]] = None,
+        consumption_profile: Optional[List[float]] = None,
+        dispatch: str = "greedy",
+    ) -> Dict[str, np.ndarray]:
+        """
+        Roczne oszczędności dla K baterii (np. cały katalog) w jednym przebiegu.
+
+        capacity_kwh, power_kw, efficiency — wektory (K,) lub skalary; pojemność 0
+        = wariant bez baterii. Bilans bez baterii liczony raz, SOC wszystkich
+        baterii naraz (battery_kernels.soc_path_batch), ceny jako iloczyny
+        macierz × wektor, depozyt wsadowo. Z battery_config silnika brane są
+        tylko ustawienia prognozy; dispatch "optimal" / "forecast" liczy plan
+        (battery_dispatch) osobno dla każdej baterii. soc_profile (K, 8760) —
+        SOC na koniec godziny, jak energy_flow.soc_profile symulacji.
+        """
+        capacity, power, eff = np.broadcast_arrays(*(
+            np.atleast_1d(np.asarray(v, dtype=float)) for v in (capacity_kwh, power_kw, efficiency)
+        ))
+        if (capacity < 0).any() or (power < 0).any():
+            raise ValueError("Pojemność i moc baterii nie mogą być ujemne")
+        if ((eff <= 0) | (eff > 1)).any():
+            raise ValueError("Sprawność baterii musi być z zakresu (0, 1]")
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"Nieznany tryb sterowania baterią: {dispatch}. Dostępne: {DISPATCH_MODES}")
+
+        sph = self.steps_per_hour
+        if production_profile is None:
+            production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+        if consumption_profile is None:
+            consumption_profile = self._generate_consumption_profile()
+            if self.ev_kwh > 0:
+                consumption_profile, _ = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
+
+        n_steps = production.size
+        hour = np.arange(n_steps) // sph
+        month_idx = np.minimum(11, hour // 24 // 30)
+        rcem = self.rcem if sph == 1 else np.repeat(self.rcem, sph)
+        tariff = self._tariff_hourly()[hour]
+        energy_share = self.tariff_components["energy_pln_per_kwh"] / self._tariff_hourly().mean()
+
+        balance = production - consumption
+        surplus_gross = np.maximum(balance, 0.0)
+        deficit_gross = np.maximum(-balance, 0.0)
+        autoconsumption = np.minimum(production, consumption)
+
+        # ── Bateria: te same reguły co _energy_flows, K wierszy naraz ────────
+        active = (capacity > 0) & (power > 0)
+        if dispatch == "greedy":
+            max_step_kwh = np.where(active, power, 0.0)[:, None] / sph
+            delta = np.where(
+                balance >= 0,
+                np.minimum(surplus_gross, max_step_kwh) * eff[:, None],
+                -np.minimum(deficit_gross, max_step_kwh),
+            )
+            soc = soc_path_batch(delta, np.where(active, capacity, 0.0))
+            stored, discharge = soc_flows(soc)
+            charge = stored / eff[:, None]
+        else:
+            # Plan liczony osobno dla każdej baterii — zachłanny SOC byłby stracony
+            soc, charge, discharge = (np.zeros((capacity.size, n_steps)) for _ in range(3))
+            original = self.battery_config
+            self.battery_config = {**original, "dispatch": dispatch}
+            try:
+                for k in np.flatnonzero(active):
+                    charge[k], discharge[k], soc[k] = self._optimal_battery_flows(
+                        balance, capacity[k], power[k], eff[k]
+                    )
+            finally:
+                self.battery_config = original
+
+        surplus = surplus_gross - charge
+        surplus[surplus < 1e-9] = 0.0
+        deficit = deficit_gross - discharge
+        deficit[deficit < 1e-9] = 0.0
+        charge_from_export = charge
+        if self.export_limit_kw is not None:
+            cap = self.export_limit_kw / sph
+            surplus = np.minimum(surplus, cap)
+            charge_from_export = np.minimum(surplus_gross, cap) - surplus
+
+        # Kroki są ułożone chronologicznie — sumy miesięczne po granicach miesięcy
+        month_starts = np.searchsorted(month_idx, np.arange(12))
+        monthly_value = np.add.reduceat(surplus * rcem, month_starts, axis=1)        # (K, 12)
+        monthly_import = np.add.reduceat(deficit * (tariff * energy_share), month_starts, axis=1)
+        deposit = deposit_horizon(
+            monthly_value, monthly_import,
+            years=HORIZON_YEARS_DEFAULT,
+            refund_limit=self.refund_limit,
+        )
+        lost = deposit["lost"].mean(axis=1)
+
+        autoconsumption_pln = np.full(capacity.shape, float(autoconsumption @ tariff))
+        net_billing_pln = monthly_value.sum(axis=1) - lost
+        battery_benefit_pln = discharge @ tariff - charge_from_export @ rcem
+        discharged_kwh = discharge.sum(axis=1)
+        total_consumption = float(consumption.sum())
+        internal_kwh = float(autoconsumption.sum()) + discharged_kwh
+        return {
+            "annual_savings_pln": autoconsumption_pln + net_billing_pln + battery_benefit_pln,
+            "autoconsumption_pln": autoconsumption_pln,
+            "net_billing_pln": net_billing_pln,
+            "battery_benefit_pln": battery_benefit_pln,
+            "lost_deposit_pln": lost,
+            "battery_discharged_kwh": discharged_kwh,
+            "self_sufficiency_rate": internal_kwh / total_consumption if total_consumption > 0 else np.zeros_like(internal_kwh),
+            "soc_profile": soc.reshape(capacity.size, 8760, sph)[:, :, -1],
+        }
+
+    def run_dispatch_comparison(
+        self,
+        forecast_noise: float = FORECAST_NOISE_DEFAULT,
+        forecast_seed: Optional[int] = 0,
+        production_profile: Optional[List[float]] = None,
+        consumption_profile: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Wartość optymalnego sterowania baterią względem strategii zachłannej.
+
+        Te same profile i bateria (battery_config), trzy plany: zachłanny,
+        optymalny przy pełnej wiedzy o cenach i optymalny na prognozie z błędem
+        (forecast_noise = 0 pomija wariant prognozy). Wartość = przychód z oddania
+        (RCEm) − koszt poboru z sieci; depozyt net-billingu pominięty.
+        """
+        if production_profile is None:
+            production_profile = self._generate_production_profile()
+        production = self._to_steps(production_profile)
+        if consumption_profile is None:
+            consumption_profile = self._generate_consumption_profile()
+            if self.ev_kwh > 0:
+                consumption_profile, _ = self._add_ev_charging(
+                    self._to_hourly(production).tolist(), consumption_profile
+                )
+        consumption = self._to_steps(consumption_profile)
+        return self._compare_dispatch(production, consumption, forecast_noise, forecast_seed)
+
+    def _compare_dispatch(
+        self,
+        production: np.ndarray,
+        consumption: np.ndarray,
+        forecast_noise: float = FORECAST_NOISE_DEFAULT,
+        forecast_seed: Optional[int] = 0,
+        known: Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Porównanie planów dla gotowych profili w krokach symulacji.
+        known = (battery_config, przepływy) już policzonego planu — tryb o tych
+        samych ustawieniach sterowania nie jest symulowany ponownie.
+        """
+        if not float(self.battery_config.get("capacity_kwh", 0) or 0) > 0:
+            raise ValueError("Porównanie sterowania wymaga baterii (battery_config.capacity_kwh > 0)")
+
+        hour = np.arange(production.size) // self.steps_per_hour
+        rcem = self.rcem[hour]
+        tariff = self._tariff_hourly()[hour]
+
+        modes = {"greedy": {"dispatch": "greedy"}, "optimal": {"dispatch": "optimal"}}
+        if forecast_noise > 0:
+            modes["forecast"] = {
+                "dispatch": "forecast", "forecast_noise": forecast_noise, "forecast_seed": forecast_seed,
+            }
+
+        original = self.battery_config
+        results: Dict[str, Any] = {}
+        try:
+            for name, overrides in modes.items():
+                self.battery_config = {**original, **overrides}
+                if known is not None and _dispatch_settings(self.battery_config) == _dispatch_settings(known[0]):
+                    flows = known[1]
+                else:
+                    flows = self._energy_flows(production, consumption)
+                export_pln = float(flows["surplus"] @ rcem)
+                import_pln = float(flows["deficit"] @ tariff)
+                discharged = float(flows["discharge"].sum())
+                results[name] = {
+                    "export_value_pln": round(export_pln, 2),
+                    "import_cost_pln": round(import_pln, 2),
+                    "grid_value_pln": round(export_pln - import_pln, 2),
+                    "battery_charged_kwh": round(float(flows["charge"].sum()), 1),
+                    "battery_discharged_kwh": round(discharged, 1),
+                    "avg_charge_rcem_pln_per_kwh": round(
+                        float(flows["charge"] @ rcem) / max(float(flows["charge"].sum()), 1e-9), 4
+                    ),
+                }
+        finally:
+            self.battery_config = original
+
+        greedy = results["greedy"]["grid_value_pln"]
+        results["value_over_greedy_pln"] = round(results["optimal"]["grid_value_pln"] - greedy, 2)
+        if "forecast" in results:
+            results["forecast_value_over_greedy_pln"] = round(results["forecast"]["grid_value_pln"] - greedy, 2)
+            results["forecast_noise"] = forecast_noise
+        return results
+
+    # =========================================================================
+    # KROK CZASOWY I BATERIA
+    # =========================================================================
+
+    def _tariff_hourly(self) -> np.ndarray:
+        """Cena zakupu dla 8760 godzin — wektor taryfy dynamicznej albo strefy taryfy."""
+        if self.tariff_vector is not None:
+            return self.tariff_vector
+        zones = np.array([self.tariff_zones.get(h, self.electricity_tariff) for h in range(24)])
+        return np.tile(zones, 365)
+
+    def _energy_flows(
+        self,
+        production: np.ndarray,
+        consumption: np.ndarray,
+        battery_scale: float = 1.0,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Przepływy energii w kroku symulacji: autoconsumption, surplus, deficit, charge, discharge, soc, curtailed,
+        charge_from_export — część ładowania, która bez baterii zostałaby oddana
+        do sieci (przy limicie eksportu bez energii, która i tak byłaby obcięta).
+        battery_scale mnoży pojemność i moc baterii (warianty wrażliwości).
+        Przy sterowaniu zachłannym przepływy nie zależą od cen; przy
+        dispatch "optimal" / "forecast" plan baterii liczony jest na cenach
+        silnika (self.rcem, taryfa).
+        """
+        step_h = 1.0 / self.steps_per_hour
+        battery_capacity   = float(self.battery_config.get("capacity_kwh", 0) or 0) * battery_scale
+        battery_power      = float(self.battery_config.get("power_kw",     0) or 0) * battery_scale
+        battery_efficiency = float(self.battery_config.get("efficiency", 0.95) or 0.95)
+        has_battery        = battery_capacity > 0 and battery_power > 0
+
+        balance = production - consumption
+        surplus_gross = np.maximum(balance, 0.0)
+        deficit_gross = np.maximum(-balance, 0.0)
+        autoconsumption = np.minimum(production, consumption)
+
+        # ── Bateria: charge i discharge NIGDY jednocześnie > 0 ────────────────
+        if has_battery and self.battery_config.get("dispatch", "greedy") != "greedy":
+            charge, discharge, soc = self._optimal_battery_flows(
+                balance, battery_capacity, battery_power, battery_efficiency
+            )
+        elif has_battery:
+            max_step_kwh = battery_power * step_h
+            delta = np.where(
+                balance >= 0,
+                np.minimum(surplus_gross, max_step_kwh) * battery_efficiency,
+                -np.minimum(deficit_gross, max_step_kwh),
+            )
+            soc = soc_path(delta, battery_capacity)
+            stored, discharge = soc_flows(soc)
+            charge = stored / battery_efficiency
+        else:
+            soc = np.zeros(production.size)
+            charge = np.zeros(production.size)
+            discharge = np.zeros(production.size)
+
+        # Reszty zmiennoprzecinkowe (ładowanie = cała nadwyżka) zerujemy
+        surplus = surplus_gross - charge
+        surplus[surplus < 1e-9] = 0.0
+        deficit = deficit_gross - discharge
+        deficit[deficit < 1e-9] = 0.0
+
+        # Limit eksportu: najpierw bateria, potem obcięcie tego, co zostało
+        curtailed = np.zeros(production.size)
+        charge_from_export = charge
+        if self.export_limit_kw is not None:
+            cap = self.export_limit_kw * step_h
+            exported = np.minimum(surplus, cap)
+            curtailed = surplus - exported
+            charge_from_export = np.minimum(surplus_gross, cap) - exported
+            surplus = exported
+
+        return {
+            "autoconsumption": autoconsumption,
+            "surplus": surplus,
+            "deficit": deficit,
+            "charge": charge,
+            "discharge": discharge,
+            "soc": soc,
+            "curtailed": curtailed,
+            "charge_from_export": charge_from_export,
+        }
+
+    def _optimal_battery_flows(
+        self,
+        balance: np.ndarray,
+        capacity: float,
+        power: float,
+        efficiency: float,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ładowanie / rozładowanie z programowania dynamicznego (battery_dispatch)
+        dla dób 08:00 → 08:00 — wszystkie doby naraz.
+
+        battery_config["dispatch"]: "optimal" (pełna wiedza o cenach) albo
+        "forecast" (plan na cenach z błędem forecast_noise, seed forecast_seed).
+        Taryfa strefowa jest znana z góry — błąd prognozy dotyczy RCEm
+        i taryfy dynamicznej.
+        """
+        dispatch = self.battery_config.get("dispatch")
+        if dispatch not in DISPATCH_MODES:
+            raise ValueError(f"Nieznany tryb sterowania baterią: {dispatch}. Dostępne: {DISPATCH_MODES}")
+
+        sph = self.steps_per_hour
+        hour = np.arange(balance.size) // sph
+        rcem = self.rcem[hour]
+        tariff = self._tariff_hourly()[hour]
+        if dispatch == "forecast":
+            noise = self.battery_config.get("forecast_noise", FORECAST_NOISE_DEFAULT)
+            planned = forecast_prices(np.stack([rcem, tariff]), noise, self.battery_config.get("forecast_seed", 0))
+            rcem = planned[0]
+            if self.tariff_vector is not None:
+                tariff = planned[1]
+
+        shift = DISPATCH_DAY_START_HOUR * sph
+        def by_day(a: np.ndarray) -> np.ndarray:
+            return np.roll(a, -shift).reshape(-1, 24 * sph)
+
+        plan = optimal_daily_dispatch(
+            by_day(balance), by_day(rcem), by_day(tariff),
+            capacity_kwh=capacity,
+            power_kw=power,
+            efficiency=efficiency,
+            steps_per_hour=sph,
+            soc_levels=int(self.battery_config.get("soc_levels", SOC_LEVELS_DEFAULT)),
+        )
+        charge, discharge, soc = (np.roll(plan[k].reshape(-1), shift) for k in ("charge", "discharge", "soc"))
+        return charge, discharge, soc
+
+    @property
+    def steps_per_hour(self) -> int:
+        return 60 // self.timestep_minutes
+
+    def _to_steps(self, profile: List[float]) -> np.ndarray:
+        """Profil godzinowy (8760) lub w kroku symulacji → tablica kroków (energia rozłożona równo)."""
+        arr = np.asarray(profile, dtype=float)
+        n_steps = 8760 * self.steps_per_hour
+        if arr.shape == (n_steps,):
+            return arr
+        if arr.shape == (8760,):
+            return np.repeat(arr / self.steps_per_hour, self.steps_per_hour)
+        raise ValueError(f"Profile muszą mieć 8760 lub {n_steps} wartości")
+
+    def _to_hourly(self, arr: np.ndarray) -> np.ndarray:
+        return arr.reshape(8760, self.steps_per_hour).sum(axis=1)
+
+    @staticmethod
+    def _chart_day(
+        start_hour: int,
+        pv_h: np.ndarray,
+        load_h: np.ndarray,
+        charge_h: np.ndarray,
+        discharge_h: np.ndarray,
+        deficit_h: np.ndarray,
+        soc_h: np.ndarray,
+        battery_capacity: float,
+    ) -> List[Dict]:
+        """Wpisy wykresu dobowego (v3.7) dla 24 godzin od start_hour."""
+        return [
+            {
+                "hour": f"{hour % 24:02d}:00",
+                "pv": round(float(pv_h[hour]), 3),
+                "consumption": round(float(load_h[hour]), 3),
+                "batteryCharge": round(float(charge_h[hour]), 3),
+                "batteryDischarge": round(float(discharge_h[hour]), 3),
+                "gridImport": round(float(deficit_h[hour]), 3),
+                "soc": round(float(soc_h[hour]) / battery_capacity * 100, 1) if battery_capacity > 0 else 0,
+            }
+            for hour in range(start_hour, start_hour + 24)
+        ]
 
     # =========================================================================
     # GENERATORY PROFILI
     # =========================================================================
 
     def _generate_production_profile(self) -> List[float]:
-        """Paraboliczny profil PV z sezonowością."""
-        profile: List[float] = []
-        for day in range(365):
-            seasonal = 0.7 + 0.3 * math.sin(2 * math.pi * (day - 80) / 365)
-            for h in range(24):
-                hf = (4 * (h - 6) * (18 - h) / 144) if 6 <= h <= 18 else 0.0
-                profile.append((self.annual_production_kwh / 365) * seasonal * hf)
-        total = sum(profile)
+        """Paraboliczny profil PV z sezonowością (w kroku symulacji)."""
+        sph = self.steps_per_hour
+        t = np.arange(24 * sph) / sph                         # godzina doby na początku kroku
+        hf = np.where((t >= 6) & (t <= 18), 4 * (t - 6) * (18 - t) / 144, 0.0)
+        seasonal = 0.7 + 0.3 * np.sin(2 * np.pi * (np.arange(365) - 80) / 365)
+        profile = ((self.annual_production_kwh / 365) * seasonal[:, None] * hf).reshape(-1)
+        total = float(profile.sum())
         if total > 0:
-            s = self.annual_production_kwh / total
-            profile = [p * s for p in profile]
-        return profile
+            profile = profile * (self.annual_production_kwh / total)
+        return profile.tolist()
 
     def _generate_consumption_profile(self) -> List[float]:
         """
-        MODEL SEZONOWY v4.5: Separacja Bazy, Grzania i Chłodzenia.
+        MODEL SEZONOWY v4.6: Separacja Bazy, Grzania i Chłodzenia (NumPy).
+
+        Jeśli podano heating_profile / cooling_profile (np. z thermal_load —
+        model stopniogodzin), ich KSZTAŁT zastępuje wagi W_HEAT / W_COOL
+        i sztywny podział dobowy; budżet kWh pozostaje heating_kwh / cooling_kwh.
         """
-        profile = []
-        
+        if self.measured_profile is not None:
+            return self._measured_consumption_profile()
+
         # 1. Wagi miesięczne (Sezonowość)
         # HEATING: Szczyt w grudniu/styczniu
-        W_HEAT = {1:0.19, 2:0.16, 3:0.13, 4:0.07, 5:0.02, 6:0.0, 7:0.0, 8:0.0, 9:0.02, 10:0.08, 11:0.14, 12:0.19}
+        W_HEAT = np.array([0.19, 0.16, 0.13, 0.07, 0.02, 0.0, 0.0, 0.0, 0.02, 0.08, 0.14, 0.19])
         # COOLING: Szczyt w lipcu/sierpniu
-        W_COOL = {1:0.0, 2:0.0, 3:0.0, 4:0.0, 5:0.10, 6:0.25, 7:0.35, 8:0.25, 9:0.05, 10:0.0, 11:0.0, 12:0.0}
+        W_COOL = np.array([0.0, 0.0, 0.0, 0.0, 0.10, 0.25, 0.35, 0.25, 0.05, 0.0, 0.0, 0.0])
 
         # 2. Wagi godzinowe (Behawioralne)
-        HOURLY_WEIGHTS = {
-            "at_home": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 1.5, 1.2, 1.0, 2.5, 3.5, 3.0, 2.5, 2.0, 1.5, 2.5, 4.0, 5.0, 4.5, 3.0, 1.5, 0.5, 0.0],
-            "away": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.5, 2.0, 0.2, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 2.5, 4.5, 5.5, 4.5, 3.0, 1.5, 0.5, 0.0]
-        }
+        AT_HOME = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 1.5, 1.2, 1.0, 2.5, 3.5, 3.0, 2.5, 2.0, 1.5, 2.5, 4.0, 5.0, 4.5, 3.0, 1.5, 0.5, 0.0])
+        AWAY    = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.5, 2.0, 0.2, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 2.5, 4.5, 5.5, 4.5, 3.0, 1.5, 0.5, 0.0])
 
-        # 3. Obliczamy bazę (AGD/RTV)
-        base_total = max(0, self.annual_consumption_kwh - self.heating_kwh - self.cooling_kwh)
+        # 3. Obliczamy bazę (AGD/RTV) — EV dokładany osobno w _add_ev_charging
+        household_kwh = max(0.0, self.annual_consumption_kwh - self.ev_kwh)
+        base_total = max(0, household_kwh - self.heating_kwh - self.cooling_kwh)
         BASE_LOAD_KW = 0.15 # 150W tła (lodówka, standby)
         activity_total = max(0, base_total - (365 * 24 * BASE_LOAD_KW))
 
@@ -345,58 +1064,125 @@ class HourlyEngine:
         ph = max(0, min(n_people, int(self.people_home_weekday)))
         pa = n_people - ph
 
-        # FIX: Oblicz rzeczywistą sumę wag dla TEGO konkretnego składu domowników.
-        # Hardcoded 15640 był poprawny tylko dla domyślnego składu i powodował
-        # błędną normalizację (profil sumował się do N×annual_consumption zamiast 1×).
-        annual_weight_sum = 0.0
-        for _day in range(365):
-            _is_weekend = (_day % 7) in [5, 6]
-            for _h in range(24):
-                if _is_weekend:
-                    annual_weight_sum += n_people * HOURLY_WEIGHTS["at_home"][_h]
-                else:
-                    annual_weight_sum += (ph * HOURLY_WEIGHTS["at_home"][_h]) + (pa * HOURLY_WEIGHTS["away"][_h])
+        days = np.arange(365)
+        month_idx = np.minimum(11, days // 30)            # (365,) — przybliżenie 30-dniowe jak w pętli
+        is_weekend = (days % 7) >= 5
+
+        # Wagi [dzień, godzina] dla TEGO konkretnego składu domowników
+        weights = np.where(
+            is_weekend[:, None],
+            n_people * AT_HOME,
+            ph * AT_HOME + pa * AWAY,
+        )
+        annual_weight_sum = float(weights.sum())
         norm_factor = annual_weight_sum if annual_weight_sum > 0 else 15640
 
-        for day in range(365):
-            month = min(12, (day // 30) + 1)
-            is_weekend = (day % 7) in [5, 6]
-            
-            # Budżet na ten dzień
-            d_heat = (self.heating_kwh * W_HEAT[month]) / 30
-            d_cool = (self.cooling_kwh * W_COOL[month]) / 30
-
-            for h in range(24):
-                # A. Baza (Ludzie)
-                if is_weekend:
-                    w = n_people * HOURLY_WEIGHTS["at_home"][h]
-                else:
-                    w = (ph * HOURLY_WEIGHTS["at_home"][h]) + (pa * HOURLY_WEIGHTS["away"][h])
-                
-                # FIX: norm_factor zamiast hardcoded 15640
-                h_base = (w * (activity_total / norm_factor)) if activity_total > 0 else 0
-                h_base += BASE_LOAD_KW
-                
-                # B. Grzanie (Płasko w dobie - inercja budynku)
-                                # Pompa pracuje ciężej, gdy spada temperatura (brak słońca)
-                if 9 <= h <= 16:
-                    h_heat = (d_heat * 0.35) / 8  # 35% zużycia w 8h słonecznych
-                else:
-                    h_heat = (d_heat * 0.65) / 16 # 65% zużycia w 16h ciemnych
-                
-                # C. Chłodzenie (Szczyt w dzień 12-18)
-                h_cool = (d_cool * 0.8 / 6) if 12 <= h <= 18 else (d_cool * 0.2 / 18)
+        base = (weights * (activity_total / norm_factor)) if activity_total > 0 else np.zeros((365, 24))
+        base = base + BASE_LOAD_KW
+
+        hours = np.arange(24)
+        heat = self._thermal_component(self.heating_profile, self.heating_kwh)
+        if heat is None:
+            # Płasko w dobie (inercja budynku): 35% w 8h słonecznych, 65% w 16h ciemnych
+            d_heat = self.heating_kwh * W_HEAT[month_idx] / 30
+            split = np.where((hours >= 9) & (hours <= 16), 0.35 / 8, 0.65 / 16)
+            heat = d_heat[:, None] * split
+
+        cool = self._thermal_component(self.cooling_profile, self.cooling_kwh)
+        if cool is None:
+            # Szczyt w dzień 12-18
+            d_cool = self.cooling_kwh * W_COOL[month_idx] / 30
+            split = np.where((hours >= 12) & (hours <= 18), 0.8 / 6, 0.2 / 18)
+            cool = d_cool[:, None] * split
+
+        profile = (base + heat + cool).reshape(-1)
 
-                profile.append(h_base + h_heat + h_cool)
         # FIX: Normalizacja końcowa — profil musi sumować się dokładnie
-        # do annual_consumption_kwh niezależnie od składu domowników.
+        # do annual_consumption_kwh (bez EV) niezależnie od składu domowników.
         # Wymagane gdy annual_consumption < BASE_LOAD × 8760 (np. bardzo małe zużycie).
-        profile_sum = sum(profile)
-        if profile_sum > 0 and abs(profile_sum - self.annual_consumption_kwh) > 1.0:
-            scale = self.annual_consumption_kwh / profile_sum
-            profile = [p * scale for p in profile]
+        profile_sum = float(profile.sum())
+        if profile_sum > 0 and abs(profile_sum - household_kwh) > 1.0:
+            profile = profile * (household_kwh / profile_sum)
+
+        return profile.tolist()
+
+    def _measured_consumption_profile(self) -> List[float]:
+        """
+        Profil z licznika + PLANOWANE obciążenia (pompa, klima, inne), których
+        pomiar jeszcze nie zawiera. Planowany EV dokładany osobno (_add_ev_charging).
+        """
+        measured = np.asarray(self.measured_profile, dtype=float)
+        if measured.shape != (8760,):
+            raise ValueError(f"Profil z licznika musi mieć 8760 wartości, otrzymano {measured.size}")
+
+        measured_kwh = float(measured.sum())
+        extra_kwh = max(0.0, self.annual_consumption_kwh - self.ev_kwh - measured_kwh)
+
+        # Budżet grzania/chłodzenia nie może przekroczyć dodatkowego zużycia
+        thermal_kwh = self.heating_kwh + self.cooling_kwh
+        scale = min(1.0, extra_kwh / thermal_kwh) if thermal_kwh > 0 else 0.0
+        profile = measured.copy()
+        for shape, budget in (
+            (self.heating_profile, self.heating_kwh * scale),
+            (self.cooling_profile, self.cooling_kwh * scale),
+        ):
+            component = self._thermal_component(shape, budget)
+            if component is None and budget > 0 and measured_kwh > 0:
+                component = measured * (budget / measured_kwh)
+            if component is not None:
+                profile += component.reshape(-1)
 
-        return profile
+        # Pozostałe planowane zużycie — w kształcie pomiaru
+        other_kwh = extra_kwh - thermal_kwh * scale
+        if other_kwh > 0 and measured_kwh > 0:
+            profile += measured * (other_kwh / measured_kwh)
+
+        return profile.tolist()
+
+    def _add_ev_charging(
+        self,
+        production_profile: List[float],
+        household_profile: List[float],
+    ) -> Tuple[List[float], Dict[str, Any]]:
+        """
+        Dokłada ładowanie EV do profilu zużycia. Oba warianty (dumb / smart)
+        liczone są w jednym przebiegu; do bilansu trafia ev_config["strategy"].
+        """
+        from app.core.ev_charging import simulate_ev_charging, DEFAULT_CHARGER_KW, DEFAULT_PATTERN
+
+        tariff_hourly = self._tariff_hourly()
+
+        ev = simulate_ev_charging(
+            annual_ev_kwh=self.ev_kwh,
+            production_profile=production_profile,
+            household_profile=household_profile,
+            pattern=self.ev_config.get("pattern") or DEFAULT_PATTERN,
+            charger_kw=float(self.ev_config.get("charger_kw") or DEFAULT_CHARGER_KW),
+            tariff_hourly=tariff_hourly,
+            rcem_hourly=self.rcem,
+        )
+        strategy = "smart" if self.ev_config.get("smart_charging", True) else "dumb"
+        profiles = ev.pop("profiles")
+        ev["strategy"] = strategy
+
+        consumption = np.asarray(household_profile, dtype=float) + profiles[strategy]
+        return consumption.tolist(), ev
+
+    @staticmethod
+    def _thermal_component(shape: Optional[Any], budget_kwh: float) -> Optional[np.ndarray]:
+        """
+        Skaluje godzinowy kształt (8760) do budżetu kWh → macierz (365, 24).
+        None, gdy brak kształtu lub jest on zerowy (wtedy model miesięczny).
+        """
+        if shape is None or budget_kwh <= 0:
+            return None
+        arr = np.asarray(shape, dtype=float)
+        if arr.shape != (8760,):
+            raise ValueError(f"Profil cieplny musi mieć 8760 wartości, otrzymano {arr.size}")
+        total = float(arr.sum())
+        if total <= 0:
+            return None
+        return (arr * (budget_kwh / total)).reshape(365, 24)
 
     def _generate_empty_result(self, consumption_profile: List[float]) -> Dict[str, Any]:
         """
@@ -432,7 +1218,11 @@ class HourlyEngine:
                 "distribution_component_pln_per_kwh": self.tariff_components["distribution_pln_per_kwh"]
             },
             "energy_flow_chart_data": [],
-            "seasonal_charts": {"summer": [], "winter": []}
+            "seasonal_charts": {"summer": [], "winter": []},
+            "curtailment": {
+                "export_limit_kw": self.export_limit_kw, "curtailed_kwh": 0.0,
+                "monthly_curtailed_kwh": {i: 0.0 for i in range(1, 13)}, "curtailed_value_pln": 0.0
+            },
         }
 
 # ── Standalone helper (backward compat) ──────────────────────────────────────
@@ -444,6 +1234,9 @@ def simulate_year(
     tariff_type: str = "G11",
     tariff_zones: Optional[Dict[int, float]] = None,
     battery_config: Optional[Dict[str, Any]] = None,
+    timestep_minutes: int = 60,
+    tariff_hourly: Optional[List[float]] = None,
+    export_limit_kw: Optional[float] = None,
 ) -> Dict[str, Any]:
     return HourlyEngine(
         annual_production_kwh=annual_production_kwh,
@@ -453,4 +1246,7 @@ def simulate_year(
         tariff_type=tariff_type,
         tariff_zones=tariff_zones,
         battery_config=battery_config,
+        timestep_minutes=timestep_minutes,
+        tariff_hourly=tariff_hourly,
+        export_limit_kw=export_limit_kw,
     ).run_hourly_simulation()
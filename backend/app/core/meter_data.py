@@ -0,0 +1,453 @@
+# backend/app/core/meter_data.py
+"""
+MeterData — import danych interwałowych z liczników zdalnego odczytu.
+
+Klient pobiera z portalu OSD (PGE eBOK, Tauron eLicznik, Enea, Energa Mój Licznik)
+plik CSV/XLSX z poborem 15-minutowym lub godzinowym. Moduł:
+- parsuje plik STRUMIENIOWO (wiersz po wierszu, bez ładowania całości),
+- rozpoznaje układ kolumn operatora (nagłówek szukany w pierwszych wierszach),
+- agreguje do 8760 godzin roku (29 lutego pomijany),
+- uzupełnia luki średnią z tej samej godziny w tym samym miesiącu,
+- zapisuje wynik na dysku (METER_CACHE_DIR, klucz: SHA-256 pliku + operator),
+  więc każdy worker odczytuje profil bez ponownego parsowania.
+
+Wynik (profile_id) trafia do ScenariosRequest.consumption_profile_id i zastępuje
+syntetyczny profil HourlyEngine oraz calculate_annual_demand.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+MIN_OBSERVED_HOURS = 24 * 28          # poniżej 4 tygodni danych profil jest niewiarygodny
+HEADER_SCAN_ROWS = 40                 # eksporty OSD mają preambułę (nr licznika, PPE, okres)
+CACHE_MAX_ENTRIES = 64                # profile w pamięci procesu (przed odczytem z dysku)
+DISK_CACHE_MAX_FILES = 1024           # ~70 kB na profil
+HASH_CHUNK_BYTES = 1 << 20
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_MONTH_OF_HOUR = np.repeat(np.arange(12), DAYS_IN_MONTH * 24)      # (8760,)
+
+# Układy kolumn eksportów OSD (nagłówki po normalizacji: małe litery, bez spacji na końcach).
+# "date"  — kolumna z datą lub datą i godziną,
+# "time"  — opcjonalna kolumna z godziną / numerem godziny 1-24 / przedziałem "00:00-01:00",
+# "value" — pobór energii; "[wh]" w nagłówku oznacza Wh,
+# "hour_ending" — znacznik czasu oznacza KONIEC przedziału (np. 00:15, 24:00).
+DSO_LAYOUTS: Dict[str, Dict[str, Any]] = {
+    "pge": {
+        "date":  ["data odczytu", "data"],
+        "time":  ["godzina", "czas"],
+        "value": ["zużycie", "zuzycie", "energia pobrana", "wartość", "wartosc"],
+        "hour_ending": True,
+    },
+    "tauron": {
+        "date":  ["data i godzina", "data"],
+        "time":  [],
+        "value": ["wartość kwh", "wartosc kwh", "pobór", "pobor", "wartość", "wartosc"],
+        "hour_ending": True,
+    },
+    "enea": {
+        "date":  ["data od", "początek okresu", "poczatek okresu"],
+        "time":  [],
+        "value": ["energia czynna pobrana", "energia pobrana", "pobór", "pobor"],
+        "hour_ending": False,
+    },
+    "energa": {
+        "date":  ["data"],
+        "time":  ["przedział", "przedzial", "godzina"],
+        "value": ["wolumen", "zużycie", "zuzycie", "wartość", "wartosc"],
+        "hour_ending": True,
+    },
+}
+
+_DATE_PATTERNS = [
+    (re.compile(r"^(\d{4})[-./](\d{1,2})[-./](\d{1,2})"), ("y", "m", "d")),
+    (re.compile(r"^(\d{1,2})[-./](\d{1,2})[-./](\d{4})"), ("d", "m", "y")),
+]
+_TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})")
+
+# Katalog współdzielony przez workery (jeden host / wolumen): <profile_id>.npz
+METER_CACHE_DIR = os.getenv(
+    "METER_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "meter_profiles"),
+)
+_PROFILE_ID = re.compile(r"^[0-9a-f]{64}$")
+_META_FIELDS = ("operator", "interval_minutes", "observed_hours", "filled_hours", "annual_consumption_kwh")
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# =============================================================================
+# PARSOWANIE WARTOŚCI
+# =============================================================================
+
+def _normalize(cell: Any) -> str:
+    return str(cell).strip().lower() if cell is not None else ""
+
+
+def _parse_number(cell: Any) -> Optional[float]:
+    if cell is None:
+        return None
+    if isinstance(cell, (int, float)):
+        return float(cell)
+    text = str(cell).strip().replace("\xa0", "").replace(" ", "").replace(",", ".")
+    if not text or text == "-":
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _parse_date(cell: Any) -> Optional[date]:
+    if isinstance(cell, datetime):
+        return cell.date()
+    if isinstance(cell, date):
+        return cell
+    text = str(cell).strip() if cell is not None else ""
+    for pattern, order in _DATE_PATTERNS:
+        m = pattern.match(text)
+        if m:
+            parts = dict(zip(order, (int(g) for g in m.groups())))
+            try:
+                return date(parts["y"], parts["m"], parts["d"])
+            except ValueError:
+                return None
+    return None
+
+
+def _parse_minutes(cell: Any) -> Optional[int]:
+    """
+    Minuty od północy. Obsługuje "HH:MM", "24:00" i numer godziny 0-24.
+    Przedział "00:00-01:00" zwracany jest jako -(początek) - 1 — początek
+    podany wprost, bez korekty hour_ending.
+    """
+    if isinstance(cell, (datetime, time)):
+        return cell.hour * 60 + cell.minute
+    text = str(cell).strip() if cell is not None else ""
+    if not text:
+        return None
+    found = _TIME_PATTERN.findall(text)
+    if len(found) >= 2:
+        h, mnt = found[0]
+        return -(int(h) * 60 + int(mnt)) - 1
+    if found:
+        h, mnt = found[-1]
+        return int(h) * 60 + int(mnt)
+    number = _parse_number(text)
+    if number is not None and float(number).is_integer() and 0 <= number <= 24:
+        return int(number) * 60
+    return None
+
+
+def _hour_of_year(moment: datetime) -> Optional[int]:
+    """Indeks godziny 0..8759 (29 lutego → None, w latach przestępnych przesunięcie)."""
+    if moment.month == 2 and moment.day == 29:
+        return None
+    doy = moment.timetuple().tm_yday
+    is_leap = moment.year % 4 == 0 and (moment.year % 100 != 0 or moment.year % 400 == 0)
+    if is_leap and moment.month > 2:
+        doy -= 1
+    return (doy - 1) * 24 + moment.hour
+
+
+# =============================================================================
+# STRUMIENIOWE ODCZYTY WIERSZY
+# =============================================================================
+
+def _iter_csv_rows(stream: BinaryIO) -> Iterator[List[str]]:
+    head = stream.read(65536)
+    stream.seek(0)
+    try:
+        head.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "cp1250"          # eksporty OSD z Excela (Windows)
+
+    sample = head.decode(encoding, errors="replace")
+    delimiter = ";" if sample.count(";") >= sample.count(",") / 2 else ","
+    if "\t" in sample and sample.count("\t") > sample.count(delimiter):
+        delimiter = "\t"
+
+    text = io.TextIOWrapper(stream, encoding=encoding, errors="replace", newline="")
+    try:
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        text.detach()
+
+
+def _iter_xlsx_rows(stream: BinaryIO) -> Iterator[Sequence[Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ValueError("Import plików XLSX wymaga pakietu openpyxl") from e
+
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _find_column(header: List[str], candidates: List[str]) -> Optional[int]:
+    for cand in candidates:
+        for i, cell in enumerate(header):
+            if cell == cand:
+                return i
+    for cand in candidates:
+        for i, cell in enumerate(header):
+            if cand in cell:
+                return i
+    return None
+
+
+def _detect_layout(header: List[str], operator: Optional[str]) -> Optional[Dict[str, Any]]:
+    names = [operator] if operator in DSO_LAYOUTS else list(DSO_LAYOUTS)
+    for name in names:
+        layout = DSO_LAYOUTS[name]
+        date_col = _find_column(header, layout["date"])
+        value_col = _find_column(header, layout["value"])
+        if date_col is None or value_col is None or date_col == value_col:
+            continue
+        time_col = _find_column(header, layout["time"]) if layout["time"] else None
+        return {
+            "operator":    name,
+            "date_col":    date_col,
+            "time_col":    time_col if time_col not in (date_col, value_col) else None,
+            "value_col":   value_col,
+            "scale":       0.001 if "[wh]" in header[value_col] else 1.0,
+            "hour_ending": layout["hour_ending"],
+        }
+    return None
+
+
+# =============================================================================
+# PARSER
+# =============================================================================
+
+def parse_meter_stream(
+    stream: BinaryIO,
+    filename: str = "",
+    operator: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Parsuje eksport OSD do profilu godzinowego 8760.
+
+    Zwraca słownik z kluczami: profile (np.ndarray, tylko do odczytu),
+    operator, interval_minutes, observed_hours, filled_hours, annual_consumption_kwh.
+    """
+    operator = (operator or "").lower().strip() or None
+    is_xlsx = filename.lower().endswith((".xlsx", ".xlsm"))
+    rows = _iter_xlsx_rows(stream) if is_xlsx else _iter_csv_rows(stream)
+
+    layout = None
+    for i, row in enumerate(rows):
+        layout = _detect_layout([_normalize(c) for c in row], operator)
+        if layout is not None or i >= HEADER_SCAN_ROWS:
+            break
+    if layout is None:
+        raise ValueError("Nie rozpoznano układu kolumn pliku z licznika (data / pobór)")
+
+    sums = np.zeros(HOURS_PER_YEAR)
+    counts = np.zeros(HOURS_PER_YEAR)
+    d_col, t_col, v_col = layout["date_col"], layout["time_col"], layout["value_col"]
+    width = max(c for c in (d_col, t_col, v_col) if c is not None)
+
+    last_stamp: Optional[datetime] = None
+    min_step = None
+
+    for row in rows:
+        if len(row) <= width:
+            continue
+        day = _parse_date(row[d_col])
+        value = _parse_number(row[v_col])
+        if day is None or value is None:
+            continue
+
+        source = row[t_col] if t_col is not None else row[d_col]
+        minutes = _parse_minutes(source)
+        if minutes is None:
+            minutes = 0                                # sama data — odczyt dobowy od północy
+        elif minutes < 0:
+            minutes = -minutes - 1                     # przedział: początek podany wprost
+        elif layout["hour_ending"]:
+            minutes -= 1                               # koniec przedziału → wewnątrz przedziału
+
+        stamp = datetime(day.year, day.month, day.day) + timedelta(minutes=minutes)
+        if last_stamp is not None:
+            step = abs((stamp - last_stamp).total_seconds()) / 60
+            if step > 0 and (min_step is None or step < min_step):
+                min_step = step
+        last_stamp = stamp
+
+        idx = _hour_of_year(stamp)
+        if idx is None:
+            continue
+        sums[idx] += value * layout["scale"]
+        counts[idx] += 1
+
+    observed = counts > 0
+    if observed.sum() < MIN_OBSERVED_HOURS:
+        raise ValueError(
+            f"Za mało danych w pliku z licznika: {int(observed.sum())} h "
+            f"(minimum {MIN_OBSERVED_HOURS} h)"
+        )
+
+    interval = int(round(min_step)) if min_step else 60
+    interval = 15 if interval <= 15 else (30 if interval <= 30 else 60)
+    per_hour = 60 // interval
+
+    # Wartość godzinowa: suma odczytów przeskalowana do pełnej godziny
+    # (niepełne godziny i nakładające się lata uśrednione)
+    profile = np.zeros(HOURS_PER_YEAR)
+    profile[observed] = sums[observed] * per_hour / counts[observed]
+
+    # Luki → średnia tej samej godziny doby w tym samym miesiącu, potem globalnie
+    hod = np.arange(HOURS_PER_YEAR) % 24
+    key = _MONTH_OF_HOUR * 24 + hod
+    key_sum = np.bincount(key[observed], weights=profile[observed], minlength=288)
+    key_cnt = np.bincount(key[observed], minlength=288)
+    hod_sum = np.bincount(hod[observed], weights=profile[observed], minlength=24)
+    hod_cnt = np.bincount(hod[observed], minlength=24)
+    hod_mean = np.divide(hod_sum, hod_cnt, out=np.zeros(24), where=hod_cnt > 0)
+    key_mean = np.where(
+        key_cnt > 0,
+        np.divide(key_sum, key_cnt, out=np.zeros(288), where=key_cnt > 0),
+        np.tile(hod_mean, 12),
+    )
+    missing = ~observed
+    profile[missing] = key_mean[key[missing]]
+    profile = np.maximum(profile, 0.0)
+    profile.setflags(write=False)
+
+    return {
+        "profile":                profile,
+        "operator":               layout["operator"],
+        "interval_minutes":       interval,
+        "observed_hours":         int(observed.sum()),
+        "filled_hours":           int(missing.sum()),
+        "annual_consumption_kwh": round(float(profile.sum()), 1),
+    }
+
+
+# =============================================================================
+# CACHE PO HASHU PLIKU (pamięć procesu + dysk współdzielony przez workery)
+# =============================================================================
+
+def file_hash(stream: BinaryIO) -> str:
+    """SHA-256 strumienia (czytany porcjami); pozycja wraca na początek."""
+    h = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def profile_key(digest: str, operator: Optional[str] = None) -> str:
+    """profile_id = SHA-256(hash pliku + operator) — operator zmienia wybór układu kolumn."""
+    operator = (operator or "").lower().strip()
+    return hashlib.sha256(f"{digest}|{operator}".encode("utf-8")).hexdigest()
+
+
+def _remember(profile_id: str, entry: Dict[str, Any]) -> None:
+    with _cache_lock:
+        _cache[profile_id] = entry
+        _cache.move_to_end(profile_id)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _disk_path(profile_id: str) -> str:
+    return os.path.join(METER_CACHE_DIR, f"{profile_id}.npz")
+
+
+def _write_disk(profile_id: str, entry: Dict[str, Any]) -> None:
+    """Zapis atomowy (plik tymczasowy + os.replace); najstarsze pliki ponad limit usuwane."""
+    os.makedirs(METER_CACHE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=METER_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, profile=entry["profile"], **{k: np.asarray("" if entry[k] is None else entry[k]) for k in _META_FIELDS})
+        os.replace(tmp, _disk_path(profile_id))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    files = [e for e in os.scandir(METER_CACHE_DIR) if e.name.endswith(".npz")]
+    if len(files) > DISK_CACHE_MAX_FILES:
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for stale in files[:len(files) - DISK_CACHE_MAX_FILES]:
+            try:
+                os.unlink(stale.path)
+            except FileNotFoundError:
+                pass   # usunięty równolegle przez inny worker
+
+
+def _read_disk(profile_id: str) -> Optional[Dict[str, Any]]:
+    path = _disk_path(profile_id)
+    try:
+        with np.load(path) as data:
+            entry = {k: data[k].item() for k in _META_FIELDS}
+            entry = {k: None if v == "" else v for k, v in entry.items()}
+            profile = np.array(data["profile"], dtype=float)
+        os.utime(path)   # odczyt odświeża pozycję w kolejce usuwania
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        return None
+    if profile.shape != (HOURS_PER_YEAR,):
+        return None
+    profile.setflags(write=False)
+    return {"profile": profile, **entry}
+
+
+def load_meter_profile(
+    stream: BinaryIO,
+    filename: str = "",
+    operator: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Parsuje plik (lub zwraca wynik z cache) i dokłada profile_id / cached."""
+    profile_id = profile_key(file_hash(stream), operator)
+    cached = get_meter_profile(profile_id)
+    if cached is not None:
+        return {**cached, "profile_id": profile_id, "cached": True}
+
+    parsed = parse_meter_stream(stream, filename=filename, operator=operator)
+    _write_disk(profile_id, parsed)
+    _remember(profile_id, parsed)
+    return {**parsed, "profile_id": profile_id, "cached": False}
+
+
+def get_meter_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """Zwraca sparsowany profil z pamięci procesu, z dysku albo None."""
+    if not _PROFILE_ID.match(profile_id or ""):
+        return None
+    with _cache_lock:
+        entry = _cache.get(profile_id)
+        if entry is not None:
+            _cache.move_to_end(profile_id)
+            return entry
+    entry = _read_disk(profile_id)
+    if entry is not None:
+        _remember(profile_id, entry)
+    return entry
+
+
+def require_meter_profile(profile_id: str) -> np.ndarray:
+    """Profil 8760 dla consumption_profile_id; ValueError, gdy wygasł z cache."""
+    entry = get_meter_profile(profile_id)
+    if entry is None:
+        raise ValueError("Profil zużycia z licznika wygasł lub nie istnieje — prześlij plik ponownie")
+    return entry["profile"]
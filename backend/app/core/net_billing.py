@@ -4,9 +4,11 @@ Net-billing simulation utilities.
 
 Funkcje:
 - load_hourly_prices(csv_path)
+- load_stored_prices(years)
 - generate_synthetic_hourly_prices(years=3)
-- build_hourly_scenarios(prices_df)
-- hourly_balance_row(...)
+- build_hourly_scenarios(prices_df, quantiles, n_paths)
+- bootstrap_price_paths(prices_df, n_paths)
+- hourly_balance_row(...) / hourly_balance_arrays(...)
 - aggregate_monthly(...)
 - rolling_deposit(...)
 - simulate_year(...)
@@ -15,18 +17,23 @@ Zależności: pandas, numpy
 """
 from __future__ import annotations
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from app.core.battery_kernels import soc_path, soc_flows
+from app.core.deposit_ledger import (
+    DEPOSIT_VALID_MONTHS_DEFAULT,
+    REFUND_LIMIT_DEFAULT,  # ustawialne: 0.20 lub 0.30
+    deposit_ledger,
+)
+
 # -----------------------
 # Konfiguracja domyślna
 # -----------------------
 NET_BILLING_MULTIPLIER_DEFAULT = 1.23
-DEPOSIT_VALID_MONTHS_DEFAULT = 12
-REFUND_LIMIT_DEFAULT = 0.20  # ustawialne: 0.20 lub 0.30
-BOOTSTRAP_BLOCK_DAYS = 7  # do bootstrapu blokowego (opcjonalnie)
+BOOTSTRAP_BLOCK_DAYS = 7  # długość bloku w bootstrap_price_paths
 
 # -----------------------
 # Loader cen godzinowych
@@ -65,6 +72,28 @@ def load_hourly_prices(csv_path: str) -> pd.DataFrame:
     df = df.resample('H').mean().interpolate()
     return df
 
+# -----------------------
+# Ceny z magazynu historycznego (bez parsowania CSV)
+# -----------------------
+def load_stored_prices(years: Optional[List[int]] = None) -> Optional[pd.DataFrame]:
+    """
+    Zwraca ceny z app.data.price_store jako DataFrame (schemat jak load_hourly_prices)
+    albo None, gdy magazyn jest pusty. Rok ma 8760 godzin (bez 29 lutego).
+    """
+    from app.data.price_store import get_price_store
+
+    store = get_price_store()
+    years = years or store.years()
+    if not years:
+        return None
+
+    frames = []
+    for year in years:
+        idx = pd.date_range(start=f"{year}-01-01", end=f"{year + 1}-01-01", freq='h', inclusive='left')
+        idx = idx[~((idx.month == 2) & (idx.day == 29))]
+        frames.append(pd.DataFrame({'price_pln_kwh': np.asarray(store.get_year(year), dtype=float)}, index=idx))
+    return pd.concat(frames)
+
 # -----------------------
 # Fallback: syntetyczne ceny
 # -----------------------
@@ -79,7 +108,7 @@ def generate_synthetic_hourly_prices(start: str = None, years: int = 3) -> pd.Da
         start = pd.to_datetime(start)
 
     end = start + pd.DateOffset(years=years)
-    idx = pd.date_range(start=start, end=end, freq='H', closed='left')
+    idx = pd.date_range(start=start, end=end, freq='h', inclusive='left')
     # Prosty model: cena bazowa + dobowy i sezonowy komponent + losowy szum
     base = 0.30  # PLN/kWh baseline
     hour = idx.hour
@@ -97,43 +126,123 @@ def generate_synthetic_hourly_prices(start: str = None, years: int = 3) -> pd.Da
 # -----------------------
 # Scenariusze cenowe
 # -----------------------
-def build_hourly_scenarios(prices_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+def _month_hour_grid(df: pd.DataFrame, stat) -> np.ndarray:
+    """
+    Statystyka (month, hour) jako macierz (12, 24). Brakujące miesiące
+    uzupełnia statystyka godziny doby z całego szeregu.
+    """
+    grouped = df.groupby(['month', 'hour'])['price_pln_kwh']
+    values = stat(grouped).unstack('hour').reindex(index=range(1, 13), columns=range(24))
+    fallback = stat(df.groupby('hour')['price_pln_kwh']).reindex(range(24))
+    grid = values.to_numpy(dtype=float)
+    return np.where(np.isnan(grid), fallback.to_numpy(dtype=float)[None, :], grid)
+
+
+def build_hourly_scenarios(
+    prices_df: pd.DataFrame,
+    quantiles: Sequence[float] = (),
+    n_paths: int = 0,
+    block_days: int = BOOTSTRAP_BLOCK_DAYS,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     Tworzy scenariusze: 'base', 'high', 'low' oraz zwraca oryginalny szereg.
     - base: mediana godzinowa (dla każdej godziny doby)
     - high: base + 1 sigma (godzinowo)
     - low: base - 1 sigma
+    - q10, q90, ...: kwantyle (month, hour) dla podanych quantiles (np. 0.1, 0.9)
+    - paths: (n_paths × 8760) ścieżki z bootstrapu blokowego (gdy n_paths > 0)
+
+    Statystyki (12 × 24) rozgłaszane na indeks kalendarzowy — bez pętli po godzinach.
     """
     # oblicz statystyki godzinowe (dla każdej godziny doby i miesiąca)
     df = prices_df.copy()
     df['hour'] = df.index.hour
     df['month'] = df.index.month
 
-    # Mediana dla kombinacji (month, hour)
-    grouped = df.groupby(['month', 'hour'])['price_pln_kwh']
-    median = grouped.median().unstack(level=0).T.stack().rename('median')
-    sigma = grouped.std().unstack(level=0).T.stack().rename('sigma').fillna(0.0)
-
-    # Funkcja budująca roczny profil na podstawie mediany/sigma
-    def build_profile(multiplier: float = 0.0) -> pd.DataFrame:
-        # budujemy rok od pierwszego roku w danych
-        start = df.index.min().replace(month=1, day=1, hour=0)
-        end = start + pd.DateOffset(years=1)
-        idx = pd.date_range(start=start, end=end, freq='H', closed='left')
-        rows = []
-        for ts in idx:
-            m = ts.month
-            h = ts.hour
-            med = median.loc[(m, h)]
-            sig = sigma.loc[(m, h)]
-            val = med + multiplier * sig
-            rows.append(val)
-        return pd.DataFrame({'price_pln_kwh': rows}, index=idx)
-
-    base = build_profile(0.0)
-    high = build_profile(1.0)
-    low = build_profile(-1.0)
-    return {'base': base, 'high': high, 'low': low, 'raw': prices_df}
+    median = _month_hour_grid(df, lambda g: g.median())
+    sigma = np.nan_to_num(_month_hour_grid(df, lambda g: g.std()), nan=0.0)
+
+    # budujemy rok od pierwszego roku w danych
+    start = df.index.min().replace(month=1, day=1, hour=0)
+    idx = pd.date_range(start=start, end=start + pd.DateOffset(years=1), freq='h', inclusive='left')
+    m_idx = idx.month.to_numpy() - 1
+    h_idx = idx.hour.to_numpy()
+
+    def build_profile(grid: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({'price_pln_kwh': grid[m_idx, h_idx]}, index=idx)
+
+    scenarios: Dict[str, Any] = {
+        'base': build_profile(median),
+        'high': build_profile(median + sigma),
+        'low': build_profile(median - sigma),
+    }
+    for q in quantiles:
+        grid = _month_hour_grid(df, lambda g, q=q: g.quantile(q))
+        scenarios[f"q{int(round(q * 100)):02d}"] = build_profile(grid)
+
+    if n_paths > 0:
+        scenarios['paths'] = bootstrap_price_paths(
+            prices_df, n_paths=n_paths, block_days=block_days, seed=seed, fallback_grid=median
+        )
+
+    scenarios['raw'] = prices_df
+    return scenarios
+
+
+def bootstrap_price_paths(
+    prices_df: pd.DataFrame,
+    n_paths: int,
+    block_days: int = BOOTSTRAP_BLOCK_DAYS,
+    seed: Optional[int] = None,
+    season_window_days: int = 15,
+    fallback_grid: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Sezonowy bootstrap blokowy: N ścieżek rocznych jako jedna tablica (N × 8760).
+
+    Rok dzielony jest na bloki po block_days dni. Każdy blok losuje rok źródłowy
+    i dzień startu w oknie ±season_window_days wokół tego samego dnia roku,
+    więc zachowana jest sezonowość i korelacja wewnątrz tygodnia.
+    Dni bez danych uzupełnia mediana (month, hour).
+    """
+    if n_paths <= 0:
+        raise ValueError("n_paths musi być > 0")
+    block_days = max(1, int(block_days))
+
+    series = prices_df['price_pln_kwh']
+    series = series[~((series.index.month == 2) & (series.index.day == 29))]
+    years = np.unique(series.index.year)
+
+    # Kostka (lata, 365, 24) — NaN tam, gdzie brak danych
+    cube = np.full((len(years), 365, 24), np.nan)
+    y_pos = np.searchsorted(years, series.index.year)
+    doy = series.index.dayofyear.to_numpy() - 1
+    leap_shift = (series.index.is_leap_year & (series.index.month > 2)).astype(int)
+    cube[y_pos, doy - leap_shift, series.index.hour] = series.to_numpy(dtype=float)
+
+    if fallback_grid is None:
+        df = prices_df.copy()
+        df['hour'] = df.index.hour
+        df['month'] = df.index.month
+        fallback_grid = _month_hour_grid(df, lambda g: g.median())
+    calendar_month = np.repeat(np.arange(12), [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    fallback_days = fallback_grid[calendar_month]                        # (365, 24)
+
+    rng = np.random.default_rng(seed)
+    n_blocks = -(-365 // block_days)
+    block_start = np.arange(n_blocks) * block_days                       # (B,)
+    offset = rng.integers(-season_window_days, season_window_days + 1, size=(n_paths, n_blocks))
+    src_start = np.clip(block_start[None, :] + offset, 0, 365 - block_days)
+    src_year = rng.integers(0, len(years), size=(n_paths, n_blocks))
+
+    day_in_block = np.arange(block_days)
+    src_days = (src_start[:, :, None] + day_in_block).reshape(n_paths, -1)[:, :365]
+    src_years = np.repeat(src_year, block_days, axis=1)[:, :365]
+
+    paths = cube[src_years, src_days]                                    # (N, 365, 24)
+    paths = np.where(np.isnan(paths), fallback_days[None, :, :], paths)
+    return paths.reshape(n_paths, 365 * 24)
 
 # -----------------------
 # Godzinowy bilans
@@ -169,6 +278,26 @@ def hourly_balance_row(
         'cost_import_h': cost_import_h
     }
 
+def hourly_balance_arrays(
+    price: np.ndarray,
+    tariff: np.ndarray,
+    e_prod: np.ndarray,
+    e_cons: np.ndarray,
+    net_billing_multiplier: float = NET_BILLING_MULTIPLIER_DEFAULT,
+    grid_fee=0.0
+) -> Dict[str, np.ndarray]:
+    """
+    Wektorowa wersja hourly_balance_row — te same klucze, tablice zamiast skalarów.
+    grid_fee: skalar lub tablica godzinowa.
+    """
+    return {
+        'e_autokonsumpcja_h': np.minimum(e_prod, e_cons),
+        'e_export_h': np.maximum(0.0, e_prod - e_cons),
+        'e_import_h': np.maximum(0.0, e_cons - e_prod),
+        'revenue_export_h': price * np.maximum(0.0, e_prod - e_cons) * net_billing_multiplier,
+        'cost_import_h': tariff * np.maximum(0.0, e_cons - e_prod) + grid_fee,
+    }
+
 # -----------------------
 # Agregacja miesięczna
 # -----------------------
@@ -178,9 +307,7 @@ def aggregate_monthly(hourly_df: pd.DataFrame) -> pd.DataFrame:
       ['e_autokonsumpcja_h','e_export_h','e_import_h','revenue_export_h','cost_import_h']
     Zwraca DataFrame miesięczny z sumami.
     """
-    monthly = hourly_df.resample('M').sum()
-    monthly.index = monthly.index.to_period('M')
-    return monthly
+    return hourly_df.groupby(hourly_df.index.to_period('M')).sum()
 
 # -----------------------
 # Rolling deposit 12m
@@ -192,43 +319,28 @@ def rolling_deposit(
     refund_limit: float = REFUND_LIMIT_DEFAULT
 ) -> Tuple[pd.DataFrame, pd.Series]:
     """
-    Implementacja depozytu prosumenckiego z rolling window.
+    Implementacja depozytu prosumenckiego (transze FIFO, deposit_ledger).
     Zwraca:
-      - DataFrame z kolumnami: revenue, cost, balance, refunds
-      - Series cumulative_balance
+      - DataFrame z kolumnami: revenue, cost, net, used, unpaid, refund, lost, balance
+      - Series balance (stan depozytu na koniec miesiąca)
     Reguła zwrotu:
-      Po upływie deposit_valid_months, jeśli środki z danego miesiąca nie zostały wykorzystane,
-      zwracamy min(balance, refund_limit * revenue_of_that_month).
+      Po upływie deposit_valid_months niewykorzystana reszta transzy z danego miesiąca
+      jest zwracana do wysokości refund_limit * revenue_of_that_month, reszta przepada.
     """
-    months = monthly_revenues.index
-    n = len(months)
     df = pd.DataFrame({
-        'revenue': monthly_revenues.values,
-        'cost': monthly_costs.values
-    }, index=months)
+        'revenue': monthly_revenues.to_numpy(dtype=float),
+        'cost': monthly_costs.to_numpy(dtype=float)
+    }, index=monthly_revenues.index)
     df['net'] = df['revenue'] - df['cost']
-    df['balance'] = 0.0
-    df['refund'] = 0.0
-
-    # history of revenues with their month index
-    revenue_history = []
-
-    balance = 0.0
-    for i, m in enumerate(months):
-        balance += df.at[m, 'net']
-        revenue_history.append({'month_idx': i, 'value': df.at[m, 'revenue']})
-        # check revenues that just reached age == deposit_valid_months
-        for h in revenue_history:
-            age = i - h['month_idx']
-            if age == deposit_valid_months:
-                # compute refund for that revenue chunk
-                refund_amount = min(balance, refund_limit * h['value'])
-                if refund_amount > 0:
-                    df.at[m, 'refund'] += refund_amount
-                    balance -= refund_amount
-        df.at[m, 'balance'] = balance
-        # prune history older than deposit_valid_months to keep it small
-        revenue_history = [h for h in revenue_history if (i - h['month_idx']) < deposit_valid_months + 1]
+
+    ledger = deposit_ledger(
+        df['revenue'].to_numpy(),
+        df['cost'].to_numpy(),
+        deposit_valid_months=deposit_valid_months,
+        refund_limit=refund_limit,
+    )
+    for key in ('used', 'unpaid', 'refund', 'lost', 'balance'):
+        df[key] = ledger[key]
 
     return df, df['balance']
 
@@ -250,43 +362,54 @@ def apply_simple_battery_strategy(
     Zwraca zmodyfikowane serie: e_prod_after_batt, e_cons_after_batt, battery_flow (positive=discharge)
     """
     idx = hourly_prices.index
-    n = len(idx)
-    soc = 0.0  # state of charge (kWh)
-    soc_series = np.zeros(n)
-    prod_after = e_prod.copy()
-    cons_after = e_cons.copy()
-    battery_flow = np.zeros(n)
+    prod_after, cons_after, battery_flow = _simple_battery_kernel(
+        prices=hourly_prices.to_numpy(dtype=float),
+        prod=e_prod.to_numpy(dtype=float),
+        cons=e_cons.to_numpy(dtype=float),
+        capacity_kwh=battery_capacity_kwh,
+        efficiency=battery_efficiency,
+        power_kw=battery_power_kw,
+    )
+    return (
+        pd.Series(prod_after, index=e_prod.index),
+        pd.Series(cons_after, index=e_cons.index),
+        pd.Series(battery_flow, index=idx),
+    )
+
+
+def _simple_battery_kernel(
+    prices: np.ndarray,
+    prod: np.ndarray,
+    cons: np.ndarray,
+    capacity_kwh: float,
+    efficiency: float,
+    power_kw: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Jądro strategii na surowych tablicach.
+    Ładowanie tylko przy nadwyżce PV, rozładowanie tylko przy niedoborze
+    w godzinach drogich (>= 75 percentyl) — więc w danej godzinie jest
+    co najwyżej jeden przepływ, a SOC to obcięta suma skumulowana.
+    """
+    if capacity_kwh <= 0 or len(prices) == 0:
+        return prod.copy(), cons.copy(), np.zeros(len(prices))
 
     # threshold: rozładowanie gdy cena >= 75 percentyl
-    price_threshold = np.percentile(hourly_prices.values, 75)
-
-    for i, ts in enumerate(idx):
-        prod = e_prod.iloc[i]
-        cons = e_cons.iloc[i]
-        # najpierw autokonsumpcja (bez baterii) - to już będzie liczone wyżej
-        # ładowanie z nadwyżki PV
-        surplus = max(0.0, prod - cons)
-        # limit mocy ładowania
-        max_charge = min(battery_power_kw, surplus)
-        charge = min(max_charge, battery_capacity_kwh - soc)
-        # uwzględnij sprawność przy ładowaniu (roundtrip applied on discharge)
-        soc += charge
-        prod_after.iloc[i] = prod - charge  # ta energia poszła do baterii, nie do sieci
-        # rozładowanie jeśli cena wysoka i jest zapotrzebowanie
-        if hourly_prices.iloc[i] >= price_threshold and soc > 0:
-            # ile możemy oddać (moc i soc)
-            max_discharge = min(battery_power_kw, soc)
-            # ile potrzeba do pokrycia konsumpcji
-            needed = max(0.0, cons - prod_after.iloc[i])
-            discharge = min(max_discharge, needed)
-            # uwzględnij sprawność
-            delivered = discharge * battery_efficiency
-            soc -= discharge
-            cons_after.iloc[i] = cons - delivered
-            battery_flow[i] = delivered  # dodatnie = rozładowanie
-        soc_series[i] = soc
-
-    return prod_after, cons_after, pd.Series(battery_flow, index=idx)
+    price_threshold = np.percentile(prices, 75)
+
+    surplus = np.maximum(0.0, prod - cons)
+    needed = np.maximum(0.0, cons - prod)
+    delta = np.where(
+        surplus > 0,
+        np.minimum(power_kw, surplus),
+        np.where(prices >= price_threshold, -np.minimum(power_kw, needed), 0.0),
+    )
+    soc = soc_path(delta, capacity_kwh)
+    charge, discharge = soc_flows(soc)
+
+    # sprawność uwzględniona przy rozładowaniu (roundtrip)
+    delivered = discharge * efficiency
+    return prod - charge, cons - delivered, delivered
 
 # -----------------------
 # Symulacja roku
@@ -325,7 +448,7 @@ def simulate_year(
     idx = hourly_prices.index
     prod = production_profile_hourly.reindex(idx).fillna(0.0)
     cons = consumption_profile_hourly.reindex(idx).fillna(0.0)
-    tariff = tariff_hourly.reindex(idx).ffill().fillna(method='ffill').fillna(0.0)
+    tariff = tariff_hourly.reindex(idx).ffill().fillna(0.0)
 
     # Battery integration (optional)
     battery_cfg = params.get('battery')
@@ -341,40 +464,40 @@ def simulate_year(
     else:
         battery_flow = pd.Series(0.0, index=idx)
 
-    # Build hourly balance
-    rows = []
-    for ts in idx:
-        p = float(hourly_prices.at[ts, 'price_pln_kwh'])
-        t = float(tariff.at[ts])
-        r = hourly_balance_row(
-            price_h=p,
-            tariff_h=t,
-            e_prod_h=float(prod.at[ts]),
-            e_cons_h=float(cons.at[ts]),
-            net_billing_multiplier=net_mult,
-            grid_fee_h=(grid_fee.at[ts] if isinstance(grid_fee, pd.Series) else float(grid_fee))
-        )
-        rows.append(r)
-    hourly_df = pd.DataFrame(rows, index=idx)
-    # add battery_flow for diagnostics
-    hourly_df['battery_flow_kwh'] = battery_flow
+    if isinstance(grid_fee, pd.Series):
+        grid_fee_arr = grid_fee.reindex(idx).fillna(0.0).to_numpy(dtype=float)
+    else:
+        grid_fee_arr = float(grid_fee)
+
+    # Build hourly balance (element-wise, DataFrame budowany raz)
+    balance = hourly_balance_arrays(
+        price=hourly_prices['price_pln_kwh'].to_numpy(dtype=float),
+        tariff=tariff.to_numpy(dtype=float),
+        e_prod=prod.to_numpy(dtype=float),
+        e_cons=cons.to_numpy(dtype=float),
+        net_billing_multiplier=net_mult,
+        grid_fee=grid_fee_arr,
+    )
+    balance['battery_flow_kwh'] = battery_flow.to_numpy(dtype=float)
+    hourly_df = pd.DataFrame(balance, index=idx)
 
     # aggregate monthly
     monthly_df = aggregate_monthly(hourly_df)
 
     # rolling deposit
     deposit_df, balance_series = rolling_deposit(
-        monthly_revenues=monthly_df['revenue'],
-        monthly_costs=monthly_df['cost'],
+        monthly_revenues=monthly_df['revenue_export_h'],
+        monthly_costs=monthly_df['cost_import_h'],
         deposit_valid_months=deposit_months,
         refund_limit=refund_limit
     )
 
     annual_cashflow = {
-        'total_revenue': float(monthly_df['revenue'].sum()),
-        'total_cost': float(monthly_df['cost'].sum()),
+        'total_revenue': float(monthly_df['revenue_export_h'].sum()),
+        'total_cost': float(monthly_df['cost_import_h'].sum()),
         'total_refunds': float(deposit_df['refund'].sum()),
-        'net': float(monthly_df['revenue'].sum() - monthly_df['cost'].sum() - deposit_df['refund'].sum())
+        'total_lost': float(deposit_df['lost'].sum()),
+        'net': float(monthly_df['revenue_export_h'].sum() - monthly_df['cost_import_h'].sum() - deposit_df['refund'].sum())
     }
 
     return {
@@ -417,16 +540,25 @@ def expand_annual_to_hourly(annual_kwh: float, daily_profile: Dict[str, float],
 # -----------------------
 # Public helper: generate scenarios from CSV or synthetic
 # -----------------------
-def generate_price_scenarios(csv_path: Optional[str] = None, fallback_years: int = 3) -> Dict[str, pd.DataFrame]:
+def generate_price_scenarios(
+    csv_path: Optional[str] = None,
+    fallback_years: int = 3,
+    quantiles: Sequence[float] = (),
+    n_paths: int = 0,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     Jeśli csv_path istnieje -> wczytaj i zbuduj scenariusze.
-    W przeciwnym razie -> wygeneruj syntetyczne ceny i zbuduj scenariusze.
+    W przeciwnym razie -> ceny z magazynu historycznego (price_store),
+    a gdy jest pusty -> wygeneruj syntetyczne ceny i zbuduj scenariusze.
     """
     if csv_path and os.path.exists(csv_path):
         prices = load_hourly_prices(csv_path)
     else:
-        prices = generate_synthetic_hourly_prices(years=fallback_years)
-    scenarios = build_hourly_scenarios(prices)
+        prices = load_stored_prices()
+        if prices is None:
+            prices = generate_synthetic_hourly_prices(years=fallback_years)
+    scenarios = build_hourly_scenarios(prices, quantiles=quantiles, n_paths=n_paths, seed=seed)
     return scenarios
 
 # -----------------------
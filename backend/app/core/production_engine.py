@@ -1,11 +1,12 @@
 import math
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 from app.data.climate import get_temperature
 from app.data.sunlight import get_monthly_sunlight, DAYS_IN_MONTH
 from app.data.physics_constants import SYSTEM_LOSS_FACTOR_BASE
-from app.core.physics import calculate_monthly_irradiance_w_m2
-from app.core.physics import calculate_temperature_derating
 from app.schemas.scenarios import PanelPosition, FacetLayout
 
 
@@ -14,6 +15,22 @@ MONTHS = [
     "jul", "aug", "sep", "oct", "nov", "dec",
 ]
 
+DAYS_PER_MONTH = np.array([DAYS_IN_MONTH[m] for m in MONTHS], dtype=float)
+DAYS_PER_MONTH.setflags(write=False)
+
+
+@lru_cache(maxsize=None)
+def _monthly_temperatures(province: str) -> np.ndarray:
+    """Wektor 12 średnich temperatur województwa (tylko do odczytu)."""
+    temps = np.array([get_temperature(province, m) for m in MONTHS], dtype=float)
+    temps.setflags(write=False)
+    return temps
+
+
+def _monthly_vector(monthly: Dict[str, float]) -> np.ndarray:
+    """Słownik {jan: ..., dec: ...} → wektor (12,)."""
+    return np.array([monthly.get(m, 0.0) for m in MONTHS], dtype=float)
+
 
 class ProductionEngine:
 
@@ -54,6 +71,128 @@ class ProductionEngine:
 
         return iam_factors
 
+    # ---------------------------------------------------------
+    # 1a. MACIERZ PRODUKCJI (wiele konfiguracji naraz)
+    # ---------------------------------------------------------
+    def _production_arrays(
+        self,
+        panel_area_m2,
+        panel_efficiency,
+        province: str,
+        monthly_irradiance: Optional[Dict[str, float]] = None,
+        noct_celsius=45.0,
+        gamma_pmax_percent=-0.35,
+        azimuth_deg=180.0,
+        tilt_deg=30.0,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Wspólne jądro obliczeń: zwraca (produkcja, derating, T_ogniwa),
+        każda tablica o kształcie broadcast(parametry) + (12,).
+        Model identyczny z calculate_cell_temperature / calculate_monthly_iam /
+        calculate_temperature_derating — tylko liczony wektorowo.
+        """
+        if monthly_irradiance is None:
+            monthly_irradiance = get_monthly_sunlight(province)
+
+        area, eff, noct, gamma, azimuth, tilt = np.broadcast_arrays(
+            *(np.asarray(v, dtype=float) for v in (
+                panel_area_m2, panel_efficiency, noct_celsius,
+                gamma_pmax_percent, azimuth_deg, tilt_deg,
+            ))
+        )
+
+        irr_kwh_m2 = _monthly_vector(monthly_irradiance)
+        t_amb = _monthly_temperatures(province)
+
+        # Średnie natężenie [W/m²] — 6h efektywnego słońca dziennie
+        avg_irr_w_m2 = irr_kwh_m2 * 1000.0 / (DAYS_PER_MONTH * 6.0)
+
+        # NOCT: T_cell = T_amb + (NOCT - 20) / 800 * G  (przy G <= 0 → T_amb)
+        temperature_rise = ((noct[..., None] - 20.0) / 800.0) * avg_irr_w_m2
+        cell_temp = np.where(avg_irr_w_m2 > 0, t_amb + temperature_rise, t_amb)
+
+        # η_temp = 1 + γ × (T_cell - 25°C), przycięte do [0.50, 1.10]
+        derating = np.clip(
+            1.0 + (gamma[..., None] / 100.0) * (cell_temp - 25.0), 0.50, 1.10
+        )
+
+        # IAM — ta sama wartość dla 12 miesięcy, zaokrąglona jak w calculate_monthly_iam
+        iam = np.round(np.maximum(
+            0.80,
+            0.97 - 0.10 * (np.abs(180 - azimuth) / 180) - 0.10 * (np.abs(30 - tilt) / 60),
+        ), 4)
+
+        production = (
+            irr_kwh_m2
+            * area[..., None]
+            * eff[..., None]
+            * derating
+            * iam[..., None]
+            * SYSTEM_LOSS_FACTOR_BASE
+        )
+        return production, derating, cell_temp
+
+    def calculate_production_matrix(
+        self,
+        panel_area_m2,
+        panel_efficiency,
+        province: str,
+        monthly_irradiance: Optional[Dict[str, float]] = None,
+        noct_celsius=45.0,
+        gamma_pmax_percent=-0.35,
+        azimuth_deg=180.0,
+        tilt_deg=30.0,
+    ) -> np.ndarray:
+        """
+        Wektorowa wersja calculate_monthly_production.
+
+        Każdy parametr może być skalarem albo tablicą — kształty są
+        broadcastowane (np. panele (P, 1) × orientacje (1, O)). Zwraca macierz
+        produkcji [kWh] o kształcie broadcast(parametry) + (12,), bez zaokrągleń.
+        """
+        production, _, _ = self._production_arrays(
+            panel_area_m2=panel_area_m2,
+            panel_efficiency=panel_efficiency,
+            province=province,
+            monthly_irradiance=monthly_irradiance,
+            noct_celsius=noct_celsius,
+            gamma_pmax_percent=gamma_pmax_percent,
+            azimuth_deg=azimuth_deg,
+            tilt_deg=tilt_deg,
+        )
+        return production
+
+    def compare_panels(
+        self,
+        panels: Sequence[dict],
+        province: str,
+        orientations: Sequence[Tuple[float, float]],
+        monthly_irradiance: Optional[Dict[str, float]] = None,
+    ) -> np.ndarray:
+        """
+        Porównanie katalogowe: produkcja JEDNEGO panelu każdego modelu
+        na każdej orientacji (azymut, nachylenie) w jednym przebiegu.
+
+        Zwraca macierz (len(panels), len(orientations), 12) [kWh].
+        """
+        area = np.array([p["width_m"] * p["height_m"] for p in panels], dtype=float)
+        eff = np.array([p["efficiency"] for p in panels], dtype=float)
+        noct = np.array([p.get("noct_celsius", 45.0) for p in panels], dtype=float)
+        gamma = np.array([p.get("gamma_pmax_percent", -0.35) for p in panels], dtype=float)
+        azimuth = np.array([o[0] for o in orientations], dtype=float)
+        tilt = np.array([o[1] for o in orientations], dtype=float)
+
+        return self.calculate_production_matrix(
+            panel_area_m2=area[:, None],
+            panel_efficiency=eff[:, None],
+            province=province,
+            monthly_irradiance=monthly_irradiance,
+            noct_celsius=noct[:, None],
+            gamma_pmax_percent=gamma[:, None],
+            azimuth_deg=azimuth[None, :],
+            tilt_deg=tilt[None, :],
+        )
+
     # ---------------------------------------------------------
     # 1. MIESIĘCZNA PRODUKCJA (temperatura + IAM + straty)
     # ---------------------------------------------------------
@@ -69,48 +208,34 @@ class ProductionEngine:
         tilt_deg: float = 30.0,
     ) -> dict:
 
-        noct_celsius = panel_config.get("noct_celsius", 45.0)
-        gamma_pmax = panel_config.get("gamma_pmax_percent", -0.35)
-
-        iam_factor = self.calculate_monthly_iam(azimuth_deg, tilt_deg)
-
-        monthly_production: Dict[str, float] = {}
-        monthly_temp_derating: Dict[str, float] = {}
-        monthly_cell_temp_c: Dict[str, float] = {}
-
-        for m in MONTHS:
-            irr_kwh_m2 = monthly_irradiance.get(m, 0.0)
-            days = DAYS_IN_MONTH[m]
-            t_amb = get_temperature(province, m)
-
-            avg_irr_w_m2 = calculate_monthly_irradiance_w_m2(irr_kwh_m2, days)
-
-            t_cell = self.calculate_cell_temperature(t_amb, avg_irr_w_m2, noct_celsius)
-            monthly_cell_temp_c[m] = round(t_cell, 1)
-
-            temp_derating = calculate_temperature_derating(t_cell, gamma_pmax)
-            monthly_temp_derating[m] = round(temp_derating, 4)
-
-            iam_monthly = iam_factor.get(m, 1.0)
-
-            production_kwh = (
-                irr_kwh_m2
-                * panel_area_m2
-                * panel_efficiency
-                * temp_derating
-                * iam_monthly
-                * SYSTEM_LOSS_FACTOR_BASE
-            )
+        production, derating, cell_temp = self._production_arrays(
+            panel_area_m2=panel_area_m2,
+            panel_efficiency=panel_efficiency,
+            province=province,
+            monthly_irradiance=monthly_irradiance,
+            noct_celsius=panel_config.get("noct_celsius", 45.0),
+            gamma_pmax_percent=panel_config.get("gamma_pmax_percent", -0.35),
+            azimuth_deg=azimuth_deg,
+            tilt_deg=tilt_deg,
+        )
 
-            monthly_production[m] = round(production_kwh, 2)
+        return self._monthly_result(production, derating, cell_temp)
 
+    @staticmethod
+    def _monthly_result(
+        production: np.ndarray,
+        derating: np.ndarray,
+        cell_temp: np.ndarray,
+    ) -> dict:
+        """Wiersz macierzy (12,) → słownikowy format calculate_monthly_production."""
+        monthly_production = {m: round(float(v), 2) for m, v in zip(MONTHS, production)}
         annual_kwh = sum(monthly_production.values())
 
         return {
             "monthly_kwh": monthly_production,
             "annual_kwh": round(annual_kwh, 2),
-            "monthly_temp_derating": monthly_temp_derating,
-            "monthly_cell_temp": monthly_cell_temp_c,
+            "monthly_temp_derating": {m: round(float(v), 4) for m, v in zip(MONTHS, derating)},
+            "monthly_cell_temp": {m: round(float(v), 1) for m, v in zip(MONTHS, cell_temp)},
         }
 
     # ---------------------------------------------------------
@@ -125,15 +250,13 @@ class ProductionEngine:
         config: dict,
     ) -> dict:
 
-        placed_total = 0
-        total_prod = 0.0
-        facet_layouts: List[FacetLayout] = []
-        monthly_total: Dict[str, float] = {m: 0.0 for m in MONTHS}
-
         monthly_irradiance = get_monthly_sunlight(province)
         panel_cfg = config["panel"]
         panel_area = panel_cfg["width_m"] * panel_cfg["height_m"]
 
+        # Najpierw rozdział paneli, potem JEDNO wywołanie macierzy dla wszystkich połaci
+        placements = []
+        placed_total = 0
         for item in scored_facets:
             if placed_total >= panels_to_place:
                 break
@@ -142,24 +265,34 @@ class ProductionEngine:
             if to_place <= 0:
                 continue
 
-            facet_obj = item["facet_obj"]
+            placements.append((item, to_place))
+            placed_total += to_place
 
-            m_prod = self.calculate_monthly_production(
-                panel_power_kwp=power_kwp,
-                panel_area_m2=panel_area * to_place,
+        monthly_total: Dict[str, float] = {m: 0.0 for m in MONTHS}
+        total_prod = 0.0
+        facet_layouts: List[FacetLayout] = []
+
+        if placements:
+            facets = [item["facet_obj"] for item, _ in placements]
+            production = self.calculate_production_matrix(
+                panel_area_m2=np.array([panel_area * n for _, n in placements]),
                 panel_efficiency=panel_cfg["efficiency"],
                 province=province,
                 monthly_irradiance=monthly_irradiance,
-                panel_config=panel_cfg,
-                azimuth_deg=facet_obj.azimuth_deg,
-                tilt_deg=getattr(facet_obj, "tilt_deg", 30.0),
+                noct_celsius=panel_cfg.get("noct_celsius", 45.0),
+                gamma_pmax_percent=panel_cfg.get("gamma_pmax_percent", -0.35),
+                azimuth_deg=np.array([f.azimuth_deg for f in facets], dtype=float),
+                tilt_deg=np.array([getattr(f, "tilt_deg", 30.0) for f in facets], dtype=float),
             )
+            monthly_rounded = np.array(
+                [[round(float(v), 2) for v in row] for row in production]
+            )
+            for i, m in enumerate(MONTHS):
+                monthly_total[m] = float(monthly_rounded[:, i].sum())
+            total_prod = float(sum(round(float(v), 2) for v in monthly_rounded.sum(axis=1)))
 
-            for m in MONTHS:
-                monthly_total[m] += m_prod["monthly_kwh"][m]
-
-            total_prod += m_prod["annual_kwh"]
-
+        for item, to_place in placements:
+            facet_obj = item["facet_obj"]
             facet_layouts.append(
                 FacetLayout(
                     facet_id=facet_obj.id,
@@ -179,8 +312,6 @@ class ProductionEngine:
                 )
             )
 
-            placed_total += to_place
-
         return {
             "placed_total": placed_total,
             "total_production_kwh": total_prod,
@@ -199,27 +330,33 @@ class ProductionEngine:
         best_facet: dict,
         province: str,
         config: dict,
+        sample_annual_kwh: Optional[float] = None,
     ) -> int:
+        """
+        sample_annual_kwh: roczna produkcja jednego panelu, jeśli została już
+        policzona (np. wiersz z compare_panels) — wtedy nie liczymy jej ponownie.
+        """
+        if sample_annual_kwh is None:
+            monthly_irradiance = get_monthly_sunlight(province)
+            panel_cfg = config["panel"]
+            panel_area = panel_cfg["width_m"] * panel_cfg["height_m"]
+
+            sample = self.calculate_monthly_production(
+                panel_power_kwp=power_kwp,
+                panel_area_m2=panel_area,
+                panel_efficiency=panel_cfg["efficiency"],
+                province=province,
+                monthly_irradiance=monthly_irradiance,
+                panel_config=panel_cfg,
+                azimuth_deg=best_facet["facet_obj"].azimuth_deg,
+                tilt_deg=getattr(best_facet["facet_obj"], "tilt_deg", 30.0),
+            )
+            sample_annual_kwh = sample["annual_kwh"]
 
-        monthly_irradiance = get_monthly_sunlight(province)
-        panel_cfg = config["panel"]
-        panel_area = panel_cfg["width_m"] * panel_cfg["height_m"]
-
-        sample = self.calculate_monthly_production(
-            panel_power_kwp=power_kwp,
-            panel_area_m2=panel_area,
-            panel_efficiency=panel_cfg["efficiency"],
-            province=province,
-            monthly_irradiance=monthly_irradiance,
-            panel_config=panel_cfg,
-            azimuth_deg=best_facet["facet_obj"].azimuth_deg,
-            tilt_deg=getattr(best_facet["facet_obj"], "tilt_deg", 30.0),
-        )
-
-        if sample["annual_kwh"] <= 0:
+        if sample_annual_kwh <= 0:
             return 10
 
-        return math.ceil((future_demand * target_ratio) / sample["annual_kwh"])
+        return math.ceil((future_demand * target_ratio) / sample_annual_kwh)
 
     # ---------------------------------------------------------
     # 4. SPRAWNOŚĆ SYSTEMU (azymut + kąt)
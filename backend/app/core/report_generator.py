@@ -7,7 +7,8 @@ ARCHITEKTURA:
   • Krok 2 — stabilny generator: 4 metody wykresów + generate()
   • Krok 3 — wizualne odwzorowanie frontendu 1:1:
       - _chart_monthly_balance  → kolory Tailwind jak w EnergyFlowChart.jsx
-      - _chart_cashflow_25      → AreaChart jak CashflowChart25 (React)
+      - _chart_cashflow_25      → AreaChart jak CashflowChart25 (React), dane z pv/battery_cashflow_25y
+      - _chart_sensitivity      → tornado: okres zwrotu przy ±delta wejść (gdy w wyniku jest "sensitivity")
       - _chart_daily_flow       → brak legend per-wykres, jedna legenda na dole
       - _chart_roof_panels      → SVG programatyczny (jak RoofVisualizer.jsx v5.1):
                                    panel: gradient #0A1A2F→#15273D→#1F2F45 stroke #2A2F33
@@ -340,29 +341,20 @@ class ReportGenerator:
         if not MATPLOTLIB_AVAILABLE:
             return ""
 
-        pv_cost    = std.get("pv_cost_gross_pln") or 0
-        bat_cost   = (std.get("with_battery_total_cost_pln") or
-                      std.get("total_cost_with_battery_pln") or 0)
-        pv_annual  = std.get("pv_savings_pln") or 0
-        bat_annual = std.get("total_savings_with_battery_pln") or 0
-        has_bat    = bat_annual > 0 and bat_cost > 0
-
-        # Obliczenia identyczne z CashflowChart25 (React)
-        lata    = list(range(1, 26))
-        pv_cum  = []
-        bat_cum = []
-        pv_net  = -pv_cost
-        bat_net = -bat_cost if has_bat else None
-
-        for y in lata:
-            f = 1.04 ** (y - 1)
-            pv_net += pv_annual * f
-            pv_cum.append(round(pv_net))
-            if has_bat and bat_net is not None:
-                bat_net += bat_annual * f
-                bat_cum.append(round(bat_net))
-
-        payback_yr = next((y for y, v in zip(lata, pv_cum) if v >= 0), None)
+        # Krzywe z FinancialEngine.compute_roi (cashflow_series) — te same co w API
+        # i frontendzie, z OPEX i wymianą falownika; bez ponownego przeliczania
+        pv_series  = std.get("pv_cashflow_25y") or {}
+        bat_series = std.get("battery_cashflow_25y") or {}
+        pv_cum     = pv_series.get("cumulative_net_pln") or []
+        bat_cum    = bat_series.get("cumulative_net_pln") or []
+        if not pv_cum:
+            return ""
+        has_bat    = bool(bat_cum) and len(bat_cum) == len(pv_cum)
+        lata       = list(range(1, len(pv_cum) + 1))
+
+        # Rok zwrotu — ten sam payback co w wyniku scenariusza
+        payback    = std.get("pv_payback_years") or 0
+        payback_yr = payback if 0 < payback < len(lata) else None
 
         fig, ax = plt.subplots(figsize=(11, 4.0), facecolor="white")
         self._style_ax(ax, xlabel="Rok", ylabel="Zysk netto")
@@ -402,16 +394,17 @@ class ReportGenerator:
                        linestyle=":", alpha=0.85, zorder=3)
             y_pos = max(pv_cum) * 0.08 if pv_cum else 0
             ax.text(payback_yr + 0.3, y_pos,
-                    f"Zwrot w ~{payback_yr}.\u00a0roku",
+                    f"Zwrot po ~{payback_yr:.1f}".replace(".", ",") + "\u00a0latach",
                     fontsize=8.5, color=C_PAYBACK_CLR,
                     fontweight="bold", va="bottom")
 
         # Oś X: 1, 4, 8, 12, 16, 20, 24, 25
-        x_ticks = [1] + list(range(4, 26, 4)) + [25]
+        horizon = len(lata)
+        x_ticks = [1] + list(range(4, horizon + 1, 4)) + ([horizon] if horizon % 4 else [])
         ax.set_xticks(x_ticks)
         ax.set_xticklabels([str(t) for t in x_ticks],
                            fontsize=8, color=C_TICK)
-        ax.set_xlim(0.5, 25.5)
+        ax.set_xlim(0.5, horizon + 0.5)
 
         # Oś Y: tysiące (10k, 20k, …)
         def _k(v, _):
@@ -426,6 +419,55 @@ class ReportGenerator:
         fig.tight_layout(pad=1.2)
         return self._fig_to_b64(fig)
 
+    # =========================================================================
+    # WYKRES 2b — Analiza wrażliwości (tornado)
+    # Poziome słupki: okres zwrotu przy niższej / wyższej wartości każdego wejścia
+    # (±delta, orientacja ±stopnie), od wartości bazowej; wejścia posortowane
+    # malejąco po największym odchyleniu od bazy
+    # =========================================================================
+
+    def _chart_sensitivity(self, std: dict) -> str:
+        if not MATPLOTLIB_AVAILABLE:
+            return ""
+
+        sens  = std.get("sensitivity") or {}
+        items = sens.get("items") or []
+        if not items:
+            return ""
+
+        base  = sens["base"]["payback_years"]
+        pct   = int(round(sens.get("delta", 0.1) * 100))
+        items = items[::-1]                       # największa rozpiętość na górze
+        y     = np.arange(len(items))
+        low   = np.array([i["payback_low_years"]  for i in items]) - base
+        high  = np.array([i["payback_high_years"] for i in items]) - base
+
+        fig, ax = plt.subplots(figsize=(11, 0.45 * len(items) + 1.2), facecolor="white")
+        self._style_ax(ax, xlabel="Okres zwrotu [lata]")
+        ax.xaxis.grid(True, color=C_GRID_LINE, linewidth=0.7,
+                      linestyle=(0, (3, 3)), zorder=0)
+        ax.yaxis.grid(False)
+
+        ax.barh(y, low,  left=base, height=0.6, color=C_CONSUMPTION,
+                zorder=2, label="wartość niższa")
+        ax.barh(y, high, left=base, height=0.6, color=C_PV,
+                zorder=2, label="wartość wyższa")
+        ax.axvline(base, color=C_ZERO_LINE, linewidth=1.5,
+                   linestyle=(0, (4, 2)), zorder=3)
+
+        ax.text(base, len(items) - 0.45,
+                f"bazowo {base:.1f} lat".replace(".", ","),
+                fontsize=7.5, color=C_ZERO_LINE, ha="center", va="bottom")
+
+        ax.set_yticks(y)
+        labels = [f"{i['label']} ({i.get('variation') or f'±{pct}%'})" for i in items]
+        ax.set_yticklabels(labels, fontsize=8.5, color=C_TEXT)
+        ax.legend(loc="lower right", frameon=True,
+                  edgecolor=C_GRID_LINE, fontsize=8.5)
+
+        fig.tight_layout(pad=1.2)
+        return self._fig_to_b64(fig)
+
     # =========================================================================
     # WYKRES 3 — Dobowy przepływ energii (lato + zima)
     # ComposedChart: bars + linia SOC
@@ -989,6 +1031,7 @@ class ReportGenerator:
         for name, method, args in [
             ("monthly_balance", self._chart_monthly_balance, (std,)),
             ("payback",         self._chart_cashflow_25,     (std,)),
+            ("sensitivity",     self._chart_sensitivity,     (std,)),
             ("daily_flow",      self._chart_daily_flow,      (std,)),
             ("roof_panels",     self._chart_roof_panels,     (std, report_data.input_request)),
         ]:
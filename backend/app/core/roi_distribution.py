@@ -0,0 +1,180 @@
+# backend/app/core/roi_distribution.py
+"""
+Rozkład ROI (Monte Carlo) zamiast trzech stałych wariantów
+payback_optimistic / payback_pessimistic.
+
+Losowane niezależnie dla każdej próby (domyślnie 10 000):
+- inflacja cen energii detalicznej (normalny, obcięty),
+- zmiana RCEm r/r — wartość energii oddanej do sieci (normalny, obcięty),
+- degradacja paneli (trójkątny),
+- OPEX jako % CAPEX i inflacja kosztów OPEX,
+- rok wymiany falownika (jednostajny całkowity).
+
+Przepływy 25-letnie dla wszystkich prób liczy jedno wywołanie
+cashflow_grid() (broadcast NumPy, bez pętli po próbach i latach w Pythonie).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.financial_engine import cashflow_grid
+from app.data.equipment_catalog import get_equipment_catalog
+
+N_SAMPLES_DEFAULT = 10_000
+N_SAMPLES_MAX = 100_000
+HISTOGRAM_BINS_DEFAULT = 25
+QUANTILES_DEFAULT = (5, 10, 25, 50, 75, 90, 95)
+
+# Rozkłady parametrów: (średnia, odchylenie, min, max) / (min, moda, max)
+ENERGY_INFLATION = (0.04, 0.02, -0.02, 0.12)
+RCEM_CHANGE = (0.02, 0.03, -0.05, 0.10)
+COST_INFLATION = (0.03, 0.01, 0.0, 0.08)
+DEGRADATION = (0.003, 0.005, 0.008)
+OPEX_SHARE = (0.003, 0.005, 0.010)
+INVERTER_REPLACEMENT_YEARS = (10, 16)
+
+
+def _truncated_normal(rng: np.random.Generator, params: Sequence[float], n: int) -> np.ndarray:
+    mean, std, low, high = params
+    return np.clip(rng.normal(mean, std, n), low, high)
+
+
+def sample_roi_parameters(
+    n_samples: int = N_SAMPLES_DEFAULT,
+    seed: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Wektory (n_samples,) losowanych parametrów modelu przepływów."""
+    if not 1 <= n_samples <= N_SAMPLES_MAX:
+        raise ValueError(f"n_samples musi być z zakresu 1..{N_SAMPLES_MAX}, otrzymano {n_samples}")
+    rng = np.random.default_rng(seed)
+    first, last = INVERTER_REPLACEMENT_YEARS
+    return {
+        "energy_inflation": _truncated_normal(rng, ENERGY_INFLATION, n_samples),
+        "rcem_change": _truncated_normal(rng, RCEM_CHANGE, n_samples),
+        "cost_inflation": _truncated_normal(rng, COST_INFLATION, n_samples),
+        "degradation": rng.triangular(*DEGRADATION, n_samples),
+        "opex_share": rng.triangular(*OPEX_SHARE, n_samples),
+        "inverter_replacement_year": rng.integers(first, last + 1, n_samples),
+    }
+
+
+def _summary(values: np.ndarray, quantiles: Sequence[int], digits: int) -> Dict[str, float]:
+    result = {"mean": round(float(values.mean()), digits)}
+    for q, v in zip(quantiles, np.percentile(values, quantiles)):
+        result[f"p{q}"] = round(float(v), digits)
+    return result
+
+
+def simulate_roi_distribution(
+    investment_pln: float,
+    annual_savings_pln: float,
+    export_savings_pln: float = 0.0,
+    inverter_cost_pln: float = 0.0,
+    savings_adjustment_pln: Optional[List[float]] = None,
+    extra_costs_pln: Optional[List[float]] = None,
+    n_samples: int = N_SAMPLES_DEFAULT,
+    horizon_years: int = 25,
+    bins: int = HISTOGRAM_BINS_DEFAULT,
+    quantiles: Sequence[int] = QUANTILES_DEFAULT,
+    seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Rozkład okresu zwrotu i sumy oszczędności w horyzoncie.
+
+    Args:
+        investment_pln: CAPEX brutto
+        annual_savings_pln: oszczędności w roku 1 (łącznie z net-billingiem)
+        export_savings_pln: część oszczędności z energii oddanej (rośnie wg zmian RCEm)
+        inverter_cost_pln: cena falownika (wymiana = 60%)
+        savings_adjustment_pln, extra_costs_pln: korekty rok po roku jak w
+            FinancialEngine.compute_roi (degradacja i wymiana magazynu)
+    """
+    if investment_pln < 0:
+        raise ValueError("Koszt inwestycji nie może być ujemny")
+    if bins < 1:
+        raise ValueError("Liczba przedziałów histogramu musi być dodatnia")
+    quantiles = tuple(int(q) for q in quantiles)
+    if any(not 0 <= q <= 100 for q in quantiles):
+        raise ValueError("Kwantyle muszą być z zakresu 0..100")
+
+    export = min(max(export_savings_pln, 0.0), max(annual_savings_pln, 0.0))
+    samples = sample_roi_parameters(n_samples, seed)
+    grid = cashflow_grid(
+        investment=investment_pln,
+        annual_savings_y1=annual_savings_pln - export,
+        export_savings_y1=export,
+        export_inflation=samples["rcem_change"],
+        inverter_cost=inverter_cost_pln,
+        degradation=samples["degradation"],
+        energy_inflation=samples["energy_inflation"],
+        cost_inflation=samples["cost_inflation"],
+        opex_base=investment_pln * samples["opex_share"],
+        inverter_replacement_year=samples["inverter_replacement_year"],
+        horizon=horizon_years,
+        savings_adjustment=0.0 if savings_adjustment_pln is None else savings_adjustment_pln,
+        extra_costs=0.0 if extra_costs_pln is None else extra_costs_pln,
+    )
+    payback = grid["payback_years"]
+    reached = grid["cumulative"][:, -1] >= investment_pln
+    counts, edges = np.histogram(payback, bins=bins, range=(0.0, float(horizon_years)))
+
+    return {
+        "n_samples": n_samples,
+        "seed": seed,
+        "horizon_years": horizon_years,
+        "inputs": {
+            "investment_pln": round(investment_pln, 2),
+            "annual_savings_pln": round(annual_savings_pln, 2),
+            "export_savings_pln": round(export, 2),
+            "inverter_cost_pln": round(inverter_cost_pln, 2),
+        },
+        "payback_years": _summary(payback, quantiles, 1),
+        "total_savings_25y_pln": _summary(grid["total_pln"], quantiles, 0),
+        "npv_pln": _summary(grid["npv_pln"], quantiles, 0),
+        "probability_payback_within_horizon": round(float(reached.mean()), 4),
+        "histogram": {
+            "bin_edges_years": [round(float(e), 2) for e in edges],
+            "counts": counts.tolist(),
+        },
+    }
+
+
+def scenario_roi_inputs(scenario: Dict[str, Any], with_battery: bool = False) -> Dict[str, Any]:
+    """
+    Wejście symulacji z pozycji ScenariosResponse (model_dump):
+    CAPEX, oszczędności roku 1, część z net-billingu i cena falownika;
+    z baterią także korekty degradacji i wymiany magazynu (battery_degradation).
+    """
+    if with_battery:
+        if not scenario.get("battery_recommended"):
+            raise ValueError(f"Scenariusz {scenario.get('scenario_name')} nie zawiera baterii")
+        investment = scenario["total_cost_with_battery_pln"]
+        savings = scenario["total_savings_with_battery_pln"]
+        hourly = scenario.get("hourly_result_with_battery")
+    else:
+        investment = scenario["pv_cost_gross_pln"]
+        savings = scenario["pv_savings_pln"]
+        hourly = scenario.get("hourly_result_without_battery")
+
+    if hourly:
+        export = hourly["annual_cashflow"]["net_billing_pln"]
+    else:
+        export = scenario.get("net_billing_annual_deposit_pln", 0.0)
+
+    inverter_cost = scenario.get("inverter_cost_pln")
+    if inverter_cost is None:
+        # Starsze wyniki bez ceny z marżą — cena katalogowa
+        inverters = get_equipment_catalog().inverters
+        inverter_cost = inverters.price(inverters.id_of(scenario.get("inverter_model")))
+    inputs = {
+        "investment_pln": float(investment),
+        "annual_savings_pln": float(savings),
+        "export_savings_pln": float(export),
+        "inverter_cost_pln": float(inverter_cost),
+    }
+    degradation = scenario.get("battery_degradation") if with_battery else None
+    if degradation:
+        inputs["savings_adjustment_pln"] = degradation["savings_adjustment_pln"]
+        inputs["extra_costs_pln"] = degradation["replacement_costs_pln"]
+    return inputs
@@ -22,18 +22,24 @@ from typing import Dict, Any, Optional, List
 
 from app.core.hourly_engine import HourlyEngine
 from app.core.battery_engine import BatteryEngine
+from app.core.battery_degradation import degradation_forecast, savings_adjustment
+from app.core.battery_sizing import sweep_battery_catalog
 from app.core.financial_engine import FinancialEngine
 from app.core.layout_engine import LayoutEngine
 from app.core.production_engine import ProductionEngine
 from app.data.energy_rates import (
     get_retail_tariff_pln_per_kwh,
-    get_tariff_zones_g11,
-    get_tariff_zones_g12,
     calculate_average_tariff,
 )
+from app.data.tariff_catalog import DYNAMIC_TARIFF, dynamic_tariff_vector, get_tariff
 from app.core.facet_geometry import compute_facet_area_and_length
 from app.core.consumption_engine import decompose_consumption
+from app.core.thermal_load import thermal_load_profiles
+from app.core.estimate_annual_consumption import EV_KM_PER_YEAR_DEFAULT, estimate_ev_load
+from app.core.meter_data import require_meter_profile
 
+# Obecny EV (zawarty w rachunku): najwyżej taka część rocznego zużycia
+EXISTING_EV_MAX_SHARE = 0.5
 
 # =============================================================================
 # DATACLASS WYNIKOWY
@@ -84,6 +90,14 @@ class ScenarioResult:
     shading_loss_percent: float = 0.0
     hourly_result_without_battery: Optional[Dict[str, Any]] = None
     hourly_result_with_battery: Optional[Dict[str, Any]] = None
+    ev_charging: Optional[Dict[str, Any]] = None
+    curtailment: Optional[Dict[str, Any]] = None
+    sensitivity: Optional[Dict[str, Any]] = None
+    pv_cashflow_25y: Optional[Dict[str, Any]] = None
+    battery_cashflow_25y: Optional[Dict[str, Any]] = None
+    battery_sweep: Optional[Dict[str, Any]] = None
+    battery_degradation: Optional[Dict[str, Any]] = None
+    inverter_cost_pln: float = 0.0
 
 
 # =============================================================================
@@ -128,6 +142,8 @@ class ScenarioRunner:
         battery_payback_optimistic         = 0.0
         battery_payback_pessimistic        = 0.0
         battery_total_savings_25y          = 0.0
+        battery_cashflow_25y               = None
+        battery_degradation                = None
         battery_cost_gross_pln             = 0.0
         total_cost_with_battery_pln        = 0.0
         autoconsumption_rate_with_battery  = 0.0
@@ -154,6 +170,9 @@ class ScenarioRunner:
         )
         max_panels = max_panels_info["placed_count"]
 
+        # Produkcja jednego panelu policzona wcześniej dla wszystkich tierów naraz (engine.py)
+        unit_production = (self.context.get("tier_unit_production") or {}).get(quality_tier)
+
         required_panels = self.production_engine.estimate_required_panels(
             future_demand=annual_consumption_kwh,
             target_ratio=1.1,
@@ -161,6 +180,7 @@ class ScenarioRunner:
             best_facet={"facet_obj": facet},
             province=location,
             config={"panel": panel_data},
+            sample_annual_kwh=unit_production["sizing_annual_kwh"] if unit_production else None,
         )
 
         panels_count = min(max_panels, required_panels)
@@ -239,63 +259,94 @@ class ScenarioRunner:
             "south",
         )
 
-        yield_result = self.production_engine.calculate_monthly_production(
-            panel_power_kwp=panel_power_kwp,
-            panel_area_m2=(panel_data["width_m"] * panel_data["height_m"]) * panels_count,
-            panel_efficiency=panel_data["efficiency"],
-            province=location,
-            monthly_irradiance=monthly_irradiance,
-            panel_config=panel_data,
-            azimuth_deg=self.context["roof_azimuth"],
-            tilt_deg=self.context["roof_tilt"],
-        )
+        if unit_production:
+            # Produkcja liniowa względem powierzchni → skalujemy wiersz jednego panelu
+            annual_kwh = round(sum(
+                round(float(v), 2) for v in unit_production["yield_monthly_kwh"] * panels_count
+            ), 2)
+        else:
+            yield_result = self.production_engine.calculate_monthly_production(
+                panel_power_kwp=panel_power_kwp,
+                panel_area_m2=(panel_data["width_m"] * panel_data["height_m"]) * panels_count,
+                panel_efficiency=panel_data["efficiency"],
+                province=location,
+                monthly_irradiance=monthly_irradiance,
+                panel_config=panel_data,
+                azimuth_deg=self.context["roof_azimuth"],
+                tilt_deg=self.context["roof_tilt"],
+            )
+            annual_kwh = yield_result["annual_kwh"]
 
         # Roczna produkcja z korektą zacienienia
-        annual_production_kwh = yield_result["annual_kwh"] * (1.0 - shading_loss)
+        annual_production_kwh = annual_kwh * (1.0 - shading_loss)
 
         # =====================================================================
-        # KROK 4: Parametry taryfowe
+        # KROK 4: Ceny RCEm i parametry taryfowe
         # =====================================================================
-        from app.data.energy_rates import ENERGY_RATES, decompose_electricity_tariff
+        from app.data.energy_prices_tge import get_rcem_array
+        from app.data.price_store import get_historical_prices, get_market_prices
+
+        # Tablica tylko do odczytu z cache — bez przebudowy 8760 cen dla każdego tieru.
+        # price_year → rzeczywiste ceny z magazynu historycznego (mmap, bez parsowania CSV)
+        price_year = getattr(self.context["request"], "price_year", None)
+        if price_year:
+            rcem_hourly = get_historical_prices(price_year)
+            if rcem_hourly is None:
+                raise ValueError(f"Brak cen historycznych dla roku {price_year}")
+        else:
+            rcem_hourly = get_rcem_array(year=2025)
 
         tariff_type = self.context.get("tariff_type", "G11").lower().replace("-", "")
-        rates       = (
-            ENERGY_RATES.get(operator, ENERGY_RATES["pge"])
-            .get(tariff_type, ENERGY_RATES["pge"]["g11"])
-        )
-
-        other_fees = (
-            rates.get("quality_fee_kwh", 0)
-            + rates.get("oze_fee_kwh", 0)
-            + rates.get("cogeneration_fee_kwh", 0)
-        )
-
-        components = decompose_electricity_tariff(operator, tariff_type)
-        avg_tariff  = components["total_variable_pln_per_kwh"]
-
-        if "energy_price_kwh" in rates:
-            tariff_zones = get_tariff_zones_g11(avg_tariff)
-        else:
-            v_peak = (
-                rates["energy_price_kwh_peak"]
-                + rates["distribution_variable_kwh_peak"]
-                + other_fees
-            )
-            v_off = (
-                rates["energy_price_kwh_offpeak"]
-                + rates["distribution_variable_kwh_offpeak"]
-                + other_fees
-            )
-            tariff_zones = get_tariff_zones_g12(v_peak, v_off)
+        tariff_record = get_tariff(operator, tariff_type)
+        avg_tariff  = tariff_record.total_variable_pln_per_kwh
+        tariff_zones = dict(enumerate(tariff_record.zones))
+
+        # Taryfa dynamiczna: 8760 cen zakupu z cen rynkowych (magazyn cen; bez danych — RCEm)
+        tariff_vector = None
+        if tariff_type == DYNAMIC_TARIFF:
+            market = get_market_prices(price_year)
+            if market is not None:
+                tariff_vector = dynamic_tariff_vector(operator, market)
+            else:
+                tariff_vector = dynamic_tariff_vector(operator, rcem_hourly, market_prices_gross=True)
+            avg_tariff = float(tariff_vector.mean())
+            tariff_zones = None
 
         # =====================================================================
         # KROK 4b: Symulacja godzinowa — BEZ BATERII
         # =====================================================================
-        from app.data.energy_prices_tge import get_rcem_hourly
+        req = self.context["request"]
+
+        # Profil z licznika (meter_data) zastępuje syntetyczny profil gospodarstwa
+        profile_id = getattr(req, "consumption_profile_id", None)
+        measured_profile = require_meter_profile(profile_id) if profile_id else None
+
+        buckets = decompose_consumption(
+            annual_consumption_kwh, req, measured=measured_profile is not None
+        )
 
-        rcem_hourly = get_rcem_hourly(year=2025)
+        # Kształt godzinowy pompy ciepła / klimatyzacji z modelu stopniogodzin
+        thermal = thermal_load_profiles(
+            location,
+            getattr(req, "building_standard", None) or "WT2021",
+            float(getattr(req, "area_m2", None) or 150.0),
+        )
 
-        buckets = decompose_consumption(annual_consumption_kwh, self.context["request"])
+        # EV (obecny lub planowany) — kształt z okien podłączenia zamiast profilu domu
+        ev_config = None
+        # (obecny EV jest już w pomiarze z licznika — dokładamy tylko planowany)
+        has_ev = getattr(req, "has_ev", False) and measured_profile is None
+        planned_ev = getattr(req, "planned_ev", False)
+        if has_ev or planned_ev:
+            ev_kwh = estimate_ev_load(getattr(req, "ev_km_per_year", None) or EV_KM_PER_YEAR_DEFAULT)
+            if not planned_ev:
+                # Obecny EV jest już w rachunku — nie może zjeść całego zużycia domu
+                ev_kwh = min(ev_kwh, annual_consumption_kwh * EXISTING_EV_MAX_SHARE)
+            ev_config = {
+                "annual_kwh":     ev_kwh,
+                "pattern":        getattr(req, "ev_pattern", None) or "commuter",
+                "smart_charging": getattr(req, "ev_smart_charging", True),
+            }
 
         hourly_engine_no_batt = HourlyEngine(
             annual_production_kwh=annual_production_kwh,
@@ -306,6 +357,13 @@ class ScenarioRunner:
             tariff_zones=tariff_zones,
             heating_kwh=buckets["heating_kwh"],
             cooling_kwh=buckets["cooling_kwh"],
+            heating_profile=thermal["heating_kwh"],
+            cooling_profile=thermal["cooling_kwh"],
+            ev_config=ev_config,
+            measured_profile=measured_profile,
+            timestep_minutes=getattr(req, "simulation_timestep_minutes", 60) or 60,
+            tariff_hourly=tariff_vector,
+            export_limit_kw=getattr(req, "export_limit_kw", None),
             battery_config={
                 "operator":            operator,
                 "household_size":      self.context.get("household_size", 3),
@@ -347,7 +405,11 @@ class ScenarioRunner:
         # =====================================================================
         # KROK 6: Rekomendacja baterii
         # =====================================================================
-        surplus_kwh = hourly_result_no_batt["energy_flow"]["surplus_kwh"]
+        # Heurystyka liczy nadwyżkę przed limitem eksportu (obcięta energia też może trafić do baterii)
+        surplus_kwh = (
+            hourly_result_no_batt["energy_flow"]["surplus_kwh"]
+            + hourly_result_no_batt["curtailment"]["curtailed_kwh"]
+        )
 
         battery_recommendation = self.battery_engine.recommend_battery(
             annual_production_kwh=annual_production_kwh,
@@ -370,14 +432,49 @@ class ScenarioRunner:
             battery_power_kw     = 0.0
             battery_model        = ""
 
+        # =====================================================================
+        # KROK 6b: Przegląd katalogu baterii (ranking po NPV, jeden przebieg) —
+        #          tylko przy doborze z katalogu
+        # =====================================================================
+        # Parametry symulacji baterii: heurystyka (stawka tieru) albo model z katalogu
+        battery_sweep = None
+        battery_usable_kwh = battery_capacity_kwh
+        battery_efficiency = 0.95
+        battery_price_pln  = None
+        battery_specs: Dict[str, Any] = {}   # chemia, cykle, gwarancja (degradacja)
+        if getattr(req, "battery_sizing", "heuristic") == "catalog":
+            battery_sweep = sweep_battery_catalog(
+                hourly_engine=hourly_engine_no_batt,
+                financial_engine=self.financial_engine,
+                pv_cost_gross_pln=pv_cost_gross_pln,
+                inverter_cost_pln=capex_pv.get("inverter_cost_pln", 0),
+                dispatch=getattr(req, "battery_dispatch", "greedy") or "greedy",
+            )
+            best = battery_sweep["best"]
+            battery_recommended = best is not None and best["npv_gain_pln"] > 0
+            if battery_recommended:
+                battery_capacity_kwh      = best["capacity_kwh"]
+                battery_usable_kwh        = best["usable_capacity_kwh"]
+                battery_power_kw          = best["power_kw"]
+                battery_model             = best["name"]
+                battery_efficiency        = best["efficiency"]
+                battery_price_pln         = best["price_pln"]
+                battery_specs             = best
+                is_economically_justified = True
+            else:
+                battery_capacity_kwh = 0.0
+                battery_power_kw     = 0.0
+                battery_model        = ""
+
         # =====================================================================
         # KROK 7: Symulacja godzinowa — Z BATERIĄ (jeśli rekomendowana)
         # =====================================================================
         if battery_recommended and battery_capacity_kwh > 0:
             battery_cfg = {
-                "capacity_kwh":        battery_capacity_kwh,
+                "capacity_kwh":        battery_usable_kwh,
                 "power_kw":            battery_power_kw,
-                "efficiency":          0.95,
+                "efficiency":          battery_efficiency,
+                "dispatch":            getattr(req, "battery_dispatch", "greedy") or "greedy",
                 "operator":            operator,
                 "household_size":      self.context.get("household_size", 3),
                 "people_home_weekday": self.context.get("people_home_weekday", 1),
@@ -393,11 +490,21 @@ class ScenarioRunner:
                 # Identyczne buckets jak bez baterii — wyniki są porównywalne
                 heating_kwh=buckets["heating_kwh"],
                 cooling_kwh=buckets["cooling_kwh"],
+                heating_profile=thermal["heating_kwh"],
+                cooling_profile=thermal["cooling_kwh"],
+                ev_config=ev_config,
+                measured_profile=measured_profile,
+                timestep_minutes=getattr(req, "simulation_timestep_minutes", 60) or 60,
+                tariff_hourly=tariff_vector,
+                export_limit_kw=getattr(req, "export_limit_kw", None),
                 battery_config=battery_cfg,
             )
 
-            # Symulacja z baterią — BEZ przekazywania production_profile (ta sama logika co wyżej)
-            hourly_result_with_batt = hourly_engine_with_batt.run_hourly_simulation()
+            # Symulacja z baterią — BEZ przekazywania production_profile (ta sama logika co wyżej);
+            # przy sterowaniu wg cen także wartość względem zachłannego (RCEm / taryfa, bez depozytu)
+            hourly_result_with_batt = hourly_engine_with_batt.run_hourly_simulation(
+                dispatch_comparison=battery_cfg["dispatch"] != "greedy",
+            )
 
             total_savings_with_battery_pln     = hourly_result_with_batt["annual_cashflow"]["net"]
             battery_savings_pln                = total_savings_with_battery_pln - pv_savings_pln
@@ -409,21 +516,77 @@ class ScenarioRunner:
                 panel_model=panel_model,
                 inverter_model=layout_result["inverter_model"],
                 battery_capacity_kwh=battery_capacity_kwh,
+                battery_price_pln=battery_price_pln,
             )
 
             battery_cost_gross_pln      = capex_battery["battery_cost_gross_pln"]
             total_cost_with_battery_pln = capex_battery["total_cost_gross_pln"]
 
+            # Degradacja magazynu: cykle rainflow ze ścieżki SOC → pojemność rok po roku
+            # (model z katalogu — już policzona w przeglądzie, te same profile i sterowanie)
+            if "degradation" in battery_specs:
+                battery_degradation = battery_specs["degradation"]
+            else:
+                battery_degradation = degradation_forecast(
+                    soc_profile=hourly_result_with_batt["energy_flow"]["soc_profile"],
+                    capacity_kwh=battery_usable_kwh,
+                    chemistry=battery_specs.get("chemistry"),
+                    cycles_rated=battery_specs.get("cycles"),
+                    warranty_years=battery_specs.get("warranty_years"),
+                )
+                battery_degradation.update(savings_adjustment(
+                    hourly_engine_with_batt,
+                    battery_degradation,
+                    capacity_kwh=battery_usable_kwh,
+                    power_kw=battery_power_kw,
+                    efficiency=battery_efficiency,
+                    battery_cost_pln=battery_cost_gross_pln,
+                    production_profile=hourly_result_with_batt["energy_flow"]["production_profile"],
+                    consumption_profile=hourly_result_with_batt["energy_flow"]["consumption_profile"],
+                    dispatch=battery_cfg["dispatch"],
+                    full_savings_pln=total_savings_with_battery_pln,
+                ))
+
             roi_battery = self.financial_engine.compute_roi(
                 investment_gross_pln=total_cost_with_battery_pln,
                 base_annual_savings_pln=total_savings_with_battery_pln,
                 inverter_cost_pln=capex_pv.get("inverter_cost_pln", 0),
+                savings_adjustment_pln=battery_degradation["savings_adjustment_pln"],
+                extra_costs_pln=battery_degradation["replacement_costs_pln"],
             )
 
             battery_payback_years       = roi_battery["payback_years"]
             battery_payback_optimistic  = roi_battery["payback_optimistic_years"]
             battery_payback_pessimistic = roi_battery["payback_pessimistic_years"]
             battery_total_savings_25y   = roi_battery["total_savings_25y_pln"]
+            battery_cashflow_25y        = roi_battery["cashflow_series"]
+
+        # =====================================================================
+        # KROK 7b: Analiza wrażliwości (na życzenie — np. raport PDF)
+        # =====================================================================
+        sensitivity = None
+        if getattr(req, "include_sensitivity", False):
+            from app.core.sensitivity import run_sensitivity
+
+            with_battery = battery_recommended and battery_capacity_kwh > 0
+            sensitivity = run_sensitivity(
+                hourly_engine=hourly_engine_with_batt if with_battery else hourly_engine_no_batt,
+                financial_engine=self.financial_engine,
+                capex_kwargs={
+                    "panels_count":         panels_count,
+                    "panel_model":          panel_model,
+                    "inverter_model":       layout_result["inverter_model"],
+                    "battery_capacity_kwh": battery_capacity_kwh if with_battery else None,
+                    "battery_price_pln":    battery_price_pln if with_battery else None,
+                },
+                province=location,
+                azimuth_deg=self.context["roof_azimuth"],
+                tilt_deg=self.context["roof_tilt"],
+                delta=getattr(req, "sensitivity_delta", 0.10),
+                monthly_irradiance=monthly_irradiance,
+                savings_adjustment_pln=battery_degradation["savings_adjustment_pln"] if with_battery else None,
+                extra_costs_pln=battery_degradation["replacement_costs_pln"] if with_battery else None,
+            )
 
         # =====================================================================
         # KROK 8: Zwróć wynik
@@ -441,6 +604,7 @@ class ScenarioRunner:
             annual_production_kwh=annual_production_kwh,
             annual_consumption_kwh=annual_consumption_kwh,
             pv_cost_gross_pln=pv_cost_gross_pln,
+            inverter_cost_pln=capex_pv.get("inverter_cost_pln", 0),
             pv_savings_pln=pv_savings_pln,
             pv_payback_years=roi_pv["payback_years"],
             pv_payback_optimistic_years=roi_pv["payback_optimistic_years"],
@@ -467,7 +631,14 @@ class ScenarioRunner:
             net_billing_annual_deposit_pln=net_billing_annual_deposit,
             shading_loss_percent=shading_loss * 100,
             hourly_result_without_battery=hourly_result_no_batt,
+            ev_charging=hourly_result_no_batt.get("ev_charging"),
+            curtailment=hourly_result_no_batt.get("curtailment"),
             hourly_result_with_battery=hourly_result_with_batt,
+            sensitivity=sensitivity,
+            pv_cashflow_25y=roi_pv["cashflow_series"],
+            battery_cashflow_25y=battery_cashflow_25y,
+            battery_sweep=battery_sweep,
+            battery_degradation=battery_degradation,
         )
 
     # ─────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,192 @@
+# backend/app/core/sensitivity.py
+"""
+Analiza wrażliwości (wykres tornado) — co najbardziej wpływa na okres zwrotu.
+
+Każde wejście zmieniane jest o ±delta (domyślnie 10%):
+- zużycie energii, cena zakupu (taryfa), poziom RCEm,
+- CAPEX, marża instalatora, pojemność baterii (gdy jest);
+nachylenie i azymut dachu — o ±TILT_DELTA_DEG / ±AZIMUTH_DELTA_DEG stopni
+(procent kąta nie ma sensu: azymut 180° ±10% to ±18°, nachylenie 30° — ±3°).
+Wejścia sortowane po największym odchyleniu okresu zwrotu od bazy — przy
+orientacji optymalnej obie zmiany wydłużają zwrot, więc różnica
+wariant+ − wariant− byłaby bliska zeru.
+
+Wszystkie warianty liczone są razem: bilans energii przez
+HourlyEngine.run_variant_batch (profile raz, bilans tylko dla różnych
+trójek produkcja/zużycie/bateria, ceny jako mnożniki), finanse przez jedno
+wywołanie cashflow_grid. Koszt ≈ 2-3 zwykłe symulacje zamiast 2×K.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.financial_engine import FinancialEngine, cashflow_grid
+from app.core.hourly_engine import HourlyEngine
+from app.core.production_engine import ProductionEngine
+
+SENSITIVITY_DELTA_DEFAULT = 0.10
+TILT_DELTA_DEG = 10.0
+AZIMUTH_DELTA_DEG = 15.0
+
+SENSITIVITY_LABELS = {
+    "consumption": "Zużycie energii",
+    "tariff": "Cena zakupu energii",
+    "rcem": "Cena RCEm (net-billing)",
+    "capex": "Koszt instalacji (CAPEX)",
+    "markup": "Marża instalatora",
+    "battery_capacity": "Pojemność baterii",
+    "tilt": "Nachylenie dachu",
+    "azimuth": "Azymut dachu",
+}
+
+
+def _orientation_factors(
+    province: str,
+    azimuth_deg: float,
+    tilt_deg: float,
+    monthly_irradiance: Optional[Dict[str, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Mnożniki produkcji (−, +) dla nachylenia i azymutu zmienionych o stałą liczbę stopni."""
+    d_az, d_tilt = AZIMUTH_DELTA_DEG, TILT_DELTA_DEG
+    azimuth = np.array([azimuth_deg, azimuth_deg - d_az, azimuth_deg + d_az, azimuth_deg, azimuth_deg])
+    tilt = np.clip(
+        np.array([tilt_deg, tilt_deg, tilt_deg, tilt_deg - d_tilt, tilt_deg + d_tilt]), 0.0, 90.0
+    )
+    annual = ProductionEngine().calculate_production_matrix(
+        panel_area_m2=1.0,
+        panel_efficiency=1.0,
+        province=province,
+        monthly_irradiance=monthly_irradiance,
+        azimuth_deg=azimuth,
+        tilt_deg=tilt,
+    ).sum(axis=-1)
+    ratio = annual / annual[0] if annual[0] > 0 else np.ones_like(annual)
+    return {"azimuth": ratio[1:3], "tilt": ratio[3:5]}
+
+
+def run_sensitivity(
+    hourly_engine: HourlyEngine,
+    financial_engine: FinancialEngine,
+    capex_kwargs: Dict[str, Any],
+    province: str,
+    azimuth_deg: float,
+    tilt_deg: float,
+    delta: float = SENSITIVITY_DELTA_DEFAULT,
+    monthly_irradiance: Optional[Dict[str, float]] = None,
+    savings_adjustment_pln: Optional[List[float]] = None,
+    extra_costs_pln: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Dane wykresu tornado dla jednej instalacji.
+
+    Args:
+        hourly_engine: silnik scenariusza (z baterią, jeśli rekomendowana)
+        financial_engine: FinancialEngine tieru (marża, ceny sprzętu)
+        capex_kwargs: argumenty compute_capex instalacji bazowej; battery_price_pln
+            (model z katalogu) skalowana razem z pojemnością baterii
+        province, azimuth_deg, tilt_deg: orientacja do wariantów produkcji
+        savings_adjustment_pln, extra_costs_pln: korekty rok po roku jak w ROI
+            instalacji (degradacja i wymiana magazynu) — wspólne dla wariantów
+
+    Returns:
+        {"delta", "base": {...}, "items": [...]} — items posortowane malejąco
+        po największym odchyleniu okresu zwrotu od bazy (swing_years).
+    """
+    if not 0 < delta < 1:
+        raise ValueError(f"delta musi być z zakresu (0, 1), otrzymano {delta}")
+
+    low, high = 1 - delta, 1 + delta
+    battery_kwh = float(capex_kwargs.get("battery_capacity_kwh") or 0)
+    battery_price = capex_kwargs.get("battery_price_pln")   # model z katalogu: cena ∝ pojemność
+    inputs = ["consumption", "tariff", "rcem", "capex", "markup"]
+    if battery_kwh > 0:
+        inputs.append("battery_capacity")
+    inputs += ["tilt", "azimuth"]
+
+    orientation = _orientation_factors(province, azimuth_deg, tilt_deg, monthly_irradiance)
+    base_capex = financial_engine.compute_capex(**capex_kwargs)
+    base_investment = base_capex["total_cost_gross_pln"]
+
+    # Wiersz 0 = baza, potem (−delta, +delta) dla każdego wejścia
+    n = 1 + 2 * len(inputs)
+    scales = {name: np.ones(n) for name in ("production", "consumption", "battery", "tariff", "price")}
+    investment = np.full(n, base_investment)
+    for i, name in enumerate(inputs):
+        rows = slice(1 + 2 * i, 3 + 2 * i)
+        if name == "consumption":
+            scales["consumption"][rows] = (low, high)
+        elif name == "tariff":
+            scales["tariff"][rows] = (low, high)
+        elif name == "rcem":
+            scales["price"][rows] = (low, high)
+        elif name == "capex":
+            investment[rows] = (base_investment * low, base_investment * high)
+        elif name == "markup":
+            investment[rows] = [
+                FinancialEngine({
+                    **financial_engine.scenario_config,
+                    "markup_percentage": financial_engine.markup_percentage * factor,
+                }).compute_capex(**capex_kwargs)["total_cost_gross_pln"]
+                for factor in (low, high)
+            ]
+        elif name == "battery_capacity":
+            scales["battery"][rows] = (low, high)
+            investment[rows] = [
+                financial_engine.compute_capex(**{
+                    **capex_kwargs,
+                    "battery_capacity_kwh": battery_kwh * factor,
+                    "battery_price_pln": None if battery_price is None else battery_price * factor,
+                })["total_cost_gross_pln"]
+                for factor in (low, high)
+            ]
+        else:
+            scales["production"][rows] = orientation[name]
+
+    batch = hourly_engine.run_variant_batch(
+        production_scale=scales["production"],
+        consumption_scale=scales["consumption"],
+        battery_scale=scales["battery"],
+        tariff_scale=scales["tariff"],
+        price_scale=scales["price"],
+    )
+    savings = batch["annual_savings_pln"]
+    grid = cashflow_grid(
+        investment=investment,
+        annual_savings_y1=savings,
+        inverter_cost=base_capex.get("inverter_cost_pln", 0),
+        savings_adjustment=0.0 if savings_adjustment_pln is None else savings_adjustment_pln,
+        extra_costs=0.0 if extra_costs_pln is None else extra_costs_pln,
+    )
+    payback = grid["payback_years"]
+
+    variations = {
+        "tilt": f"±{TILT_DELTA_DEG:g}°",
+        "azimuth": f"±{AZIMUTH_DELTA_DEG:g}°",
+    }
+    items = []
+    for i, name in enumerate(inputs):
+        lo, hi = 1 + 2 * i, 2 + 2 * i
+        items.append({
+            "input": name,
+            "label": SENSITIVITY_LABELS[name],
+            "variation": variations.get(name, f"±{delta * 100:g}%"),
+            "payback_low_years": round(float(payback[lo]), 2),
+            "payback_high_years": round(float(payback[hi]), 2),
+            "savings_low_pln": round(float(savings[lo]), 2),
+            "savings_high_pln": round(float(savings[hi]), 2),
+            "swing_years": round(float(max(abs(payback[lo] - payback[0]), abs(payback[hi] - payback[0]))), 2),
+        })
+    items.sort(key=lambda item: item["swing_years"], reverse=True)
+
+    return {
+        "delta": delta,
+        "base": {
+            "payback_years": round(float(payback[0]), 2),
+            "annual_savings_pln": round(float(savings[0]), 2),
+            "investment_pln": round(float(base_investment), 2),
+        },
+        "items": items,
+        "n_variants": n,
+        "n_energy_balances": batch["n_energy_balances"],
+    }
@@ -0,0 +1,181 @@
+# backend/app/core/thermal_load.py
+"""
+ThermalLoad — godzinowy profil pompy ciepła i klimatyzacji (model stopniogodzin).
+
+Zastępuje w HourlyEngine sztywne wagi miesięczne (W_HEAT / W_COOL) i podział
+35/65 dzień/noc:
+- temperatura godzinowa: interpolacja średnich miesięcznych z data/climate.py
+  + sinusoida dobowa (min ~03:00, max ~15:00) albo lokalny plik godzinowy,
+- grzanie:     HDH = max(0, T_bazowa - T)   → ciepło / COP(T)
+- chłodzenie:  CDH = max(0, T - 21°C)       → chłód / EER(T)
+- całość wektorowo (NumPy), cache per (województwo, standard budynku, metraż).
+
+Profile są w kWh energii elektrycznej dla podanego metrażu. HourlyEngine
+traktuje je jako KSZTAŁT i skaluje do budżetu heating_kwh / cooling_kwh.
+"""
+
+import csv
+import os
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.data.climate import get_temperature
+
+HOURS_PER_YEAR = 8760
+
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun",
+          "jul", "aug", "sep", "oct", "nov", "dec"]
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=float)
+
+# Lokalne pliki godzinowe: <WEATHER_DATA_DIR>/<województwo>.csv (8760 wierszy, kolumna temp_c)
+WEATHER_DATA_DIR = os.getenv(
+    "WEATHER_DATA_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "weather"),
+)
+
+# Temperatura bazowa grzania [°C] — lepsza izolacja = niższy punkt równowagi cieplnej
+HEATING_BASE_TEMP_C = {
+    "passive": 12.0,
+    "WT2021": 15.0,
+    "older_insulated": 16.0,
+}
+
+# Zapotrzebowanie na ciepło EU_co [kWh/m²/rok] — spójne z estimate_heating_load
+THERMAL_DEMAND_KWH_M2 = {
+    "passive": 15.0,
+    "WT2021": 50.0,
+    "older_insulated": 90.0,
+}
+
+# Chłodzenie uruchamia się wcześniej niż 24°C — zyski słoneczne i wewnętrzne
+COOLING_BASE_TEMP_C = 21.0
+# Roczne zapotrzebowanie na chłód [kWh/m²/rok] (polski klimat, dom jednorodzinny)
+COOLING_DEMAND_KWH_M2 = 8.0
+
+# COP pompy powietrze–woda (A7/W35 ≈ 3.8, A-7/W35 ≈ 2.6)
+COP_AT_0C = 3.2
+COP_SLOPE_PER_C = 0.08
+COP_MIN, COP_MAX = 1.8, 5.0
+
+# EER klimatyzatora spada wraz z temperaturą zewnętrzną
+EER_AT_20C = 5.5
+EER_SLOPE_PER_C = -0.10
+EER_MIN, EER_MAX = 2.5, 6.0
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.setflags(write=False)
+    return arr
+
+
+def _load_weather_file(path: str) -> Optional[np.ndarray]:
+    """
+    Wczytuje lokalny plik z temperaturą godzinową.
+    Akceptuje kolumnę 'temp_c' / 'temperature' albo pierwszą kolumnę liczbową.
+    Zwraca None, jeśli plik nie ma 8760 wartości.
+    """
+    values = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        col = 0
+        if header:
+            names = [h.strip().lower() for h in header]
+            for key in ("temp_c", "temperature", "temp"):
+                if key in names:
+                    col = names.index(key)
+                    break
+            else:
+                try:
+                    values.append(float(header[0]))
+                except ValueError:
+                    pass
+        for row in reader:
+            if len(row) > col and row[col].strip():
+                values.append(float(row[col]))
+
+    if len(values) < HOURS_PER_YEAR:
+        return None
+    return np.asarray(values[:HOURS_PER_YEAR], dtype=float)
+
+
+@lru_cache(maxsize=32)
+def hourly_temperature(province: str) -> np.ndarray:
+    """
+    Temperatura zewnętrzna [°C] dla 8760 godzin.
+
+    Priorytet: lokalny plik WEATHER_DATA_DIR/<province>.csv, w przeciwnym razie
+    interpolacja średnich miesięcznych (punkty w połowie miesiąca, cyklicznie)
+    z nałożonym cyklem dobowym.
+    """
+    path = os.path.join(WEATHER_DATA_DIR, f"{province.lower().strip()}.csv")
+    if os.path.exists(path):
+        from_file = _load_weather_file(path)
+        if from_file is not None:
+            return _read_only(from_file)
+
+    monthly = np.array([get_temperature(province, m) for m in MONTHS], dtype=float)
+    mid_month = np.cumsum(DAYS_IN_MONTH) - DAYS_IN_MONTH / 2.0
+
+    hours = np.arange(HOURS_PER_YEAR)
+    day_of_year = hours / 24.0
+    # Interpolacja cykliczna (grudzień ↔ styczeń)
+    daily_mean = np.interp(
+        day_of_year,
+        np.concatenate(([mid_month[-1] - 365.0], mid_month, [mid_month[0] + 365.0])),
+        np.concatenate(([monthly[-1]], monthly, [monthly[0]])),
+    )
+
+    # Amplituda dobowa: ~2°C zimą, ~5°C latem; maksimum o 15:00
+    amplitude = 3.5 + 1.5 * np.sin(2 * np.pi * (day_of_year - 80) / 365)
+    hour_of_day = hours % 24
+    diurnal = amplitude * np.cos(2 * np.pi * (hour_of_day - 15) / 24)
+
+    return _read_only(daily_mean + diurnal)
+
+
+def heat_pump_cop(temp_c: np.ndarray) -> np.ndarray:
+    """COP pompy ciepła w funkcji temperatury zewnętrznej."""
+    return np.clip(COP_AT_0C + COP_SLOPE_PER_C * temp_c, COP_MIN, COP_MAX)
+
+
+def cooling_eer(temp_c: np.ndarray) -> np.ndarray:
+    """EER klimatyzatora w funkcji temperatury zewnętrznej."""
+    return np.clip(EER_AT_20C + EER_SLOPE_PER_C * (temp_c - 20.0), EER_MIN, EER_MAX)
+
+
+@lru_cache(maxsize=256)
+def thermal_load_profiles(
+    province: str,
+    building_standard: str = "WT2021",
+    area_m2: float = 150.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Zwraca godzinowe profile poboru energii elektrycznej [kWh]:
+        {"heating_kwh": (8760,), "cooling_kwh": (8760,), "temperature_c": (8760,)}
+
+    Tablice są tylko do odczytu (współdzielone przez cache).
+    """
+    temp = hourly_temperature(province)
+
+    base_heat = HEATING_BASE_TEMP_C.get(building_standard, HEATING_BASE_TEMP_C["WT2021"])
+    demand = THERMAL_DEMAND_KWH_M2.get(building_standard, THERMAL_DEMAND_KWH_M2["WT2021"])
+
+    hdh = np.maximum(0.0, base_heat - temp)
+    cdh = np.maximum(0.0, temp - COOLING_BASE_TEMP_C)
+
+    heating_thermal = np.zeros(HOURS_PER_YEAR)
+    if hdh.sum() > 0:
+        heating_thermal = hdh / hdh.sum() * (area_m2 * demand)
+
+    cooling_thermal = np.zeros(HOURS_PER_YEAR)
+    if cdh.sum() > 0:
+        cooling_thermal = cdh / cdh.sum() * (area_m2 * COOLING_DEMAND_KWH_M2)
+
+    return {
+        "heating_kwh": _read_only(heating_thermal / heat_pump_cop(temp)),
+        "cooling_kwh": _read_only(cooling_thermal / cooling_eer(temp)),
+        "temperature_c": temp,
+    }
@@ -0,0 +1,125 @@
+# backend/app/data/battery_catalog.py
+"""
+BatteryCatalog — indeks katalogu magazynów budowany RAZ na wersję danych.
+
+Wcześniej każde GET /api/batteries i /filters rozmrażało cały katalog,
+filtrowało kolejnymi list comprehension i sortowało po dowolnym kluczu.
+Katalog (indeks migawki "batteries", app.data.snapshots; zarazem tabela
+baterii EquipmentCatalog — id, lookup i kolumny NumPy z EquipmentTable):
+- waliduje wpisy (pola liczbowe muszą być liczbami → inaczej ValueError,
+  plik migawki odrzucony),
+- trzyma posortowane wartości każdego pola liczbowego — filtr zakresu
+  to dwa bisecty, a nie przejście listy,
+- ma gotowe kolejności sortowania (rosnąco / malejąco) i fasety /filters,
+- odpowiedzi są budowane z rozmrożonych rekordów (bez thaw na żądanie).
+
+Przebudowa następuje tylko przy zmianie pliku (mtime) — ETag odpowiedzi
+to wersja migawki.
+"""
+
+import bisect
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.data.equipment_catalog import EquipmentTable
+from app.data.snapshots import get_snapshot
+
+# Pola z indeksem zakresów i dostępne jako sort_by
+NUMERIC_FIELDS = (
+    "capacity_kwh", "price_pln", "max_power_kw", "efficiency_percent",
+    "dod_percent", "cycles", "warranty_years", "weight_kg",
+)
+TEXT_SORT_FIELDS = ("name", "brand")
+SORT_FIELDS = NUMERIC_FIELDS + TEXT_SORT_FIELDS
+
+
+class BatteryCatalog(EquipmentTable):
+    """Niemutowalny indeks katalogu baterii (format data/batteries.json)."""
+
+    def __init__(self, data: Sequence[Mapping[str, Any]]):
+        super().__init__("batteries", data, NUMERIC_FIELDS, price_field="price_pln")
+
+        # Pole → (posortowane wartości, pozycje w tej samej kolejności)
+        self._ranges: Dict[str, Tuple[List[float], List[int]]] = {}
+        for field in NUMERIC_FIELDS:
+            column = self.columns[field]
+            positions = [int(i) for i in np.argsort(column, kind="stable") if not np.isnan(column[i])]
+            self._ranges[field] = ([self.records[i][field] for i in positions], positions)
+
+        # Kolejności sortowania (stabilne, brak wartości = 0 / ""), oba kierunki
+        self._orders: Dict[Tuple[str, bool], Tuple[int, ...]] = {}
+        for field in SORT_FIELDS:
+            empty = "" if field in TEXT_SORT_FIELDS else 0
+            key = lambda i, f=field, e=empty: self.records[i].get(f) or e
+            for reverse in (False, True):
+                self._orders[field, reverse] = tuple(sorted(range(len(self.records)), key=key, reverse=reverse))
+
+        self._by_chemistry: Dict[str, frozenset] = {}
+        for i, record in enumerate(self.records):
+            chemistry = (record.get("chemistry") or "").upper()
+            if chemistry:
+                self._by_chemistry[chemistry] = self._by_chemistry.get(chemistry, frozenset()) | {i}
+
+        self.facets = self._build_facets()
+
+    def _build_facets(self) -> Dict[str, Any]:
+        def value_range(field: str) -> Dict[str, Any]:
+            values = [v for v in self._ranges[field][0] if v]
+            return {"min": values[0], "max": values[-1]} if values else {}
+
+        return {
+            "chemistries": sorted({r["chemistry"] for r in self.records if r.get("chemistry")}),
+            "capacity_range": value_range("capacity_kwh"),
+            "price_range": value_range("price_pln"),
+        }
+
+    def in_range(self, field: str, low: Optional[float] = None, high: Optional[float] = None) -> frozenset:
+        """Pozycje rekordów z low <= pole <= high (bisect po indeksie pola)."""
+        values, positions = self._ranges[field]
+        start = 0 if low is None else bisect.bisect_left(values, low)
+        stop = len(values) if high is None else bisect.bisect_right(values, high)
+        return frozenset(positions[start:stop])
+
+    def search(
+        self,
+        ranges: Optional[Mapping[str, Tuple[Optional[float], Optional[float]]]] = None,
+        chemistry: Optional[str] = None,
+        sort_by: str = "capacity_kwh",
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Rekordy spełniające filtry, w kolejności sort_by.
+
+        ranges: {pole: (min, max)} — None = bez ograniczenia z tej strony;
+        rekord bez wartości pola nie spełnia filtru zakresu.
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Nieznane pole sortowania: {sort_by}. Dostępne: {', '.join(SORT_FIELDS)}")
+
+        allowed: Optional[frozenset] = None
+        for field, (low, high) in (ranges or {}).items():
+            if field not in self._ranges:
+                raise ValueError(f"Nieznane pole filtru: {field}")
+            if low is None and high is None:
+                continue
+            matched = self.in_range(field, low, high)
+            allowed = matched if allowed is None else allowed & matched
+        if chemistry:
+            matched = self._by_chemistry.get(chemistry.upper(), frozenset())
+            allowed = matched if allowed is None else allowed & matched
+
+        result = []
+        for i in self._orders[sort_by, descending]:
+            if allowed is not None and i not in allowed:
+                continue
+            result.append(self.records[i])
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+
+def get_battery_catalog() -> BatteryCatalog:
+    """Aktualny katalog (indeks migawki "batteries")."""
+    return get_snapshot("batteries").index
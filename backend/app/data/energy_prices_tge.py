@@ -5,9 +5,22 @@ Ceny energii na Towarowej Giełdzie Energii (TGE) - RCEm.
 NOWE w v3.1:
 - Dodano profil godzinowy (kanibalizacja PV)
 - Funkcja get_rcem_hourly() zwraca 8760 cen
+
+v3.2:
+- get_rcem_array() — wektor NumPy tylko do odczytu, cache per rok
+- get_rcem_statistics() / get_rcem_annual_mean() liczone raz
+
+v3.3:
+- RCEm z migawki "rcem" (app.data.snapshots) — plik w DATA_SNAPSHOT_DIR
+  nadpisuje literały poniżej bez restartu; cache kluczowany (rok, wersja)
 """
 
-from typing import Dict, List
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.data.snapshots import get_snapshot
 
 
 # Miesięczne ceny RCEm 2025 (PLN/kWh brutto z VAT)
@@ -62,6 +75,30 @@ RCEM_HOURLY_PROFILE = {
 }
 
 
+def build_rcem_index(data: Any) -> Dict[str, Tuple[float, ...]]:
+    """
+    Migawka "rcem" → {"monthly": 12 cen, "hourly_profile": 24 współczynniki}.
+    Klucze z JSON/TOML są tekstowe ("1".."12", "0".."23").
+    """
+    monthly = {int(k): float(v) for k, v in data["monthly"].items()}
+    profile = {int(k): float(v) for k, v in data["hourly_profile"].items()}
+    if sorted(monthly) != list(range(1, 13)):
+        raise ValueError("RCEm: 'monthly' musi mieć miesiące 1..12")
+    if sorted(profile) != list(range(24)):
+        raise ValueError("RCEm: 'hourly_profile' musi mieć godziny 0..23")
+    if any(v < 0 for v in monthly.values()) or any(v < 0 for v in profile.values()):
+        raise ValueError("RCEm: ujemne wartości")
+    return {
+        "monthly": tuple(monthly[m] for m in range(1, 13)),
+        "hourly_profile": tuple(profile[h] for h in range(24)),
+    }
+
+
+def _rcem_snapshot() -> Tuple[Dict[str, Tuple[float, ...]], str]:
+    snap = get_snapshot("rcem")
+    return snap.index, snap.version
+
+
 def get_rcem_monthly(year: int = 2025) -> Dict[int, float]:
     """
     Zwraca miesięczne ceny RCEm (PLN/kWh brutto).
@@ -72,82 +109,102 @@ def get_rcem_monthly(year: int = 2025) -> Dict[int, float]:
     Returns:
         Słownik {miesiąc: cena_PLN_per_kWh}
     """
+    index, _ = _rcem_snapshot()
+    base = dict(zip(range(1, 13), index["monthly"]))
     if year == 2025:
-        return RCEM_MONTHLY_2025
+        return base
     
     # Fallback: 2025 z inflacją
     inflation_rate = 0.04  # 4%/rok
     years_diff = year - 2025
     inflated_prices = {
         month: price * ((1 + inflation_rate) ** years_diff)
-        for month, price in RCEM_MONTHLY_2025.items()
+        for month, price in base.items()
     }
     return inflated_prices
 
 
-def get_rcem_hourly(year: int = 2025) -> List[float]:
+def get_rcem_array(year: int = 2025) -> np.ndarray:
     """
-    ✅ NOWE: Zwraca wektor 8760 cen RCEm dla całego roku.
-    
+    Wektor 8760 cen RCEm jako tablica NumPy TYLKO DO ODCZYTU (cache per rok i wersję danych).
+
     Uwzględnia efekt kanibalizacji cenowej przez PV:
     - W godzinach 11:00-14:00 ceny są znacznie niższe (50-60% średniej)
     - W godzinach 18:00-20:00 ceny są najwyższe (145-155% średniej)
-    
+
+    Tablica jest współdzielona między wywołaniami — nie modyfikować
+    (setflags(write=False) pilnuje tego przy próbie zapisu).
+    """
+    return _rcem_array(year, _rcem_snapshot()[1])
+
+
+@lru_cache(maxsize=16)
+def _rcem_array(year: int, version: str) -> np.ndarray:
+    index, _ = _rcem_snapshot()
+    rcem_monthly = get_rcem_monthly(year)
+    monthly = np.array([rcem_monthly[m] for m in range(1, 13)], dtype=float)
+
+    days = np.arange(365)
+    # Który miesiąc? (przybliżenie 30-dniowe, grudzień wydłużony)
+    monthly_avg_brutto = monthly[np.minimum(11, days // 30)]
+
+    # Lato: więcej słońca = niższe ceny w południe (dodatkowa sezonowość 11-14)
+    seasonal_factor_summer = 1.0 - 0.1 * np.sin(2 * np.pi * (days - 80) / 365)
+    hour_factor = np.array(index["hourly_profile"], dtype=float)
+    midday = (np.arange(24) >= 11) & (np.arange(24) <= 14)
+    factors = np.where(midday, hour_factor * seasonal_factor_summer[:, None], hour_factor)
+
+    # Cena godzinowa = średnia miesięczna * współczynnik; nie może być ujemna
+    prices = np.maximum(0.01, monthly_avg_brutto[:, None] * factors).reshape(-1)
+    # round() Pythona (nie np.round) — identyczne remisy jak w dotychczasowej liście;
+    # liczone raz na rok dzięki cache
+    prices = np.array([round(p, 4) for p in prices.tolist()])
+    prices.setflags(write=False)
+    return prices
+
+
+@lru_cache(maxsize=16)
+def _rcem_tuple(year: int, version: str) -> Tuple[float, ...]:
+    return tuple(_rcem_array(year, version).tolist())
+
+
+def get_rcem_hourly(year: int = 2025) -> List[float]:
+    """
+    Zwraca wektor 8760 cen RCEm dla całego roku (lista — kompatybilność wsteczna).
+
+    Nowy kod powinien używać get_rcem_array() (bez kopiowania).
+
     Args:
         year: Rok (2025)
-    
+
     Returns:
         Lista 8760 wartości PLN/kWh (brutto z VAT 23%)
-        
+
     Example:
         >>> prices = get_rcem_hourly(2025)
         >>> len(prices)
         8760
-        >>> prices[12]  # Południe - niska cena przez PV
-        0.12
-        >>> prices[19]  # Wieczór - wysoka cena
-        0.39
     """
-    rcem_monthly = get_rcem_monthly(year)
-    hourly_prices = []
-    
-    for day in range(365):
-        # Który miesiąc?
-        current_month = (day // 30) + 1
-        if current_month > 12:
-            current_month = 12
-        
-        # Średnia cena w tym miesiącu (brutto)
-        monthly_avg_brutto = rcem_monthly[current_month]
-        
-        # Sezonowość wewnątrz miesiąca (opcjonalnie)
-        # Lato: więcej słońca = niższe ceny w południe
-        import math
-        seasonal_factor_summer = 1.0 - 0.1 * math.sin(2 * math.pi * (day - 80) / 365)
-        
-        for hour in range(24):
-            # Współczynnik godzinowy
-            hour_factor = RCEM_HOURLY_PROFILE[hour]
-            
-            # Dla godzin południowych (11-14) zastosuj dodatkową sezonowość
-            if 11 <= hour <= 14:
-                hour_factor *= seasonal_factor_summer
-            
-            # Cena godzinowa = średnia miesięczna * współczynnik
-            hourly_price_brutto = monthly_avg_brutto * hour_factor
-            
-            # Zabezpieczenie: cena nie może być ujemna
-            hourly_price_brutto = max(0.01, hourly_price_brutto)
-            
-            hourly_prices.append(round(hourly_price_brutto, 4))
-    
-    return hourly_prices
+    return list(_rcem_tuple(year, _rcem_snapshot()[1]))
+
+
+@lru_cache(maxsize=16)
+def _rcem_statistics(year: int, version: str) -> Tuple[Tuple[str, float], ...]:
+    prices = _rcem_array(year, version).reshape(365, 24)
+    peak = prices[:, 18:21].mean()
+    offpeak = prices[:, 11:14].mean()
+    return (
+        ("annual_avg", round(float(prices.mean()), 4)),
+        ("peak_avg", round(float(peak), 4)),
+        ("offpeak_avg", round(float(offpeak), 4)),
+        ("ratio", round(float(peak / offpeak), 2)),
+    )
 
 
 def get_rcem_statistics(year: int = 2025) -> Dict[str, float]:
     """
-    Zwraca statystyki cen RCEm dla danego roku.
-    
+    Zwraca statystyki cen RCEm dla danego roku (liczone raz, cache per rok).
+
     Returns:
         {
             "annual_avg": 0.27,
@@ -156,26 +213,17 @@ def get_rcem_statistics(year: int = 2025) -> Dict[str, float]:
             "ratio": 2.71,        # Peak / Offpeak
         }
     """
-    hourly_prices = get_rcem_hourly(year)
-    
-    # Wydziel godziny szczytowe i pozaszczytowe
-    peak_hours = []
-    offpeak_hours = []
-    
-    for hour_idx in range(8760):
-        hour_of_day = hour_idx % 24
-        
-        if 18 <= hour_of_day <= 20:
-            peak_hours.append(hourly_prices[hour_idx])
-        elif 11 <= hour_of_day <= 13:
-            offpeak_hours.append(hourly_prices[hour_idx])
-    
-    return {
-        "annual_avg": round(sum(hourly_prices) / len(hourly_prices), 4),
-        "peak_avg": round(sum(peak_hours) / len(peak_hours), 4),
-        "offpeak_avg": round(sum(offpeak_hours) / len(offpeak_hours), 4),
-        "ratio": round((sum(peak_hours) / len(peak_hours)) / (sum(offpeak_hours) / len(offpeak_hours)), 2),
-    }
+    return dict(_rcem_statistics(year, _rcem_snapshot()[1]))
+
+
+def get_rcem_annual_mean(year: int = 2025) -> float:
+    """Średnia arytmetyczna 8760 cen godzinowych (bez zaokrąglenia)."""
+    return _rcem_annual_mean(year, _rcem_snapshot()[1])
+
+
+@lru_cache(maxsize=16)
+def _rcem_annual_mean(year: int, version: str) -> float:
+    return float(_rcem_array(year, version).mean())
 
 
 # Legacy compatibility
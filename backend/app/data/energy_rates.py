@@ -312,34 +312,18 @@ def decompose_electricity_tariff(operator: str, tariff: str) -> Dict[str, float]
     DYNAMICZNA DEKOMPOZYCJA (v3.2): Pobiera realne składniki z bazy ENERGY_RATES.
     Usuwa błąd stałych procentów (0.56 / 0.31).
     Niezbędne do rzetelnego wyliczenia wartości depozytu w Net-billingu.
+
+    Składniki są przeliczone raz w katalogu taryf (app.data.tariff_catalog):
+    - energy_pln_per_kwh — energia czynna (tylko to może być pokryte z depozytu),
+      dla G12/G12w średnia ważona 60/40,
+    - distribution_pln_per_kwh — dystrybucja + opłaty jakościowa / OZE / kogeneracyjna
+      (prosument ZAWSZE płaci je gotówką).
     """
-    # Pobieramy dane dla konkretnego operatora i taryfy
-    rates = get_rate_data(operator, tariff)
-    
-    # 1. Składnik energii czynnej (tylko to może być pokryte z depozytu prosumenckiego)
-    if "energy_price_kwh" in rates:
-        # Taryfa jednostrefowa (G11)
-        energy_part = rates["energy_price_kwh"]
-        dist_part = rates["distribution_variable_kwh"]
-    else:
-        # Taryfa dwustrefowa (G12/G12w) - średnia ważona statystyczna (60/40)
-        energy_part = 0.6 * rates["energy_price_kwh_peak"] + 0.4 * rates["energy_price_kwh_offpeak"]
-        dist_part = 0.6 * rates["distribution_variable_kwh_peak"] + 0.4 * rates["distribution_variable_kwh_offpeak"]
-        
-    # 2. Pozostałe opłaty zmienne (jakość, OZE, kogeneracja)
-    # Te opłaty oraz dystrybucję prosument ZAWSZE płaci gotówką (nie z depozytu)
-    other_fees = rates["quality_fee_kwh"] + rates["oze_fee_kwh"] + rates["cogeneration_fee_kwh"]
-    
-    total_variable = energy_part + dist_part + other_fees
-    
-    return {
-        "energy_pln_per_kwh": round(energy_part, 4),
-        "distribution_pln_per_kwh": round(dist_part + other_fees, 4), # FIX: Nazwa klucza zgodna z HourlyEngine
-        "total_variable_pln_per_kwh": round(total_variable, 4),
-        "total_pln_per_kwh": round(total_variable, 4)
-    }
+    # Import lokalny: tariff_catalog importuje ENERGY_RATES z tego modułu
+    from app.data.tariff_catalog import get_tariff
+    return get_tariff(operator, tariff).components()
+
 
-    
 def get_tariff_zones_g11(base_tariff_pln_per_kwh: float) -> Dict[int, float]:
     """Zwraca stawki dla taryfy G11 (jednakowa całą dobę)."""
     return {hour: base_tariff_pln_per_kwh for hour in range(24)}
@@ -2,8 +2,19 @@
 """
 Dane sprzętowe - panele, falowniki, baterie.
 Minimalny zestaw danych dla refactoringu.
+
+EQUIPMENT_COSTS to dane wbudowane migawki "equipment" (app.data.snapshots) —
+cennik z DATA_SNAPSHOT_DIR działa bez restartu. Panele i falowniki czytane są
+przez EquipmentCatalog (app.data.equipment_catalog: id, kolumny NumPy).
 """
 
+from typing import Any, Mapping
+
+import numpy as np
+
+from app.data.equipment_catalog import get_equipment_catalog
+from app.data.snapshots import get_snapshot
+
 # =============================================================================
 # STRUKTURA DANYCH
 # =============================================================================
@@ -231,6 +242,11 @@ EQUIPMENT_COSTS = {
 # FUNKCJE POMOCNICZE
 # =============================================================================
 
+def get_equipment_costs() -> Mapping[str, Any]:
+    """Aktualny cennik sprzętu (migawka "equipment", tylko do odczytu)."""
+    return get_snapshot("equipment").data
+
+
 def get_panel_by_tier(tier: str = "standard"):
     """Zwraca domyślny panel dla danego tier."""
     defaults = {
@@ -239,46 +255,40 @@ def get_panel_by_tier(tier: str = "standard"):
         "economy": "Risen RSM144-6-550M",
     }
     panel_model = defaults.get(tier, defaults["standard"])
-    return panel_model, EQUIPMENT_COSTS["panels"][panel_model]
+    return panel_model, get_equipment_catalog().panels.by_name(panel_model)
 
 
 def get_inverter_by_power(power_kwp: float, tier: str = "standard"):
-    """Zwraca odpowiedni falownik dla mocy systemu."""
-    inverters_by_tier = {
-        key: data for key, data in EQUIPMENT_COSTS["inverters"].items()
-        if data["tier"] == tier
-    }
-    
-# Szukamy falownika, który obsłuży moc DC (z dopuszczalnym przewymiarowaniem 120%)
-    suitable = [
-        (model, data) for model, data in inverters_by_tier.items()
-        if data["power_kw"] * 1.25 >= power_kwp
-    ]
-    
-    if not suitable:
-        # Jeśli system jest za duży, bierzemy najmocniejszy dostępny w danym tierze
-        suitable = sorted(inverters_by_tier.items(), key=lambda x: x[1]["power_kw"], reverse=True)
-    
-    if not suitable:
-        suitable = list(inverters_by_tier.items())
-    
-    suitable.sort(key=lambda x: x[1]["power_kw"])
-    
-    if suitable:
-        return suitable[0]
-    
-    return list(EQUIPMENT_COSTS["inverters"].items())[0]
+    """Zwraca odpowiedni falownik dla mocy systemu (kolumny katalogu sprzętu)."""
+    inverters = get_equipment_catalog().inverters
+    in_tier = inverters.mask(tier=tier)
+    if not in_tier.any():
+        record = inverters.records[0]
+        return record["name"], record
+
+    power = inverters.columns["power_kw"]
+    # Najmniejszy falownik, który obsłuży moc DC (z dopuszczalnym przewymiarowaniem 125%)
+    suitable = np.flatnonzero(in_tier & (power * 1.25 >= power_kwp))
+    if suitable.size:
+        row = suitable[np.argmin(power[suitable])]
+    else:
+        # System za duży — najmocniejszy dostępny w danym tierze
+        rows = np.flatnonzero(in_tier)
+        row = rows[np.argmax(power[rows])]
+    record = inverters.records[row]
+    return record["name"], record
 
 
 def get_battery_by_capacity(capacity_kwh: float, tier: str = "standard"):
     """Zwraca odpowiednią baterię dla pojemności."""
+    costs = get_equipment_costs()
     batteries_by_tier = {
-        key: data for key, data in EQUIPMENT_COSTS["batteries"].items()
+        key: data for key, data in costs["batteries"].items()
         if data["tier"] == tier
     }
     
     if not batteries_by_tier:
-        batteries_by_tier = EQUIPMENT_COSTS["batteries"]
+        batteries_by_tier = costs["batteries"]
     
     suitable = [
         (model, data) for model, data in batteries_by_tier.items()
@@ -0,0 +1,216 @@
+# backend/app/data/equipment_catalog.py
+"""
+EquipmentCatalog — jeden katalog sprzętu dla silnika, routerów i bazy.
+
+Dane sprzętu były rozproszone: cennik paneli i falowników (EQUIPMENT_COSTS,
+migawka "equipment"), katalog baterii (data/batteries.json, migawka
+"batteries") i tabela Battery w PostgreSQL; FinancialEngine szukał cen
+po nazwie modelu w zagnieżdżonych słownikach.
+
+Katalog:
+- EquipmentTable na każdy rodzaj sprzętu — rekordy z identyfikatorem
+  całkowitym, lookup id / nazwa → wiersz w O(1), specyfikacje liczbowe
+  jako kolumny NumPy (filtry = maski, bez przechodzenia listy słowników),
+- tabele budowane RAZ na wersję migawki (indeksy "equipment" i "batteries";
+  baterie = BatteryCatalog z indeksami routera /api/batteries),
+- sync_batteries_to_db() — synchronizacja katalogu baterii do tabeli Battery.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.data.snapshots import get_snapshot, thaw
+
+PANEL_NUMERIC_FIELDS = ("power_wp", "efficiency", "unit_price_pln", "warranty_years")
+INVERTER_NUMERIC_FIELDS = ("power_kw", "efficiency", "price_pln", "warranty_years")
+
+
+class EquipmentTable:
+    """Rekordy jednego rodzaju sprzętu (niemutowalne po zbudowaniu)."""
+
+    def __init__(
+        self,
+        kind: str,
+        data: Sequence[Mapping[str, Any]],
+        numeric_fields: Sequence[str],
+        price_field: str = "price_pln",
+    ):
+        if not isinstance(data, (list, tuple)):
+            raise ValueError(f"Katalog {kind} musi być listą")
+        self.kind = kind
+        self.price_field = price_field
+
+        records = []
+        ids = []
+        for position, item in enumerate(data):
+            if not isinstance(item, Mapping):
+                raise ValueError(f"Pozycja {position} katalogu {kind} nie jest obiektem")
+            equipment_id = item.get("id", position + 1)
+            if isinstance(equipment_id, bool) or not isinstance(equipment_id, int):
+                raise ValueError(f"Pozycja {position} katalogu {kind}: id musi być liczbą całkowitą")
+            for field in numeric_fields:
+                value = item.get(field)
+                if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                    raise ValueError(f"{kind} {equipment_id}: pole '{field}' nie jest liczbą")
+            records.append(thaw(item))
+            ids.append(equipment_id)
+
+        self.records = tuple(records)
+        self.ids = np.array(ids, dtype=np.int64)
+        self._row_by_id = {equipment_id: row for row, equipment_id in enumerate(ids)}
+        if len(self._row_by_id) != len(ids):
+            raise ValueError(f"Powtórzone id w katalogu {kind}")
+        self._row_by_name = {r.get("name"): row for row, r in enumerate(records) if r.get("name")}
+
+        self.tiers = np.array([r.get("tier") or "" for r in records], dtype=object)
+        # Kolumny liczbowe; brak wartości = NaN
+        self.columns: Dict[str, np.ndarray] = {
+            field: np.array(
+                [np.nan if r.get(field) is None else float(r[field]) for r in records],
+                dtype=float,
+            )
+            for field in numeric_fields
+        }
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def id_of(self, name: str) -> Optional[int]:
+        row = self._row_by_name.get(name)
+        return None if row is None else int(self.ids[row])
+
+    def get(self, equipment_id: int) -> Optional[Dict[str, Any]]:
+        row = self._row_by_id.get(equipment_id)
+        return None if row is None else self.records[row]
+
+    def by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        row = self._row_by_name.get(name)
+        return None if row is None else self.records[row]
+
+    def value(self, equipment_id: Optional[int], field: str, default: float = 0.0) -> float:
+        """Specyfikacja liczbowa z kolumny (brak rekordu lub wartości → default)."""
+        row = self._row_by_id.get(equipment_id)
+        if row is None:
+            return default
+        value = self.columns[field][row]
+        return default if np.isnan(value) else float(value)
+
+    def price(self, equipment_id: Optional[int], default: float = 0.0) -> float:
+        return self.value(equipment_id, self.price_field, default)
+
+    def mask(self, tier: Optional[str] = None, **ranges) -> np.ndarray:
+        """Maska wierszy: tier oraz pole=(min, max) dla kolumn liczbowych (None = bez granicy)."""
+        mask = np.ones(len(self.records), dtype=bool)
+        if tier is not None:
+            mask &= self.tiers == tier
+        for field, (low, high) in ranges.items():
+            column = self.columns[field]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        return mask
+
+
+def _named_table(kind: str, items: Mapping[str, Any], numeric_fields: Sequence[str], price_field: str) -> EquipmentTable:
+    """Sekcja cennika {model: dane} → tabela z id = kolejność w cenniku (od 1)."""
+    return EquipmentTable(
+        kind,
+        [{"id": i, "name": name, **thaw(data)} for i, (name, data) in enumerate(items.items(), start=1)],
+        numeric_fields,
+        price_field=price_field,
+    )
+
+
+def build_equipment_tables(data: Mapping[str, Any]) -> Dict[str, EquipmentTable]:
+    """Migawka "equipment" → {"panels", "inverters"} (indeks migawki)."""
+    for section in ("panels", "inverters"):
+        if not isinstance(data.get(section), Mapping):
+            raise ValueError(f"Cennik sprzętu bez sekcji '{section}'")
+    return {
+        "panels": _named_table("panels", data["panels"], PANEL_NUMERIC_FIELDS, "unit_price_pln"),
+        "inverters": _named_table("inverters", data["inverters"], INVERTER_NUMERIC_FIELDS, "price_pln"),
+    }
+
+
+@dataclass(frozen=True)
+class EquipmentCatalog:
+    """Tabele sprzętu jednej wersji danych."""
+    panels: EquipmentTable
+    inverters: EquipmentTable
+    batteries: Any          # BatteryCatalog (EquipmentTable + indeksy /api/batteries)
+    version: str
+
+
+_catalog: Optional[EquipmentCatalog] = None
+
+
+def get_equipment_catalog() -> EquipmentCatalog:
+    """Aktualny katalog; nowy obiekt tylko po zmianie którejś z migawek."""
+    global _catalog
+    equipment = get_snapshot("equipment")
+    batteries = get_snapshot("batteries")
+    version = f"{equipment.version}-{batteries.version}"
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        catalog = EquipmentCatalog(
+            panels=equipment.index["panels"],
+            inverters=equipment.index["inverters"],
+            batteries=batteries.index,
+            version=version,
+        )
+        _catalog = catalog
+    return catalog
+
+
+# Kolumny tabeli Battery zasilane wprost z katalogu; reszta pól → specs_json
+_BATTERY_COLUMNS = (
+    "name", "brand", "capacity_kwh", "price_pln", "warranty_years", "chemistry",
+    "max_power_kw", "cycles", "dod_percent", "image_url", "datasheet_url",
+)
+
+
+def sync_batteries_to_db(db, catalog: Optional[EquipmentCatalog] = None) -> Dict[str, int]:
+    """
+    Katalog baterii → tabela Battery (upsert po id). Wiersze spoza katalogu
+    są dezaktywowane (is_active=False), nie usuwane. Commit po stronie wywołującego.
+
+    Returns:
+        {"upserted": liczba pozycji katalogu, "deactivated": liczba wyłączonych wierszy}
+    """
+    from app.models.db import Battery
+
+    catalog = catalog or get_equipment_catalog()
+    known = set()
+    for record in catalog.batteries.records:
+        extra = {k: v for k, v in record.items() if k not in _BATTERY_COLUMNS and k not in ("id", "specs_json")}
+        db.merge(Battery(
+            id=record["id"],
+            **{column: record.get(column) for column in _BATTERY_COLUMNS},
+            specs_json={**(record.get("specs_json") or {}), **extra},
+            is_active=True,
+        ))
+        known.add(record["id"])
+
+    deactivated = 0
+    for row in db.query(Battery).filter(Battery.is_active.is_(True)).all():
+        if row.id not in known:
+            row.is_active = False
+            deactivated += 1
+    return {"upserted": len(known), "deactivated": deactivated}
+
+
+if __name__ == "__main__":
+    # python -m app.data.equipment_catalog --sync-db   (DATABASE_URL jak w app.core.database)
+    import sys
+
+    if sys.argv[1:] != ["--sync-db"]:
+        sys.exit("Użycie: python -m app.data.equipment_catalog --sync-db")
+    from app.core.database import SessionLocal
+
+    with SessionLocal() as session:
+        summary = sync_batteries_to_db(session)
+        session.commit()
+    print("Baterie w bazie:", summary)
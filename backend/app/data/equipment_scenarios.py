@@ -8,7 +8,9 @@ CHANGELOG:
 - Wartości z datasheetów producentów (STC: 25°C, 1000 W/m²)
 """
 
-from typing import Dict, Any
+from typing import Any, Dict, Mapping
+
+from app.data.snapshots import get_snapshot
 
 # =============================================================================
 # SCENARIUSZ 1: PREMIUM
@@ -174,13 +176,30 @@ ECONOMY_SCENARIO = {
 ALL_SCENARIOS = [PREMIUM_SCENARIO, STANDARD_SCENARIO, ECONOMY_SCENARIO]
 
 
-def get_scenario_by_tier(tier: str) -> Dict[str, Any]:
-    """Zwraca scenariusz na podstawie poziomu."""
+def index_scenarios(data: Any) -> Dict[str, Mapping[str, Any]]:
+    """
+    Migawka "equipment_scenarios" → {tier: scenariusz}.
+    Akceptuje {"scenarios": [...]} albo samą listę scenariuszy.
+    """
+    scenarios = data["scenarios"] if isinstance(data, Mapping) else data
+    index = {}
+    for scenario in scenarios:
+        for key in ("tier", "panel", "inverter", "installation"):
+            if key not in scenario:
+                raise ValueError(f"Scenariusz sprzętowy bez pola '{key}'")
+        index[scenario["tier"].lower()] = scenario
+    if not index:
+        raise ValueError("Brak scenariuszy sprzętowych")
+    return index
+
+
+def get_scenario_by_tier(tier: str) -> Mapping[str, Any]:
+    """Zwraca scenariusz na podstawie poziomu (migawka "equipment_scenarios", tylko do odczytu)."""
     tier = tier.lower()
-    for scenario in ALL_SCENARIOS:
-        if scenario["tier"] == tier:
-            return scenario
-    raise ValueError(f"Unknown tier: {tier}. Available: premium, standard, economy")
+    index = get_snapshot("equipment_scenarios").index
+    if tier in index:
+        return index[tier]
+    raise ValueError(f"Unknown tier: {tier}. Available: {', '.join(index)}")
 
 
 # Kopia zapasowa calculate_total_investment — kanoniczna wersja w finance.py
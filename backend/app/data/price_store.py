@@ -0,0 +1,414 @@
+# backend/app/data/price_store.py
+"""
+PriceStore — kolumnowy magazyn historycznych cen godzinowych (RCE / RCEm / TGE).
+
+Pliki CSV z cenami importujemy RAZ (poza ścieżką requestu) do katalogu:
+
+    <PRICE_STORE_DIR>/
+        index.json              — wersja, lata, pokrycie, źródło, offsety miesięcy
+        2023.v4.npy             — 8760 cen PLN/kWh (float32), partycja = rok
+        2024.v5.npy
+        inbox/                  — nowe pliki do importu (ingest_inbox)
+
+- Odczyt: np.load(mmap_mode="r") — workery współdzielą strony pliku, zero parsowania.
+- Zapis: nowa partycja pod nową nazwą + atomowe os.replace(index.json).
+  Czytelnicy ze starym indeksem dalej widzą spójne (stare) pliki.
+- Przeładowanie: get_price_store() sprawdza mtime index.json (jeden stat)
+  i podmienia migawkę jedną referencją.
+- Nowe pliki: get_price_store() co INBOX_CHECK_SECONDS zagląda do inbox/;
+  import rusza w wątku w tle (jeden worker naraz — blokada pliku inbox/.lock),
+  więc CSV nie jest parsowany na ścieżce requestu. Pliki wrzucaj atomowo
+  (zapis obok + mv do inbox/).
+
+Rok ma zawsze 8760 godzin (29 lutego pomijany) — zgodnie z HourlyEngine.
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+MIN_COVERAGE_HOURS = 24 * 28
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+MONTH_OFFSETS = [0] + list(np.cumsum(np.array(DAYS_IN_MONTH) * 24).tolist())   # 13 wartości
+
+PRICE_STORE_DIR = os.getenv(
+    "PRICE_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "prices"),
+)
+INDEX_FILE = "index.json"
+INBOX_CHECK_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+_TS_COLUMNS = ("timestamp", "datetime", "data i godzina", "ts", "date", "data", "doba")
+_HOUR_COLUMNS = ("hour", "godzina", "h")
+_PRICE_COLUMNS = ("price_pln_kwh", "price", "cena", "rcem", "rce", "fixing")
+_TS_PATTERN = re.compile(
+    r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2}))?"
+    r"|^(\d{1,2})\.(\d{1,2})\.(\d{4})(?:\s+(\d{1,2}):(\d{2}))?"
+)
+
+
+# =============================================================================
+# IMPORT CSV → PARTYCJE ROCZNE
+# =============================================================================
+
+def _parse_timestamp(text: str) -> Optional[datetime]:
+    m = _TS_PATTERN.match(text.strip())
+    if not m:
+        return None
+    g = m.groups()
+    try:
+        if g[0] is not None:
+            return datetime(int(g[0]), int(g[1]), int(g[2]), int(g[3] or 0)) + timedelta(minutes=int(g[4] or 0))
+        return datetime(int(g[7]), int(g[6]), int(g[5]), int(g[8] or 0)) + timedelta(minutes=int(g[9] or 0))
+    except ValueError:
+        return None
+
+
+def _hour_index(ts: datetime) -> Optional[int]:
+    """Godzina roku 0..8759 (29 lutego → None)."""
+    if ts.month == 2 and ts.day == 29:
+        return None
+    return (MONTH_OFFSETS[ts.month - 1] // 24 + ts.day - 1) * 24 + ts.hour
+
+
+def _find(header: List[str], names: Sequence[str]) -> Optional[int]:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    for name in names:
+        for i, col in enumerate(header):
+            if name in col:
+                return i
+    return None
+
+
+def _read_price_csv(path: str) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Strumieniowo czyta CSV i zwraca {rok: {"sum": (8760,), "count": (8760,)}}.
+    Akceptuje timestamp ISO lub date + hour (0-23 albo 1-24), ceny w PLN/kWh lub PLN/MWh.
+    """
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        reader = csv.reader(f, delimiter=delimiter)
+
+        header = [h.strip().lower() for h in next(reader, [])]
+        price_col = _find(header, _PRICE_COLUMNS)
+        hour_col = _find(header, _HOUR_COLUMNS)
+        ts_col = _find(header, _TS_COLUMNS)
+        if ts_col is None:
+            ts_col = 0
+        if price_col is None or price_col == ts_col:
+            raise ValueError(f"{os.path.basename(path)}: brak kolumny z ceną (price / cena / rce)")
+        if hour_col in (ts_col, price_col):
+            hour_col = None
+        scale = 0.001 if "mwh" in header[price_col] else 1.0
+
+        years: Dict[int, Dict[str, np.ndarray]] = {}
+        hour_ending = False
+        rows = []
+        for row in reader:
+            if len(row) <= max(ts_col, price_col, hour_col or 0):
+                continue
+            ts = _parse_timestamp(row[ts_col])
+            try:
+                price = float(row[price_col].strip().replace(",", "."))
+            except ValueError:
+                continue
+            if ts is None:
+                continue
+            if hour_col is not None:
+                try:
+                    hour = int(float(row[hour_col]))
+                except ValueError:
+                    continue
+                hour_ending = hour_ending or hour == 24
+                rows.append((ts, hour, price))
+            else:
+                rows.append((ts, None, price))
+
+    prices = np.array([r[2] for r in rows], dtype=float)
+    if scale == 1.0 and prices.size and np.median(prices) > 5.0:
+        scale = 0.001                       # wartości w PLN/MWh bez jednostki w nagłówku
+
+    for ts, hour, price in rows:
+        if hour is not None:
+            ts = ts.replace(hour=0, minute=0) + timedelta(hours=hour - (1 if hour_ending else 0))
+        idx = _hour_index(ts)
+        if idx is None:
+            continue
+        part = years.setdefault(ts.year, {
+            "sum": np.zeros(HOURS_PER_YEAR),
+            "count": np.zeros(HOURS_PER_YEAR),
+        })
+        part["sum"][idx] += price * scale
+        part["count"][idx] += 1
+    return years
+
+
+def _atomic_write_bytes(path: str, writer) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _read_index(store_dir: str) -> Dict[str, Any]:
+    path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {"version": 0, "month_offsets": MONTH_OFFSETS, "years": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def import_price_file(path: str, store_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Importuje plik CSV z cenami godzinowymi do magazynu.
+
+    Godziny obecne w pliku nadpisują dane roku; brakujące bierzemy z istniejącej
+    partycji, a jeśli jej nie ma — interpolujemy liniowo. Zwraca nowy indeks.
+    """
+    store_dir = store_dir or PRICE_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+
+    parsed = _read_price_csv(path)
+    index = _read_index(store_dir)
+    version = int(index.get("version", 0)) + 1
+    hours = np.arange(HOURS_PER_YEAR)
+
+    for year, part in sorted(parsed.items()):
+        observed = part["count"] > 0
+        key = str(year)
+        existing = index["years"].get(key)
+        if observed.sum() < MIN_COVERAGE_HOURS and existing is None:
+            continue
+
+        values = np.zeros(HOURS_PER_YEAR)
+        values[observed] = part["sum"][observed] / part["count"][observed]
+        if existing is not None:
+            old = np.load(os.path.join(store_dir, existing["file"]))
+            values[~observed] = old[~observed]
+            coverage = max(float(observed.mean()), existing.get("coverage", 0.0))
+        else:
+            values[~observed] = np.interp(hours[~observed], hours[observed], values[observed])
+            coverage = float(observed.mean())
+
+        filename = f"{year}.v{version}.npy"
+        data = values.astype(np.float32)
+        _atomic_write_bytes(os.path.join(store_dir, filename), lambda f: np.save(f, data))
+        index["years"][key] = {
+            "file":     filename,
+            "hours":    HOURS_PER_YEAR,
+            "coverage": round(coverage, 4),
+            "mean":     round(float(data.mean()), 5),
+            "source":   os.path.basename(path),
+        }
+
+    index["version"] = version
+    index["month_offsets"] = MONTH_OFFSETS
+    index["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    payload = json.dumps(index, indent=1, sort_keys=True).encode("utf-8")
+    _atomic_write_bytes(os.path.join(store_dir, INDEX_FILE), lambda f: f.write(payload))
+
+    _cleanup_stale_partitions(store_dir, index)
+    return index
+
+
+def _cleanup_stale_partitions(store_dir: str, index: Dict[str, Any]) -> None:
+    """Usuwa partycje starsze niż poprzednia wersja (czytelnicy mogą jeszcze mapować poprzednią)."""
+    live = {meta["file"] for meta in index["years"].values()}
+    min_version = int(index["version"]) - 1
+    for name in os.listdir(store_dir):
+        m = re.match(r"^\d{4}\.v(\d+)\.npy$", name)
+        if m and name not in live and int(m.group(1)) < min_version:
+            os.unlink(os.path.join(store_dir, name))
+
+
+def ingest_inbox(store_dir: Optional[str] = None) -> List[str]:
+    """
+    Importuje wszystkie CSV z <store>/inbox i przenosi je do inbox/processed.
+    Blokada inbox/.lock: gdy import trwa w innym procesie, zwraca [] od razu.
+    """
+    store_dir = store_dir or PRICE_STORE_DIR
+    inbox = os.path.join(store_dir, "inbox")
+    if not os.path.isdir(inbox):
+        return []
+    with open(os.path.join(inbox, ".lock"), "a") as lock:
+        try:
+            import fcntl
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass            # Windows — jeden proces
+        except BlockingIOError:
+            return []
+        done = os.path.join(inbox, "processed")
+        os.makedirs(done, exist_ok=True)
+        imported = []
+        for name in sorted(os.listdir(inbox)):
+            src = os.path.join(inbox, name)
+            if not name.lower().endswith(".csv") or not os.path.isfile(src):
+                continue
+            import_price_file(src, store_dir)
+            shutil.move(src, os.path.join(done, name))
+            imported.append(name)
+        return imported
+
+
+_inbox_checked: Dict[str, float] = {}
+_inbox_lock = threading.Lock()
+
+
+def _ingest_in_background(store_dir: str) -> None:
+    try:
+        imported = ingest_inbox(store_dir)
+        if imported:
+            logger.info("Magazyn cen: zaimportowano %s", imported)
+    except Exception:
+        logger.exception("Magazyn cen: import z inbox nieudany")
+    finally:
+        _inbox_lock.release()
+
+
+def _check_inbox(store_dir: str) -> None:
+    """Co INBOX_CHECK_SECONDS: gdy w inbox/ leżą CSV, import w wątku w tle."""
+    now = time.monotonic()
+    last = _inbox_checked.get(store_dir)
+    if last is not None and now - last < INBOX_CHECK_SECONDS:
+        return
+    _inbox_checked[store_dir] = now
+    inbox = os.path.join(store_dir, "inbox")
+    try:
+        pending = any(name.lower().endswith(".csv") for name in os.listdir(inbox))
+    except OSError:
+        return
+    if pending and _inbox_lock.acquire(blocking=False):
+        threading.Thread(target=_ingest_in_background, args=(store_dir,), daemon=True).start()
+
+
+# =============================================================================
+# ODCZYT (MMAP) + ATOMOWE PRZEŁADOWANIE
+# =============================================================================
+
+class PriceStore:
+    """Niezmienna migawka magazynu: indeks + partycje zmapowane w pamięci."""
+
+    def __init__(self, store_dir: str, index: Dict[str, Any], mtime: float):
+        self.store_dir = store_dir
+        self.index = index
+        self.mtime = mtime
+        self.version = int(index.get("version", 0))
+        self._arrays: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def years(self) -> List[int]:
+        return sorted(int(y) for y in self.index.get("years", {}))
+
+    def has_year(self, year: int) -> bool:
+        return str(year) in self.index.get("years", {})
+
+    def get_year(self, year: int) -> np.ndarray:
+        """8760 cen PLN/kWh (mmap, tylko do odczytu)."""
+        arr = self._arrays.get(year)
+        if arr is not None:
+            return arr
+        meta = self.index.get("years", {}).get(str(year))
+        if meta is None:
+            raise ValueError(f"Brak cen historycznych dla roku {year}. Dostępne: {self.years()}")
+        with self._lock:
+            arr = self._arrays.get(year)
+            if arr is None:
+                arr = np.load(os.path.join(self.store_dir, meta["file"]), mmap_mode="r")
+                self._arrays[year] = arr
+        return arr
+
+    def get_month(self, year: int, month: int) -> np.ndarray:
+        """Ceny godzinowe jednego miesiąca (widok, bez kopii)."""
+        offsets = self.index.get("month_offsets", MONTH_OFFSETS)
+        return self.get_year(year)[offsets[month - 1]:offsets[month]]
+
+    def get_path(self, years: Sequence[int]) -> np.ndarray:
+        """Wieloletnia ścieżka cen: macierz (len(years), 8760) float64."""
+        return np.stack([np.asarray(self.get_year(y), dtype=float) for y in years])
+
+
+_current: Optional[PriceStore] = None
+_current_lock = threading.Lock()
+
+
+def get_price_store(store_dir: Optional[str] = None) -> PriceStore:
+    """
+    Aktualna migawka magazynu. Jeden os.stat na wywołanie; gdy index.json
+    się zmienił (nowy import), budujemy nową migawkę i podmieniamy referencję.
+    Przy okazji (co INBOX_CHECK_SECONDS) sprawdza inbox/ — _check_inbox.
+    """
+    global _current
+    store_dir = store_dir or PRICE_STORE_DIR
+    _check_inbox(store_dir)
+    path = os.path.join(store_dir, INDEX_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = 0
+
+    snap = _current
+    if snap is not None and snap.store_dir == store_dir and snap.mtime == mtime:
+        return snap
+
+    with _current_lock:
+        snap = _current
+        if snap is None or snap.store_dir != store_dir or snap.mtime != mtime:
+            index = _read_index(store_dir) if mtime else {"version": 0, "years": {}}
+            snap = PriceStore(store_dir, index, mtime)
+            _current = snap
+    return snap
+
+
+def get_historical_prices(year: int) -> Optional[np.ndarray]:
+    """Ceny 8760 dla roku z magazynu albo None, gdy roku nie zaimportowano."""
+    store = get_price_store()
+    return store.get_year(year) if store.has_year(year) else None
+
+
+def get_market_prices(year: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    Godzinowe ceny rynkowe dla taryfy dynamicznej: podany rok albo
+    najnowszy zaimportowany. None, gdy magazyn jest pusty.
+    """
+    store = get_price_store()
+    years = store.years()
+    if year is not None:
+        return store.get_year(year) if store.has_year(year) else None
+    return store.get_year(years[-1]) if years else None
+
+
+if __name__ == "__main__":
+    # python -m app.data.price_store plik.csv [plik2.csv ...]   |   python -m app.data.price_store --inbox
+    if sys.argv[1:] == ["--inbox"]:
+        print("Zaimportowano:", ingest_inbox())
+    else:
+        for csv_path in sys.argv[1:]:
+            idx = import_price_file(csv_path)
+            print(f"{csv_path}: wersja {idx['version']}, lata {sorted(idx['years'])}")
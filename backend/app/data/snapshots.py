@@ -0,0 +1,301 @@
+# backend/app/data/snapshots.py
+"""
+DataSnapshots — przeładowywalne w locie migawki danych referencyjnych.
+
+Taryfy, RCEm, ceny sprzętu, scenariusze sprzętowe i katalog baterii są
+domyślnie literałami Pythona / plikiem w repo. Aktualizacja cennika nie
+wymaga już redeployu — wystarczy położyć plik w katalogu migawek:
+
+    <DATA_SNAPSHOT_DIR>/
+        energy_rates.json | .toml        — struktura jak ENERGY_RATES
+        rcem.json | .toml                — {"monthly": {1..12}, "hourly_profile": {0..23}}
+        equipment.json | .toml           — struktura jak EQUIPMENT_COSTS
+        equipment_scenarios.json | .toml — {"scenarios": [...]} (jak ALL_SCENARIOS)
+        batteries.json                   — lista jak app/data/batteries.json
+
+- Migawka = zamrożone dane (MappingProxyType / tuple) + indeks zbudowany przez
+  builder danego zbioru (np. TariffCatalog) + wersja (skrót treści).
+- get_snapshot(name) sprawdza mtime pliku najwyżej raz na CHECK_INTERVAL_S;
+  przy zmianie buduje nową migawkę TYLKO tego zbioru i podmienia referencję
+  (czytelnicy trzymają starą migawkę do końca swojej pracy).
+- reload_snapshots() / SIGHUP (install_reload_signal) — wymuszone przeładowanie
+  (sygnał tylko zaznacza zbiory; przeładowanie przy najbliższym odczycie).
+- Błędny plik nie wyłącza workera: zostaje poprzednia migawka.
+- data_version() — łączna wersja do kluczy cache i nagłówków ETag.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_SNAPSHOT_DIR = os.getenv(
+    "DATA_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(__file__), "snapshots"),
+)
+CHECK_INTERVAL_S = float(os.getenv("DATA_SNAPSHOT_CHECK_S", "1.0"))
+BUILTIN = "builtin"
+_EXTENSIONS = (".json", ".toml")
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Jedna wersja zbioru danych — niemutowalna, podmieniana w całości."""
+    name: str
+    data: Any
+    index: Any
+    version: str
+    source: str
+    mtime_ns: int
+
+
+@dataclass(frozen=True)
+class _Dataset:
+    name: str
+    default: Callable[[], Any]
+    build: Callable[[Any], Any]
+    default_path: Optional[str] = None
+
+
+def freeze(obj: Any) -> Any:
+    """dict → MappingProxyType, list → tuple (rekurencyjnie)."""
+    if isinstance(obj, Mapping):
+        return MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+
+def thaw(obj: Any) -> Any:
+    """Odwrotność freeze — zwykłe dict/list (np. do odpowiedzi JSON)."""
+    if isinstance(obj, Mapping):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [thaw(v) for v in obj]
+    return obj
+
+
+def _content_version(raw: Any) -> str:
+    payload = json.dumps(thaw(raw), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _read_file(path: str) -> Any:
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError as exc:
+            raise ValueError("Migawki TOML wymagają Pythona 3.11+ (tomllib)") from exc
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_datasets: Dict[str, _Dataset] = {}
+_snapshots: Dict[str, DataSnapshot] = {}
+_checked_at: Dict[str, float] = {}
+_reload_requested: set = set()
+_lock = threading.Lock()
+
+
+def register_dataset(
+    name: str,
+    default: Callable[[], Any],
+    build: Callable[[Any], Any] = lambda data: data,
+    default_path: Optional[str] = None,
+) -> None:
+    """
+    Rejestruje zbiór danych.
+
+    default      — literał wbudowany (wywoływany leniwie, bez cykli importów)
+    build        — dane (zamrożone) → indeks; ValueError = plik odrzucony
+    default_path — plik w repo używany, gdy brak pliku w DATA_SNAPSHOT_DIR
+    """
+    _datasets[name] = _Dataset(name, default, build, default_path)
+    _snapshots.pop(name, None)
+    _checked_at.pop(name, None)
+
+
+def _locate(spec: _Dataset) -> Tuple[str, int]:
+    """Ścieżka i mtime_ns pliku zbioru albo (BUILTIN, 0)."""
+    for ext in _EXTENSIONS:
+        path = os.path.join(DATA_SNAPSHOT_DIR, spec.name + ext)
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    if spec.default_path:
+        try:
+            return spec.default_path, os.stat(spec.default_path).st_mtime_ns
+        except FileNotFoundError:
+            pass
+    return BUILTIN, 0
+
+
+def _load(spec: _Dataset, source: str, mtime_ns: int) -> DataSnapshot:
+    raw = spec.default() if source == BUILTIN else _read_file(source)
+    data = freeze(raw)
+    index = spec.build(data)
+    return DataSnapshot(
+        name=spec.name,
+        data=data,
+        index=index,
+        version=_content_version(raw),
+        source=source,
+        mtime_ns=mtime_ns,
+    )
+
+
+def get_snapshot(name: str, force: bool = False) -> DataSnapshot:
+    """
+    Aktualna migawka zbioru. Między sprawdzeniami (CHECK_INTERVAL_S) zwraca
+    referencję bez żadnego I/O; po zmianie pliku przeładowuje tylko ten zbiór.
+    """
+    spec = _datasets.get(name)
+    if spec is None:
+        raise ValueError(f"Nieznany zbiór danych: {name}. Dostępne: {sorted(_datasets)}")
+
+    if name in _reload_requested:
+        _reload_requested.discard(name)
+        force = True
+
+    snap = _snapshots.get(name)
+    now = time.monotonic()
+    if snap is not None and not force and now - _checked_at.get(name, 0.0) < CHECK_INTERVAL_S:
+        return snap
+
+    source, mtime_ns = _locate(spec)
+    _checked_at[name] = now
+    if snap is not None and not force and snap.source == source and snap.mtime_ns == mtime_ns:
+        return snap
+
+    with _lock:
+        snap = _snapshots.get(name)
+        if snap is not None and not force and snap.source == source and snap.mtime_ns == mtime_ns:
+            return snap
+        try:
+            fresh = _load(spec, source, mtime_ns)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            if snap is None:
+                raise ValueError(f"Nie można wczytać zbioru {name} z {source}: {exc}") from exc
+            logger.warning("Migawka %s z %s odrzucona (%s) — zostaje wersja %s", name, source, exc, snap.version)
+            return snap
+        if snap is None or fresh.version != snap.version:
+            logger.info("Migawka %s: wersja %s (%s)", name, fresh.version, source)
+        _snapshots[name] = fresh
+        return fresh
+
+
+def reload_snapshots(names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Wymuszone przeładowanie (sygnał administracyjny). Zwraca {zbiór: wersja}."""
+    return {name: get_snapshot(name, force=True).version for name in (names or list(_datasets))}
+
+
+def data_version() -> str:
+    """Łączna wersja wszystkich zbiorów — do kluczy cache i ETag."""
+    parts = "|".join(f"{name}={get_snapshot(name).version}" for name in sorted(_datasets))
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()[:12]
+
+
+def snapshot_info() -> Dict[str, Dict[str, Any]]:
+    """Wersje i źródła migawek (diagnostyka / endpoint administracyjny)."""
+    return {
+        name: {"version": snap.version, "source": snap.source}
+        for name, snap in ((n, get_snapshot(n)) for n in sorted(_datasets))
+    }
+
+
+def request_reload(names: Optional[Iterable[str]] = None) -> None:
+    """
+    Zaznacza zbiory do przeładowania przy najbliższym get_snapshot().
+    Bezpieczne w obsłudze sygnału (bez blokad i I/O).
+    """
+    _reload_requested.update(names or list(_datasets))
+
+
+def install_reload_signal(signum: Optional[int] = None) -> bool:
+    """
+    SIGHUP → request_reload() w każdym workerze, który wywołał tę funkcję.
+    Zwraca False, gdy platforma nie obsługuje sygnału (np. Windows).
+    """
+    import signal
+
+    signum = signum if signum is not None else getattr(signal, "SIGHUP", None)
+    if signum is None:
+        return False
+    try:
+        signal.signal(signum, lambda *_: request_reload())
+    except ValueError:
+        # Nie w głównym wątku interpretera
+        return False
+    return True
+
+
+# =============================================================================
+# ZBIORY DANYCH APLIKACJI
+# =============================================================================
+# Importy leniwe — moduły danych same korzystają z get_snapshot().
+
+def _default_energy_rates() -> Any:
+    from app.data.energy_rates import ENERGY_RATES
+    return ENERGY_RATES
+
+
+def _build_energy_rates(data: Any) -> Any:
+    from app.data.tariff_catalog import TariffCatalog
+    return TariffCatalog(data)
+
+
+def _default_rcem() -> Any:
+    from app.data.energy_prices_tge import RCEM_HOURLY_PROFILE, RCEM_MONTHLY_2025
+    return {"monthly": RCEM_MONTHLY_2025, "hourly_profile": RCEM_HOURLY_PROFILE}
+
+
+def _build_rcem(data: Any) -> Any:
+    from app.data.energy_prices_tge import build_rcem_index
+    return build_rcem_index(data)
+
+
+def _default_equipment() -> Any:
+    from app.data.equipment import EQUIPMENT_COSTS
+    return EQUIPMENT_COSTS
+
+
+def _build_equipment(data: Any) -> Any:
+    from app.data.equipment_catalog import build_equipment_tables
+    return build_equipment_tables(data)
+
+
+def _default_equipment_scenarios() -> Any:
+    from app.data.equipment_scenarios import ALL_SCENARIOS
+    return {"scenarios": ALL_SCENARIOS}
+
+
+def _build_equipment_scenarios(data: Any) -> Any:
+    from app.data.equipment_scenarios import index_scenarios
+    return index_scenarios(data)
+
+
+def _build_batteries(data: Any) -> Any:
+    from app.data.battery_catalog import BatteryCatalog
+    return BatteryCatalog(data)
+
+
+register_dataset("energy_rates", _default_energy_rates, _build_energy_rates)
+register_dataset("rcem", _default_rcem, _build_rcem)
+register_dataset("equipment", _default_equipment, _build_equipment)
+register_dataset("equipment_scenarios", _default_equipment_scenarios, _build_equipment_scenarios)
+register_dataset(
+    "batteries",
+    lambda: [],
+    _build_batteries,
+    default_path=os.path.join(os.path.dirname(__file__), "batteries.json"),
+)
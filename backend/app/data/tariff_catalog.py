@@ -0,0 +1,228 @@
+# backend/app/data/tariff_catalog.py
+"""
+TariffCatalog — indeks taryf operator × taryfa budowany RAZ na wersję danych.
+
+Wcześniej każdy request kilka razy przechodził zagnieżdżony słownik
+ENERGY_RATES (decompose_electricity_tariff, calculate_annual_demand,
+ScenarioRunner, HourlyEngine.__init__) i od nowa liczył te same składniki.
+Katalog:
+- waliduje każdy wpis (brakujące pola → ValueError, plik migawki odrzucony),
+- przelicza stawki zmienne, wektor stref 24h i opłaty stałe/mocowe
+  do niemutowalnych rekordów TariffRecord (lookup O(1)),
+- ma wersję = skrót danych; klucze cache oparte na taryfach powinny ją
+  zawierać, żeby zmiana cenników je unieważniała.
+
+Dane pochodzą z migawki "energy_rates" (app.data.snapshots): domyślnie
+ENERGY_RATES, albo plik w DATA_SNAPSHOT_DIR — katalog przebudowywany jest
+tylko przy zmianie tego pliku.
+"""
+
+import bisect
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.data.snapshots import get_snapshot, thaw
+
+DEFAULT_OPERATOR = "pge"
+DEFAULT_TARIFF = "g11"
+
+# Udział strefy szczytowej w zużyciu (G12/G12w) — średnia ważona statystyczna
+PEAK_SHARE = 0.6
+# Abonament, gdy operator nie podaje wariantu miesięcznego
+DEFAULT_SUBSCRIPTION_MONTHLY_PLN = 8.0
+
+# Taryfa dynamiczna: cena rynkowa + opłata handlowa sprzedawcy (netto); dystrybucja wg G11 operatora
+DYNAMIC_TARIFF = "dynamic"
+DYNAMIC_TRADING_FEE_PLN_KWH = 0.05
+# Stawki ENERGY_RATES i RCEm są brutto; ceny rynkowe (price_store) — netto
+VAT_MULTIPLIER = 1.23
+
+_COMMON_FIELDS = (
+    "quality_fee_kwh", "oze_fee_kwh", "cogeneration_fee_kwh",
+    "network_fixed_monthly_pln", "subscription_options", "capacity_fee_tiers",
+)
+_SINGLE_ZONE_FIELDS = ("energy_price_kwh", "distribution_variable_kwh")
+_TWO_ZONE_FIELDS = (
+    "energy_price_kwh_peak", "energy_price_kwh_offpeak",
+    "distribution_variable_kwh_peak", "distribution_variable_kwh_offpeak",
+)
+
+
+@dataclass(frozen=True)
+class TariffRecord:
+    """Przeliczone składniki jednej taryfy operatora (PLN, ceny za kWh)."""
+    operator: str
+    tariff: str
+    two_zone: bool
+    energy_pln_per_kwh: float            # średnia ważona — tylko to pokrywa depozyt
+    distribution_pln_per_kwh: float      # dystrybucja + opłaty jakościowa / OZE / kogeneracyjna
+    total_variable_pln_per_kwh: float
+    other_fees_pln_per_kwh: float
+    peak_pln_per_kwh: float              # pełna stawka zmienna w strefie szczytowej
+    offpeak_pln_per_kwh: float           # pełna stawka zmienna w strefie pozaszczytowej
+    zones: Tuple[float, ...]             # stawka dla każdej godziny doby (24)
+    fixed_monthly_pln: float             # opłata sieciowa stała + abonament miesięczny
+    capacity_fee_limits: Tuple[float, ...]
+    capacity_fee_annual_pln: Tuple[float, ...]
+    version: str
+
+    @property
+    def fixed_annual_pln(self) -> float:
+        return self.fixed_monthly_pln * 12
+
+    def capacity_fee(self, annual_kwh: float) -> float:
+        """Roczna opłata mocowa dla progu zużycia (bisect po progach)."""
+        i = bisect.bisect_left(self.capacity_fee_limits, annual_kwh)
+        return self.capacity_fee_annual_pln[min(i, len(self.capacity_fee_annual_pln) - 1)]
+
+    def components(self) -> Dict[str, float]:
+        """Słownik w formacie decompose_electricity_tariff."""
+        return {
+            "energy_pln_per_kwh": self.energy_pln_per_kwh,
+            "distribution_pln_per_kwh": self.distribution_pln_per_kwh,
+            "total_variable_pln_per_kwh": self.total_variable_pln_per_kwh,
+            "total_pln_per_kwh": self.total_variable_pln_per_kwh,
+        }
+
+
+def normalize_tariff(tariff: str) -> str:
+    """"G12-w" / "G12W" / "g12w" → "g12w"."""
+    return (tariff or DEFAULT_TARIFF).lower().replace("-", "").strip()
+
+
+def _is_offpeak_hour(hour: int) -> bool:
+    """Strefa tania G12: 22:00-06:00 + 13:00-15:00 (jak get_tariff_zones_g12)."""
+    return (22 <= hour or hour < 6) or (13 <= hour < 15)
+
+
+def _rates_version(rates: Mapping[str, Any]) -> str:
+    payload = json.dumps(thaw(rates), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _build_record(operator: str, tariff: str, rates: Mapping[str, Any], version: str) -> TariffRecord:
+    two_zone = "energy_price_kwh" not in rates
+    required = _COMMON_FIELDS + (_TWO_ZONE_FIELDS if two_zone else _SINGLE_ZONE_FIELDS)
+    missing = [f for f in required if f not in rates]
+    if missing:
+        raise ValueError(f"Taryfa {operator}/{tariff}: brak pól {missing}")
+
+    # max_kwh = null (JSON) → próg otwarty
+    tiers = sorted(
+        ((float("inf") if t["max_kwh"] is None else float(t["max_kwh"]), float(t["annual_pln"]))
+         for t in rates["capacity_fee_tiers"]),
+    )
+    if not tiers:
+        raise ValueError(f"Taryfa {operator}/{tariff}: pusta lista capacity_fee_tiers")
+
+    other_fees = rates["quality_fee_kwh"] + rates["oze_fee_kwh"] + rates["cogeneration_fee_kwh"]
+    if two_zone:
+        energy_part = (PEAK_SHARE * rates["energy_price_kwh_peak"]
+                       + (1 - PEAK_SHARE) * rates["energy_price_kwh_offpeak"])
+        dist_part = (PEAK_SHARE * rates["distribution_variable_kwh_peak"]
+                     + (1 - PEAK_SHARE) * rates["distribution_variable_kwh_offpeak"])
+        peak = rates["energy_price_kwh_peak"] + rates["distribution_variable_kwh_peak"] + other_fees
+        offpeak = rates["energy_price_kwh_offpeak"] + rates["distribution_variable_kwh_offpeak"] + other_fees
+    else:
+        energy_part = rates["energy_price_kwh"]
+        dist_part = rates["distribution_variable_kwh"]
+        peak = offpeak = round(energy_part + dist_part + other_fees, 4)
+
+    values = (energy_part, dist_part, peak, offpeak, other_fees)
+    if any(v < 0 for v in values):
+        raise ValueError(f"Taryfa {operator}/{tariff}: ujemna stawka")
+
+    zones = tuple(
+        offpeak if (two_zone and _is_offpeak_hour(h)) else peak for h in range(24)
+    )
+    subscription = rates["subscription_options"].get("monthly", DEFAULT_SUBSCRIPTION_MONTHLY_PLN)
+
+    return TariffRecord(
+        operator=operator,
+        tariff=tariff,
+        two_zone=two_zone,
+        energy_pln_per_kwh=round(energy_part, 4),
+        distribution_pln_per_kwh=round(dist_part + other_fees, 4),
+        total_variable_pln_per_kwh=round(energy_part + dist_part + other_fees, 4),
+        other_fees_pln_per_kwh=other_fees,
+        peak_pln_per_kwh=peak,
+        offpeak_pln_per_kwh=offpeak,
+        zones=zones,
+        fixed_monthly_pln=rates["network_fixed_monthly_pln"] + subscription,
+        capacity_fee_limits=tuple(limit for limit, _ in tiers),
+        capacity_fee_annual_pln=tuple(fee for _, fee in tiers),
+        version=version,
+    )
+
+
+class TariffCatalog:
+    """Niemutowalny indeks (operator, taryfa) → TariffRecord."""
+
+    def __init__(self, rates: Mapping[str, Mapping[str, Mapping[str, Any]]]):
+        self.version = _rates_version(rates)
+        self._records: Dict[Tuple[str, str], TariffRecord] = {}
+        for operator, tariffs in rates.items():
+            for tariff, entry in tariffs.items():
+                key = (operator.lower(), normalize_tariff(tariff))
+                self._records[key] = _build_record(key[0], key[1], entry, self.version)
+
+        if (DEFAULT_OPERATOR, DEFAULT_TARIFF) not in self._records:
+            raise ValueError(f"Katalog taryf musi zawierać {DEFAULT_OPERATOR}/{DEFAULT_TARIFF}")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return (key[0].lower(), normalize_tariff(key[1])) in self._records
+
+    def get(self, operator: Optional[str], tariff: Optional[str]) -> TariffRecord:
+        """
+        Rekord taryfy z tymi samymi zasadami zastępstwa co get_rate_data:
+        nieznany operator → pge, nieznana taryfa → g11 tego operatora.
+        """
+        op = (operator or DEFAULT_OPERATOR).lower()
+        tf = normalize_tariff(tariff)
+        record = self._records.get((op, tf))
+        if record is not None:
+            return record
+        if not any(key[0] == op for key in self._records):
+            op = DEFAULT_OPERATOR
+        return self._records.get((op, tf)) or self._records[(op, DEFAULT_TARIFF)]
+
+
+def get_tariff_catalog() -> TariffCatalog:
+    """Katalog z aktualnej migawki "energy_rates"."""
+    return get_snapshot("energy_rates").index
+
+
+def get_tariff(operator: Optional[str], tariff: Optional[str]) -> TariffRecord:
+    """Skrót: get_tariff_catalog().get(operator, tariff)."""
+    return get_tariff_catalog().get(operator, tariff)
+
+
+def dynamic_tariff_vector(
+    operator: Optional[str],
+    market_prices: Any,
+    market_prices_gross: bool = False,
+) -> np.ndarray:
+    """
+    Cena zakupu brutto [PLN/kWh] dla 8760 godzin w taryfie dynamicznej:
+    (cena rynkowa + DYNAMIC_TRADING_FEE_PLN_KWH) × VAT + dystrybucja i opłaty
+    zmienne (distribution_pln_per_kwh z taryfy G11 operatora, już brutto).
+
+    market_prices: ceny netto (price_store); market_prices_gross=True dla cen
+    już z VAT (np. RCEm jako zastępstwo, gdy magazyn cen jest pusty).
+    """
+    market = np.asarray(market_prices, dtype=float)
+    if market.shape != (8760,):
+        raise ValueError(f"Ceny rynkowe muszą mieć 8760 wartości, otrzymano {market.size}")
+    if market_prices_gross:
+        market = market / VAT_MULTIPLIER
+    record = get_tariff(operator, DEFAULT_TARIFF)
+    vector = (market + DYNAMIC_TRADING_FEE_PLN_KWH) * VAT_MULTIPLIER + record.distribution_pln_per_kwh
+    vector.setflags(write=False)
+    return vector
@@ -19,6 +19,8 @@ from app.core.engine import calculate_scenarios_engine
 from app.core.roof_geometry import validate_roof_dimensions
 from app.core.warnings_engine import WarningEngine
 from app.data.energy_prices_tge import get_rcem_monthly
+from app.data.snapshots import data_version, install_reload_signal
+from app.data.price_store import get_price_store
 from app.core.finance import calculate_monthly_net_billing_value
 
 # ── Nowe moduły ───────────────────────────────────────────────
@@ -64,11 +66,16 @@ app.include_router(calculator.router)   # ← PRZENIESIONE TUTAJ
 
 
 
+# ── Migawki danych (taryfy, RCEm, sprzęt) — SIGHUP przeładowuje bez restartu ──
+install_reload_signal()
+get_price_store()   # import nowych plików z inbox/ magazynu cen rusza od startu (w tle)
+
+
 # ── Health check ──────────────────────────────────────────────
 @app.get("/health")
 @app.get("/")
 def health_check():
-    return {"status": "ok", "version": "3.0.0", "service": "soolevo-api"}
+    return {"status": "ok", "version": "3.0.0", "service": "soolevo-api", "data_version": data_version()}
 
 
 # ── ISTNIEJĄCE ENDPOINTY (bez zmian) ─────────────────────────
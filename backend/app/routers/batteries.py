@@ -1,29 +1,37 @@
 # backend/app/routers/batteries.py
 # ─────────────────────────────────────────────────────────────
 #  Porównywarka magazynów energii
-#  Faza 1: dane statyczne z JSON
-#  Faza 2: tabela Battery w PostgreSQL (zakomentowana logika poniżej)
+#  Faza 1: dane statyczne z JSON (migawka "batteries" → BatteryCatalog)
+#  Faza 2: tabela Battery w PostgreSQL
 # ─────────────────────────────────────────────────────────────
 
-import json
-import os
-from typing import List, Optional
+from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from app.data.battery_catalog import get_battery_catalog
+from app.data.snapshots import get_snapshot
 
 router = APIRouter(prefix="/api/batteries", tags=["batteries"])
 
-# Ścieżka do statycznego JSON (Faza 1)
-BATTERIES_JSON = os.path.join(os.path.dirname(__file__), "..", "data", "batteries.json")
+# Przeglądarka zawsze rewaliduje (If-None-Match → 304 bez treści)
+CACHE_CONTROL = "public, no-cache"
 
 
-def _load_batteries():
-    with open(BATTERIES_JSON, encoding="utf-8") as f:
-        return json.load(f)
+def _not_modified(request: Request, response: Response) -> Optional[Response]:
+    """ETag = wersja migawki katalogu; 304, gdy klient ma aktualną odpowiedź."""
+    etag = f'"batteries-{get_snapshot("batteries").version}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
 
 
 @router.get("")
 def list_batteries(
+    request: Request,
+    response: Response,
     min_capacity: Optional[float] = Query(None, description="Min pojemność [kWh]"),
     max_capacity: Optional[float] = Query(None, description="Max pojemność [kWh]"),
     min_price: Optional[int] = Query(None, description="Min cena [PLN]"),
@@ -34,37 +42,29 @@ def list_batteries(
     limit: int = Query(50, ge=1, le=100),
 ):
     """Lista magazynów energii z filtrowaniem i sortowaniem."""
-    batteries = _load_batteries()
-
-    # Filtrowanie
-    if min_capacity is not None:
-        batteries = [b for b in batteries if b.get("capacity_kwh", 0) >= min_capacity]
-    if max_capacity is not None:
-        batteries = [b for b in batteries if b.get("capacity_kwh", 0) <= max_capacity]
-    if min_price is not None:
-        batteries = [b for b in batteries if b.get("price_pln") and b["price_pln"] >= min_price]
-    if max_price is not None:
-        batteries = [b for b in batteries if b.get("price_pln") and b["price_pln"] <= max_price]
-    if chemistry:
-        batteries = [b for b in batteries if b.get("chemistry", "").upper() == chemistry.upper()]
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
 
-    # Sortowanie
-    reverse = sort_dir.lower() == "desc"
-    batteries.sort(key=lambda b: b.get(sort_by, 0) or 0, reverse=reverse)
-
-    return batteries[:limit]
+    try:
+        return get_battery_catalog().search(
+            ranges={
+                "capacity_kwh": (min_capacity, max_capacity),
+                "price_pln": (min_price, max_price),
+            },
+            chemistry=chemistry,
+            sort_by=sort_by,
+            descending=sort_dir.lower() == "desc",
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/filters")
-def battery_filters():
+def battery_filters(request: Request, response: Response):
     """Dostępne wartości filtrów (dla frontendu)."""
-    batteries = _load_batteries()
-    chemistries = sorted(set(b.get("chemistry", "") for b in batteries if b.get("chemistry")))
-    capacities = [b.get("capacity_kwh", 0) for b in batteries if b.get("capacity_kwh")]
-    prices = [b.get("price_pln", 0) for b in batteries if b.get("price_pln")]
-
-    return {
-        "chemistries": chemistries,
-        "capacity_range": {"min": min(capacities), "max": max(capacities)} if capacities else {},
-        "price_range": {"min": min(prices), "max": max(prices)} if prices else {},
-    }
+    not_modified = _not_modified(request, response)
+    if not_modified is not None:
+        return not_modified
+    return get_battery_catalog().facets
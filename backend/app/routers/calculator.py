@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, File, Form, HTTPException, Response, UploadFile
+from typing import Optional
 import traceback
 import warnings
 
-from app.schemas.scenarios import ScenariosRequest, ScenariosResponse, RoofFacet
+from app.schemas.scenarios import (
+    ScenariosRequest, ScenariosResponse, RoofFacet, RoiDistributionRequest, FinancingRequest,
+)
 from app.schemas.report import ReportData, Warning
-from app.core.engine import calculate_scenarios_engine
+from app.core.engine import cache_roi_inputs, cached_roi_inputs, calculate_scenarios_engine
 from app.core.roof_geometry import validate_roof_dimensions
 from app.core.warnings_engine import WarningEngine
 from app.data.energy_prices_tge import get_rcem_monthly
 from app.core.finance import calculate_monthly_net_billing_value
+from app.core.meter_data import load_meter_profile
+from app.core.roi_distribution import scenario_roi_inputs, simulate_roi_distribution
+from app.core.financing import FinancingOffer, evaluate_financing
 
 router = APIRouter(prefix="/calculator", tags=["calculator"])
 
@@ -16,12 +22,104 @@ router = APIRouter(prefix="/calculator", tags=["calculator"])
 @router.post("/calculate/scenarios")
 def calculate_scenarios(request: ScenariosRequest) -> ScenariosResponse:
     try:
-        return calculate_scenarios_engine(request)
+        response = calculate_scenarios_engine(request)
+        cache_roi_inputs(request, response)
+        return response
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/calculate/roi-distribution")
+def calculate_roi_distribution(request: RoiDistributionRequest):
+    """
+    Rozkład okresu zwrotu i oszczędności 25-letnich (Monte Carlo, domyślnie 10 000 prób).
+    Wejście: gotowy scenariusz albo request /calculate/scenarios (wejścia ROI z cache).
+    """
+    try:
+        scenario = request.scenario
+        if scenario is not None:
+            scenario_name = scenario.get("scenario_name")
+            inputs = scenario_roi_inputs(scenario, with_battery=request.with_battery)
+        else:
+            if request.request is None:
+                raise ValueError("Podaj scenario albo request")
+            matches = [
+                item for item in cached_roi_inputs(request.request)
+                if item["scenario_name"] == request.scenario_name
+            ]
+            if not matches:
+                raise ValueError(f"Brak scenariusza {request.scenario_name}")
+            scenario_name = request.scenario_name
+            inputs = matches[0]["battery" if request.with_battery else "pv"]
+            if inputs is None:
+                raise ValueError(f"Scenariusz {scenario_name} nie zawiera baterii")
+
+        result = simulate_roi_distribution(
+            **inputs,
+            n_samples=request.n_samples,
+            bins=request.bins,
+            seed=request.seed,
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result["scenario_name"] = scenario_name
+    result["with_battery"] = request.with_battery
+    return result
+
+
+@router.post("/calculate/financing")
+def calculate_financing(request: FinancingRequest):
+    """
+    Kredyt / leasing / dotacja / ulga termomodernizacyjna dla każdego tieru:
+    IRR, NPV, rata, miesiąc wyjścia na plus, przepływ miesięczny w 1. roku.
+    """
+    try:
+        offers = [FinancingOffer(**offer.model_dump()) for offer in request.offers]
+        installations = []
+        for item in cached_roi_inputs(request.request):
+            if item["panels_count"] <= 0 or (request.with_battery and not item["battery_recommended"]):
+                continue
+            installations.append({
+                "name": item["scenario_name"],
+                **item["battery" if request.with_battery else "pv"],
+            })
+        if not installations:
+            raise ValueError("Brak scenariuszy do finansowania")
+
+        results = evaluate_financing(
+            offers,
+            installations,
+            discount_rate=request.discount_rate,
+            include_monthly=request.include_monthly,
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"with_battery": request.with_battery, "discount_rate": request.discount_rate, "results": results}
+
+
+@router.post("/meter-data")
+def upload_meter_data(
+    file: UploadFile = File(...),
+    operator: Optional[str] = Form(None),
+):
+    """
+    Import danych z licznika (CSV/XLSX z portalu OSD).
+    Zwrócone profile_id przekaż jako consumption_profile_id do /calculate/scenarios.
+    """
+    try:
+        result = load_meter_profile(file.file, filename=file.filename or "", operator=operator)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail=f"Nie udało się odczytać pliku: {e}")
+
+    return {k: v for k, v in result.items() if k != "profile"}
+
+
 @router.post("/report/data")
 def get_report_data(request: ScenariosRequest) -> ReportData:
     try:
@@ -76,7 +174,8 @@ def get_report_data(request: ScenariosRequest) -> ReportData:
 @router.post("/report/pdf")
 def generate_report_pdf(request: ScenariosRequest):
     from app.core.report_generator import ReportGenerator
-    report_data = get_report_data(request)
+    # Raport zawiera wykres tornado — analiza wrażliwości w tym samym przebiegu
+    report_data = get_report_data(request.model_copy(update={"include_sensitivity": True}))
 
     generator = ReportGenerator()
     pdf_bytes = generator.generate(report_data)
@@ -4,7 +4,7 @@ Pydantic schemas dla endpointu /calculate/scenarios.
 KOMPLETNY PLIK - gotowy do wklejenia.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel, Field
 
 
@@ -56,7 +56,7 @@ class ScenariosRequest(BaseModel):
     bill: float
     is_annual_bill: bool
     operator: str
-    tariff: str
+    tariff: str = Field(..., description="G11 | G12 | G12w | dynamic (ceny godzinowe z magazynu cen)")
     province: str
     household_size: int
     people_home_weekday: int
@@ -70,9 +70,20 @@ class ScenariosRequest(BaseModel):
     has_ac: bool = False
     has_ev: bool = False
     planned_ev: bool = False
+    ev_km_per_year: Optional[int] = Field(None, gt=0)  # przebieg EV; None = 15 000 km
+    ev_pattern: Literal["commuter", "home_office", "weekend"] = "commuter"  # EV_PATTERNS (ev_charging)
+    ev_smart_charging: bool = True        # ładowanie nadwyżką PV vs od podłączenia
     planned_heat_pump: bool = False
     planned_ac: bool = False
     planned_other_kwh: Optional[float] = None
+    price_year: Optional[int] = None               # ceny historyczne z PriceStore zamiast RCEm 2025
+    simulation_timestep_minutes: Literal[60, 15] = 60  # 60 lub 15 (rozliczenie kwadransowe)
+    export_limit_kw: Optional[float] = Field(None, ge=0)  # limit oddawania do sieci; 0 = zero-export
+    consumption_profile_id: Optional[str] = None   # profil z licznika (POST /calculator/meter-data)
+    include_sensitivity: bool = False              # analiza wrażliwości (tornado) w wyniku
+    sensitivity_delta: float = Field(0.10, gt=0, lt=1)  # zmiana każdego wejścia ±delta
+    battery_sizing: Literal["heuristic", "catalog"] = "heuristic"  # heuristic / catalog (model z katalogu o najwyższym NPV)
+    battery_dispatch: Literal["greedy", "optimal", "forecast"] = "greedy"  # greedy / optimal / forecast (plan dobowy wg cen)
     energy_rates: Optional[Dict[str, float]] = None
     energy_price_kwh: Optional[float] = None
     inflation_rate: float = 0.04
@@ -93,6 +104,7 @@ class ScenarioResponseItem(BaseModel):
     inverter_power_kw: float = Field(..., description="Moc falownika [kW]")
     inverter_brand: Optional[str] = None
     inverter_quantity: Optional[int] = 1
+    inverter_cost_pln: Optional[float] = None   # cena z marżą tieru (wymiana w ROI)
     facet_layouts: Optional[List[FacetLayout]] = None
     annual_production_kwh: float = Field(..., description="Roczna produkcja [kWh]")
     annual_consumption_kwh: float = Field(..., description="Roczne zapotrzebowanie [kWh]")
@@ -127,6 +139,13 @@ class ScenarioResponseItem(BaseModel):
     is_economically_justified: bool = Field(default=False, description="Czy bateria jest uzasadniona ekonomicznie")
     hourly_result_without_battery: Optional[Dict[str, Any]] = Field(None, description="Symulacja bez baterii")
     hourly_result_with_battery: Optional[Dict[str, Any]] = Field(None, description="Symulacja z baterią")
+    ev_charging: Optional[Dict[str, Any]] = Field(None, description="Ładowanie EV: dumb vs smart")
+    curtailment: Optional[Dict[str, Any]] = Field(None, description="Energia obcięta przez limit eksportu")
+    sensitivity: Optional[Dict[str, Any]] = Field(None, description="Analiza wrażliwości (dane wykresu tornado)")
+    pv_cashflow_25y: Optional[Dict[str, List[int]]] = Field(None, description="Przepływy 25 lat PV: cashflow_pln, cumulative_net_pln")
+    battery_cashflow_25y: Optional[Dict[str, List[int]]] = Field(None, description="Przepływy 25 lat PV+bateria")
+    battery_sweep: Optional[Dict[str, Any]] = Field(None, description="Ranking baterii z katalogu po NPV")
+    battery_degradation: Optional[Dict[str, Any]] = Field(None, description="Degradacja magazynu: cykle, pojemność rok po roku, wymiany")
     autoconsumption_rate: float = Field(..., description="Autokonsumpcja (0-1)")
     autoconsumption_kwh: Optional[float] = None
     self_sufficiency_rate: float = Field(..., description="Samowystarczalność (0-1)")
@@ -149,3 +168,40 @@ class ScenariosResponse(BaseModel):
     """Odpowiedź z 3 scenariuszami."""
     scenarios: List[ScenarioResponseItem] = Field(..., description="Lista scenariuszy")
     input_data: Optional[Dict[str, Any]] = Field(None, description="Dane wejściowe")
+
+
+class RoiDistributionRequest(BaseModel):
+    """Request do endpointu /calculate/roi-distribution (Monte Carlo ROI)."""
+    scenario: Optional[Dict[str, Any]] = Field(
+        None, description="Pozycja z ScenariosResponse.scenarios (wynik /calculate/scenarios)"
+    )
+    request: Optional[ScenariosRequest] = Field(
+        None, description="Alternatywnie: request /calculate/scenarios — wynik z cache lub przeliczony"
+    )
+    scenario_name: str = Field("standard", description="premium | standard | economy (gdy podano request)")
+    with_battery: bool = Field(False, description="Wariant PV + bateria")
+    n_samples: int = Field(10_000, ge=100, le=100_000)
+    bins: int = Field(25, ge=5, le=100)
+    seed: Optional[int] = None
+
+
+class FinancingOfferModel(BaseModel):
+    """Oferta finansowania (app.core.financing.FinancingOffer)."""
+    name: str = "gotówka"
+    down_payment_share: float = Field(1.0, ge=0, le=1, description="Wkład własny (1.0 = gotówka)")
+    annual_rate: float = Field(0.0, ge=0, le=1, description="Oprocentowanie nominalne roczne")
+    term_months: int = Field(0, ge=0, le=360)
+    residual_share: float = Field(0.0, ge=0, le=1, description="Wykup na końcu (leasing)")
+    subsidy_pln: float = Field(0.0, ge=0, description="Dotacja (np. Mój Prąd)")
+    subsidy_month: int = Field(6, ge=0, le=300)
+    tax_rate: float = Field(0.0, ge=0, lt=1, description="Stawka PIT dla ulgi termomodernizacyjnej; 0 = bez ulgi")
+    tax_relief_month: int = Field(16, ge=0, le=300)
+
+
+class FinancingRequest(BaseModel):
+    """Request do endpointu /calculate/financing — oferty × tiery scenariusza."""
+    request: ScenariosRequest
+    offers: List[FinancingOfferModel] = Field(..., min_length=1, max_length=50)
+    with_battery: bool = Field(False, description="Wariant PV + bateria (tiery bez baterii pomijane)")
+    discount_rate: float = Field(0.05, ge=0, le=1)
+    include_monthly: bool = Field(False, description="Pełne szeregi miesięczne w odpowiedzi")
@@ -0,0 +1,33 @@
+# backend/tests/test_battery_sizing.py
+"""Dobór baterii z katalogu: przegląd tylko na życzenie, tornado zgodne z ROI scenariusza."""
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.engine import calculate_scenarios_engine
+from app.schemas.scenarios import ScenariosRequest
+
+REQUEST = dict(
+    bill=300, is_annual_bill=False, operator="tauron", tariff="G12",
+    province="mazowieckie", household_size=4, people_home_weekday=1,
+    facets=[{"id": "f1", "roof_type": "gable", "width": 10, "length": 6, "azimuth_deg": 180, "angle": 35}],
+)
+
+
+def test_heuristic_sizing_skips_catalog_sweep():
+    [item, *_] = calculate_scenarios_engine(ScenariosRequest(**REQUEST)).scenarios
+    assert item.battery_sweep is None
+
+
+def test_catalog_tornado_base_matches_scenario_payback():
+    request = ScenariosRequest(**REQUEST, battery_sizing="catalog", include_sensitivity=True)
+    for item in calculate_scenarios_engine(request).scenarios:
+        assert item.battery_recommended
+        best = item.battery_sweep["best"]
+        assert item.battery_cost_gross_pln == pytest.approx(best["battery_cost_gross_pln"], abs=0.01)
+        assert item.sensitivity["base"]["payback_years"] == pytest.approx(item.battery_payback_years, abs=0.05)
+
+
+def test_unknown_sizing_mode_is_rejected():
+    with pytest.raises(ValidationError):
+        ScenariosRequest(**REQUEST, battery_sizing="cheapest")
@@ -0,0 +1,43 @@
+# backend/tests/test_ev_consumption.py
+"""Profil zużycia z EV sumuje się do rocznego zużycia z rachunku."""
+
+import pytest
+
+from app.core.engine import _compute_annual_consumption, calculate_scenarios_engine
+from app.core.hourly_engine import HourlyEngine
+from app.data.energy_prices_tge import get_rcem_hourly
+from app.schemas.scenarios import ScenariosRequest
+
+
+def _request(**extra) -> ScenariosRequest:
+    return ScenariosRequest(
+        bill=extra.pop("bill", 300), is_annual_bill=False, operator="tauron", tariff="G11",
+        province="mazowieckie", household_size=4, people_home_weekday=1,
+        facets=[{"id": "f1", "roof_type": "gable", "width": 10, "length": 6, "azimuth_deg": 180, "angle": 35}],
+        **extra,
+    )
+
+
+def test_ev_load_larger_than_consumption_is_capped():
+    engine = HourlyEngine(
+        annual_production_kwh=4000,
+        annual_consumption_kwh=1085,
+        electricity_tariff_pln_per_kwh=1.0,
+        rcem_hourly=get_rcem_hourly(),
+        ev_config={"annual_kwh": 3000, "pattern": "commuter"},
+    )
+    result = engine.run_hourly_simulation()
+    assert result["energy_flow"]["total_consumption_kwh"] == pytest.approx(1085, abs=1.0)
+
+
+@pytest.mark.parametrize("extra", [
+    {"bill": 120, "has_ev": True},
+    {"bill": 300, "has_ev": True},
+    {"bill": 300, "planned_ev": True, "ev_km_per_year": 8000},
+])
+def test_scenario_profile_matches_annual_consumption_with_ev(extra):
+    request = _request(**extra)
+    annual = _compute_annual_consumption(request)["annual_consumption_kwh"]
+    for scenario in calculate_scenarios_engine(request).scenarios:
+        total = scenario.hourly_result_without_battery["energy_flow"]["total_consumption_kwh"]
+        assert total == pytest.approx(annual, abs=1.0)
@@ -0,0 +1,34 @@
+# backend/tests/test_financing.py
+"""Oferta gotówkowa przy stopie 0% = przepływy ROI scenariusza."""
+
+import numpy as np
+import pytest
+
+from app.core.engine import calculate_scenarios_engine
+from app.core.financing import FinancingOffer, evaluate_financing
+from app.core.roi_distribution import scenario_roi_inputs
+from app.schemas.scenarios import ScenariosRequest
+
+
+@pytest.fixture(scope="module")
+def scenario():
+    request = ScenariosRequest(
+        bill=400, is_annual_bill=False, operator="tauron", tariff="G12",
+        province="mazowieckie", household_size=4, people_home_weekday=1,
+        facets=[{"id": "f1", "roof_type": "gable", "width": 10, "length": 6, "azimuth_deg": 180, "angle": 35}],
+        has_heat_pump=True,
+    )
+    item = calculate_scenarios_engine(request).scenarios[0].model_dump()
+    assert item["battery_recommended"]
+    return item
+
+
+@pytest.mark.parametrize("with_battery, series", [(False, "pv_cashflow_25y"), (True, "battery_cashflow_25y")])
+def test_cash_offer_matches_scenario_cashflows(scenario, with_battery, series):
+    inputs = scenario_roi_inputs(scenario, with_battery=with_battery)
+    [row] = evaluate_financing([FinancingOffer()], [inputs], discount_rate=0.0, include_monthly=True)
+
+    monthly = np.array(row["monthly_net_pln"])
+    assert monthly[0] == pytest.approx(-inputs["investment_pln"], abs=0.01)
+    yearly = monthly[1:].reshape(-1, 12).sum(axis=1)
+    np.testing.assert_allclose(yearly, scenario[series]["cashflow_pln"], atol=1.0)
@@ -0,0 +1,55 @@
+# backend/tests/test_meter_data.py
+"""Cache profili z licznika: współdzielony na dysku, klucz z operatorem."""
+
+import io
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.core import meter_data
+
+
+def _tauron_csv(days: int = 40) -> bytes:
+    start = datetime(2024, 3, 1, 1)
+    lines = ["Data i godzina;Wartość kWh"]
+    for h in range(days * 24):
+        stamp = start + timedelta(hours=h)
+        lines.append(f"{stamp:%Y-%m-%d %H:%M};{0.3 + 0.2 * (stamp.hour >= 17):.3f}".replace(".", ","))
+    return "\n".join(lines).encode("utf-8")
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(meter_data, "METER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(meter_data, "_cache", meter_data.OrderedDict())
+    return tmp_path
+
+
+def test_profile_is_shared_through_disk(disk_cache, monkeypatch):
+    first = meter_data.load_meter_profile(io.BytesIO(_tauron_csv()), filename="tauron.csv", operator="tauron")
+    assert not first["cached"]
+    assert (disk_cache / f"{first['profile_id']}.npz").exists()
+
+    # Inny worker: pusta pamięć procesu, parser niedostępny
+    monkeypatch.setattr(meter_data, "_cache", meter_data.OrderedDict())
+    monkeypatch.setattr(meter_data, "parse_meter_stream", None)
+    again = meter_data.load_meter_profile(io.BytesIO(_tauron_csv()), filename="tauron.csv", operator="Tauron ")
+    assert again["cached"]
+    assert again["profile_id"] == first["profile_id"]
+    np.testing.assert_array_equal(again["profile"], first["profile"])
+    for field in ("operator", "interval_minutes", "observed_hours", "filled_hours", "annual_consumption_kwh"):
+        assert again[field] == first[field]
+    assert not again["profile"].flags.writeable
+
+
+def test_operator_is_part_of_the_key(disk_cache):
+    tauron = meter_data.load_meter_profile(io.BytesIO(_tauron_csv()), filename="a.csv", operator="tauron")
+    detected = meter_data.load_meter_profile(io.BytesIO(_tauron_csv()), filename="a.csv")
+    assert tauron["profile_id"] != detected["profile_id"]
+    assert not detected["cached"]
+
+
+@pytest.mark.parametrize("profile_id", ["../etc/passwd", "", "A" * 64])
+def test_malformed_profile_id_is_not_read(disk_cache, profile_id):
+    assert meter_data.get_meter_profile(profile_id) is None
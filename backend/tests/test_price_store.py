@@ -0,0 +1,52 @@
+# backend/tests/test_price_store.py
+"""Magazyn cen: plik wrzucony do inbox/ trafia do magazynu bez ręcznego importu."""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.data import price_store
+
+
+def _write_prices(path, year: int = 2023, days: int = 60) -> None:
+    start = datetime(year, 1, 1)
+    lines = ["timestamp,price_pln_kwh"]
+    for h in range(days * 24):
+        lines.append(f"{start + timedelta(hours=h):%Y-%m-%d %H:%M},{0.4 + 0.01 * (h % 24):.3f}")
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "_inbox_checked", {})
+    return tmp_path
+
+
+def _wait_for_year(store_dir, year: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        price_store._inbox_checked.clear()
+        store = price_store.get_price_store(str(store_dir))
+        if store.has_year(year):
+            return store
+        time.sleep(0.05)
+    raise AssertionError(f"rok {year} nie trafił do magazynu")
+
+
+def test_inbox_file_is_ingested_in_background(store_dir):
+    (store_dir / "inbox").mkdir()
+    _write_prices(store_dir / "inbox" / "rce_2023.csv")
+
+    store = _wait_for_year(store_dir, 2023)
+    assert store.get_year(2023).shape == (8760,)
+    assert (store_dir / "inbox" / "processed" / "rce_2023.csv").exists()
+
+
+def test_inbox_check_is_throttled(store_dir, monkeypatch):
+    (store_dir / "inbox").mkdir()
+    calls = []
+    monkeypatch.setattr(price_store.os, "listdir", lambda path: calls.append(path) or [])
+    for _ in range(5):
+        price_store.get_price_store(str(store_dir))
+    assert len(calls) == 1
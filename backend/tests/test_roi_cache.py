@@ -0,0 +1,44 @@
+# backend/tests/test_roi_cache.py
+"""Cache wejść ROI: zwarte wpisy zgodne z pełnym scenariuszem, trafienie bez przeliczenia."""
+
+import pytest
+
+from app.core import engine
+from app.core.roi_distribution import scenario_roi_inputs
+from app.schemas.scenarios import ScenariosRequest
+
+REQUEST = ScenariosRequest(
+    bill=400, is_annual_bill=False, operator="tauron", tariff="G12",
+    province="mazowieckie", household_size=4, people_home_weekday=1,
+    facets=[{"id": "f1", "roof_type": "gable", "width": 10, "length": 6, "azimuth_deg": 180, "angle": 35}],
+    has_heat_pump=True,
+)
+
+
+def test_cached_inputs_match_full_scenarios(monkeypatch):
+    response = engine.calculate_scenarios_engine(REQUEST)
+    engine.cache_roi_inputs(REQUEST, response)
+
+    def recompute(_request):
+        raise AssertionError("trafienie w cache nie powinno przeliczać scenariuszy")
+
+    monkeypatch.setattr(engine, "calculate_scenarios_engine", recompute)
+    items = engine.cached_roi_inputs(REQUEST)
+    assert [item["scenario_name"] for item in items] == [s.scenario_name for s in response.scenarios]
+    for item, scenario in zip(items, response.scenarios):
+        full = scenario.model_dump()
+        assert item["pv"] == scenario_roi_inputs(full, with_battery=False)
+        if scenario.battery_recommended:
+            assert item["battery"] == scenario_roi_inputs(full, with_battery=True)
+        else:
+            assert item["battery"] is None
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(engine, "ROI_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(engine, "_roi_cache", engine.OrderedDict())
+    response = engine.calculate_scenarios_engine(REQUEST)
+    for bill in (300, 350, 400):
+        engine.cache_roi_inputs(REQUEST.model_copy(update={"bill": bill}), response)
+    assert len(engine._roi_cache) == 2
+    assert engine.scenario_cache_key(REQUEST) in engine._roi_cache
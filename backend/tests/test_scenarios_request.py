@@ -0,0 +1,28 @@
+# backend/tests/test_scenarios_request.py
+"""Walidacja ScenariosRequest — nieobsługiwane tryby symulacji odrzucane przez schemat (422)."""
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.scenarios import ScenariosRequest
+
+REQUEST = dict(
+    bill=300, is_annual_bill=False, operator="tauron", tariff="G12",
+    province="mazowieckie", household_size=4, people_home_weekday=1,
+    facets=[{"id": "f1", "roof_type": "gable", "width": 10, "length": 6, "azimuth_deg": 180, "angle": 35}],
+)
+
+
+@pytest.mark.parametrize("minutes", [30, 0, 5])
+def test_unsupported_timestep_is_rejected(minutes):
+    with pytest.raises(ValidationError):
+        ScenariosRequest(**REQUEST, simulation_timestep_minutes=minutes)
+
+
+def test_quarter_hour_timestep_is_accepted():
+    assert ScenariosRequest(**REQUEST, simulation_timestep_minutes=15).simulation_timestep_minutes == 15
+
+
+def test_unknown_dispatch_is_rejected():
+    with pytest.raises(ValidationError):
+        ScenariosRequest(**REQUEST, battery_dispatch="smart")
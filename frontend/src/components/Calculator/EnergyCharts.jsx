@@ -1,6 +1,6 @@
 // frontend/src/components/EnergyCharts.jsx
 // Krok 5: zakładki Lato/Zima, kolory PV palette, większe fonty
-// Logika obliczeń (CashflowChart25) — bez zmian
+// CashflowChart25 — krzywe z backendu (pv_cashflow_25y / battery_cashflow_25y)
 
 import React, { useState } from "react";
 import {
@@ -25,34 +25,28 @@ const formatPLN = (value) =>
   }).format(value || 0);
 
 // ─── WYKRES: PROGNOZA ZYSKU 25 LAT ────────────────────────────────────────────
-// Logika obliczeń bez zmian — dane z backendu
+// Dane z backendu — seria przepływów z FinancialEngine
 function CashflowChart25({ scenario }) {
   if (!scenario) return null;
 
-  const pvCost    = scenario.pv_cost_gross_pln || 0;
-  const batCost   = scenario.with_battery_total_cost_pln || scenario.total_cost_with_battery_pln || 0;
-  const pvAnnual  = scenario.pv_savings_pln || 0;
-  const batAnnual = scenario.total_savings_with_battery_pln || 0;
-  const hasBat    = batAnnual > 0 && batCost > 0;
-
-  // Budujemy tablicę danych — bez zmian
-  const data = [];
-  let pvCum  = -pvCost;
-  let batCum = hasBat ? -batCost : null;
-
-  for (let y = 1; y <= 25; y++) {
-    const factor = Math.pow(1.04, y - 1);
-    pvCum += pvAnnual * factor;
-    const entry = { rok: y, pvNet: Math.round(pvCum) };
-    if (hasBat && batCum !== null) {
-      batCum += batAnnual * factor;
-      entry.batNet = Math.round(batCum);
-    }
-    data.push(entry);
-  }
-
-  // Rok zwrotu — pierwsza wartość dodatnia
-  const paybackYear = data.find((d) => d.pvNet >= 0)?.rok;
+  // Zysk netto narastająco z FinancialEngine (OPEX, wymiana falownika) —
+  // ta sama seria co w raporcie PDF, bez przeliczania po stronie przeglądarki
+  const pvCum  = scenario.pv_cashflow_25y?.cumulative_net_pln || [];
+  const batCum = scenario.battery_cashflow_25y?.cumulative_net_pln || [];
+  const hasBat = batCum.length > 0 && batCum.length === pvCum.length;
+  if (pvCum.length === 0) return null;
+
+  const data = pvCum.map((pvNet, i) => {
+    const entry = { rok: i + 1, pvNet };
+    if (hasBat) entry.batNet = batCum[i];
+    return entry;
+  });
+
+  // Okres zwrotu — ten sam co w wyniku scenariusza
+  const payback = scenario.pv_payback_years || 0;
+  const paybackYears = payback > 0 && payback < pvCum.length
+    ? payback.toFixed(1).replace(".", ",")
+    : null;
 
   return (
     <div className="w-full bg-white rounded-xl p-4 border border-gray-100 shadow-sm">
@@ -60,12 +54,12 @@ function CashflowChart25({ scenario }) {
         <h4 className="text-sm font-black text-gray-500 uppercase tracking-wide">
           📈 Prognoza zysku netto (25 lat)
         </h4>
-        {paybackYear && (
+        {paybackYears && (
           <span
             className="text-xs font-bold px-3 py-1 rounded-full"
             style={{ backgroundColor: "#D5F5E3", color: "#1E8449" }}
           >
-            Zwrot w ~{paybackYear}. roku
+            Zwrot po ~{paybackYears} latach
           </span>
         )}
       </div>
@@ -130,7 +124,7 @@ function CashflowChart25({ scenario }) {
       </ResponsiveContainer>
 
       <p className="text-xs text-gray-500 mt-2 text-center">
-        Założenie: inflacja cen energii +4% rocznie · Net-billing
+        Założenia: inflacja cen energii +4% rocznie · degradacja 0,5%/rok · OPEX i wymiana falownika · Net-billing
       </p>
     </div>
   );